@@ -0,0 +1,136 @@
+"""
+Per-class item index written next to the utility-assignment outputs.
+
+While the engine writes the HUIM/USPAN files it can also count, for every item:
+
+    feature   position of the item in the line (index into feature_utilities)
+    support   transactions that contain the item
+    utility   total utility of the item (support at each position x that position's utility)
+    twu       transaction-weighted utility: sum of the transaction utilities of those transactions
+
+The other class files of the dataset ("class_files" in utility_tables.py) are counted
+the same way, so the index also has, per class c, lift_c = P(item | c) / P(item):
+above 1 the item is over-represented in class c. The index is a TSV next to the
+HUIM output (CKDYesHUIM.txt -> CKDYesHUIM.items.tsv).
+
+TWU is the upper bound the HUI miners prune with: an item whose TWU is below
+minutil cannot be in any high-utility itemset. With a minutil the engine drops those
+items from the HUIM file before the miner ever sees them (see prune_huim_line).
+"""
+
+import csv
+import os
+from collections import Counter
+
+from compressed import open_text, strip_compression
+
+INDEX_SUFFIX = ".items.tsv"
+
+
+def index_path(output_file_fixed: str) -> str:
+    """CKDYesHUIM.txt -> CKDYesHUIM.items.tsv"""
+    return os.path.splitext(strip_compression(output_file_fixed))[0] + INDEX_SUFFIX
+
+
+class ItemStats:
+    """Item support/utility/TWU of one class file, accumulated block by block."""
+
+    def __init__(self, feature_utilities, overall_utility):
+        self.utilities = list(feature_utilities)
+        self.overall = overall_utility
+        self.by_position = [Counter() for _ in self.utilities]
+        self.transactions = 0
+
+    def add_regular(self, tokens: list):
+        """A block already split into lines of exactly k tokens (flat list)."""
+        k = len(self.utilities)
+        for j, counter in enumerate(self.by_position):
+            counter.update(tokens[j::k])
+        self.transactions += len(tokens) // k
+
+    def add_lines(self, block: str):
+        """A block of arbitrary lines (token i of a line has utility i, like the engine)."""
+        self.add_rows([line.split() for line in block.split("\n")[:-1]])
+
+    def add_rows(self, rows):
+        """Transactions as lists of tokens (token i has utility i)."""
+        for values in rows:
+            if len(values) > len(self.utilities):
+                raise ValueError(f"Line has {len(values)} values but the utility table has "
+                                 f"{len(self.utilities)}: {' '.join(values)!r}")
+            for j, token in enumerate(values):
+                self.by_position[j][token] += 1
+            self.transactions += 1
+
+    def items(self) -> dict:
+        """item -> (first feature index, support, utility, twu)"""
+        out = {}
+        for j, counter in enumerate(self.by_position):
+            u = self.utilities[j]
+            for item, n in counter.items():
+                feature, support, utility = out.get(item, (j, 0, 0))[:3]
+                out[item] = (feature, support + n, utility + n * u)
+        return {item: (f, s, ut, s * self.overall) for item, (f, s, ut) in out.items()}
+
+
+def unpromising(stats: ItemStats, minutil: int) -> set:
+    """Items whose TWU is below minutil."""
+    return {item for item, (_, _, _, twu) in stats.items().items() if twu < minutil}
+
+
+def prune_huim_line(values, utilities, overall_utility, pruned: set) -> str:
+    """
+    HUIM line without the pruned items; the transaction utility drops by the removed
+    items' utilities (TWU of the remaining items stays an upper bound). Everything else
+    is written like the unpruned line, including the trailing utilities of a line with
+    fewer values than features. A transaction left without items is dropped ("").
+    """
+    kept, kept_utils, removed = [], [], 0
+    for v, u in zip(values, utilities):
+        if v in pruned:
+            removed += u
+        else:
+            kept.append(v)
+            kept_utils.append(str(u))
+    if not kept:
+        return ""
+    kept_utils += map(str, utilities[len(values):])
+    return f"{' '.join(kept)}:{overall_utility - removed}:{' '.join(kept_utils)}\n"
+
+
+def write_index(path: str, stats: dict) -> int:
+    """
+    Write the item index of {class label: ItemStats}; returns the number of items.
+    Rows are sorted by total support, most frequent first.
+    """
+    labels = list(stats)
+    per_class = {c: s.items() for c, s in stats.items()}
+    totals = {c: s.transactions for c, s in stats.items()}
+    n_all = sum(totals.values())
+    items = set().union(*per_class.values()) if per_class else set()
+
+    def support(c, item):
+        return per_class[c].get(item, (0, 0, 0, 0))[1]
+
+    def total_support(item):
+        return sum(support(c, item) for c in labels)
+
+    header = ["item", "feature"]
+    for c in labels:
+        header += [f"support_{c}", f"utility_{c}", f"twu_{c}"]
+    if len(labels) > 1:
+        header += [f"lift_{c}" for c in labels]
+
+    with open_text(path, "w", newline="") as f:
+        w = csv.writer(f, delimiter="\t", lineterminator="\n")
+        w.writerow(header)
+        for item in sorted(items, key=lambda i: (-total_support(i), i)):
+            feature = next(per_class[c][item][0] for c in labels if item in per_class[c])
+            row = [item, feature]
+            for c in labels:
+                row += list(per_class[c].get(item, (0, 0, 0, 0))[1:])
+            if len(labels) > 1:
+                p_item = total_support(item) / n_all
+                row += [f"{support(c, item) / totals[c] / p_item:.4f}" if totals[c] else "" for c in labels]
+            w.writerow(row)
+    return len(items)
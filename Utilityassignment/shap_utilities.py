@@ -0,0 +1,269 @@
+"""
+Derive the per-feature utilities of a utility table from SHAP instead of pasting them.
+
+For a dataset with "class_files" in utility_tables.py the encoded abstraction
+outputs (text or .txm) are read as one feature matrix, a tree model is fitted to
+predict the label column (the outcome) from the other columns, and the mean |SHAP|
+value of every feature is scaled to integers:
+
+    utility_i = max(1, round(UTILITY_SCALE * mean|SHAP_i| / max_j mean|SHAP_j|))
+
+The label column gets utility 0 and overall_utility is the sum, like the
+hand-entered tables. TreeExplainer runs against a bounded background sample, over
+at most MAX_EXPLAIN_ROWS rows, split into row chunks that can be spread over a
+process pool (N_WORKERS).
+
+The result is cached in CACHE_DIR under a key made of the SHA-256 of every input
+file and the settings below, so re-running on unchanged data skips the model and
+SHAP entirely. Needs scikit-learn and shap.
+
+    python shap_utilities.py CKD DD      # derive (or load) utilities, then convert
+    python shap_utilities.py             # every table whose class files exist
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from importlib import metadata
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "abstraction"))
+from compressed import open_text
+from parallel import resolve_workers, row_ranges
+from snapshot import file_sha256
+from txmatrix import is_matrix, open_matrix
+from utility_engine import run_table
+from utility_tables import UTILITY_TABLES
+
+# -----------------------------
+# Configurations
+# -----------------------------
+MODEL_PARAMS = {"n_estimators": 50, "max_depth": 8, "random_state": 0}  # RandomForestClassifier
+MAX_TRAIN_ROWS = 200_000     # rows sampled to fit the model (None = all)
+BACKGROUND_ROWS = 50         # background sample of TreeExplainer (bounds the cost per explained row)
+MAX_EXPLAIN_ROWS = 2_000     # rows whose |SHAP| values are averaged (None = all)
+CHUNK_ROWS = 500             # explained rows per task
+N_WORKERS = 1                # process pool for the SHAP chunks (None = all cores)
+UTILITY_SCALE = 50           # utility of the most important feature
+SEED = 0
+CACHE_DIR = "shap_cache"     # derived tables, one JSON per dataset and input hash
+
+
+def _require_ml():
+    """(sklearn.ensemble, shap) or SystemExit with an install hint."""
+    try:
+        import shap
+        from sklearn import ensemble
+    except ImportError as e:
+        raise SystemExit(f"❌ SHAP utilities need scikit-learn and shap ({e}). "
+                         f"pip install scikit-learn shap") from None
+    return ensemble, shap
+
+
+# -----------------------------
+# Encoded data -> feature matrix
+# -----------------------------
+def _read_tokens(path: str) -> pd.DataFrame:
+    """Encoded file as a DataFrame of token strings, one column per position ("" = missing)."""
+    if is_matrix(path):
+        data, header = open_matrix(path)
+        tokens = np.where(data != 0, np.asarray(data).astype(str), "")
+        return pd.DataFrame(tokens, columns=range(header["cols"]))
+    with open_text(path, "r", encoding=None) as f:
+        first = f.readline()
+    sep = "\t" if "\t" in first else " "   # FLCD writes tab-separated cells
+    return pd.read_csv(path, sep=sep, header=None, dtype=str, keep_default_na=False,
+                       na_filter=False, quoting=3, engine="c").fillna("")
+
+
+def _ordinal(tokens: pd.Series) -> np.ndarray:
+    """
+    Rank of every token within its column, ordered by (length, text): numeric order
+    for prefix+integer tokens ("1245" < "124405"). Missing cells become -1.
+    """
+    codes, uniques = pd.factorize(tokens)
+    order = sorted(range(len(uniques)), key=lambda i: (len(uniques[i]), uniques[i]))
+    rank = np.empty(len(uniques), dtype=np.float64)
+    rank[np.asarray(order, dtype=np.int64)] = np.arange(len(uniques))
+    values = rank[codes]
+    values[(tokens == "").to_numpy()] = -1.0
+    return values
+
+
+def load_dataset(paths, label_column: int):
+    """(X, y, n_features): features exclude the label column; y is its token."""
+    frames = [_read_tokens(p) for p in paths]
+    widths = {f.shape[1] for f in frames}
+    if len(widths) != 1:
+        raise ValueError(f"Inputs have different column counts: {sorted(widths)}")
+    df = pd.concat(frames, ignore_index=True)
+    n_features = df.shape[1]
+    label = df.columns[label_column]
+    y = df[label].to_numpy()
+    X = np.column_stack([_ordinal(df[c]) for c in df.columns if c != label])
+    return X, y, n_features
+
+
+def _sample(n: int, limit, rng) -> np.ndarray:
+    if limit is None or n <= limit:
+        return np.arange(n)
+    return np.sort(rng.choice(n, size=limit, replace=False))
+
+
+# -----------------------------
+# SHAP
+# -----------------------------
+_explainer = None
+
+
+def _init_worker(model, background):
+    global _explainer
+    _, shap = _require_ml()
+    _explainer = shap.TreeExplainer(model, data=background, feature_perturbation="interventional")
+
+
+def _abs_shap_sum(X: np.ndarray) -> np.ndarray:
+    """Sum over rows of |SHAP| per feature (averaged over classes) for one chunk."""
+    values = _explainer.shap_values(X, check_additivity=False)
+    if isinstance(values, list):                 # older shap: one array per class
+        values = np.stack(values, axis=-1)
+    values = np.abs(np.asarray(values))
+    if values.ndim == 3:                         # (rows, features, classes)
+        values = values.mean(axis=2)
+    return values.sum(axis=0)
+
+
+def mean_abs_shap(model, background: np.ndarray, X: np.ndarray, workers=N_WORKERS,
+                  chunk_rows: int = CHUNK_ROWS) -> np.ndarray:
+    """Mean |SHAP| per feature over the rows of X, explained in row chunks."""
+    chunks = [X[a:b] for a, b in row_ranges(len(X), chunk_rows)]
+    workers = min(resolve_workers(workers), max(1, len(chunks)))
+    if workers == 1:
+        _init_worker(model, background)
+        sums = [_abs_shap_sum(c) for c in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(model, background)) as pool:
+            sums = list(pool.map(_abs_shap_sum, chunks))
+    return np.sum(sums, axis=0) / max(1, len(X))
+
+
+def scale_utilities(importance, scale: int = UTILITY_SCALE) -> list:
+    """Integer utilities proportional to importance; the largest gets `scale`, none less than 1."""
+    importance = np.asarray(importance, dtype=np.float64)
+    top = importance.max(initial=0.0)
+    if top <= 0:
+        return [1] * len(importance)
+    return [max(1, int(round(scale * v / top))) for v in importance]
+
+
+# -----------------------------
+# Cache
+# -----------------------------
+def _settings(label_column: int) -> dict:
+    # package versions from metadata: a cache hit should not pay for importing shap
+    try:
+        versions = {"sklearn": metadata.version("scikit-learn"), "shap": metadata.version("shap")}
+    except metadata.PackageNotFoundError:
+        _require_ml()
+        raise
+    return {
+        "label_column": label_column, "model": "RandomForestClassifier", "model_params": MODEL_PARAMS,
+        "max_train_rows": MAX_TRAIN_ROWS, "background_rows": BACKGROUND_ROWS,
+        "max_explain_rows": MAX_EXPLAIN_ROWS, "utility_scale": UTILITY_SCALE, "seed": SEED,
+        **versions,
+    }
+
+
+def cache_key(paths, settings: dict) -> str:
+    """SHA-256 of the input contents (in order) and the derivation settings."""
+    h = hashlib.sha256()
+    for p in paths:
+        h.update(file_sha256(p).encode("ascii"))
+    h.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    return h.hexdigest()
+
+
+def derive_utilities(name: str, table: dict = None, print_fn=print) -> dict:
+    """
+    Utility table of `name` with feature_utilities/overall_utility derived from SHAP
+    (loaded from CACHE_DIR when the inputs and settings are unchanged).
+    """
+    table = table or UTILITY_TABLES[name]
+    paths = list(table.get("class_files", {}).values())
+    if not paths:
+        raise ValueError(f"Utility table {name} has no class_files")
+    missing = [p for p in paths if not os.path.exists(p)]
+    if missing:
+        raise FileNotFoundError(f"Class files of {name} not found: {', '.join(missing)}")
+    label_column = table.get("label_column", -1)
+
+    settings = _settings(label_column)
+    key = cache_key(paths, settings)
+    cache_path = os.path.join(CACHE_DIR, f"{name}.{key[:16]}.json")
+    if os.path.exists(cache_path):
+        with open(cache_path, "r", encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached.get("key") == key:
+            print_fn(f"✅ {name}: inputs unchanged, utilities loaded from {cache_path}")
+            return {**table, "feature_utilities": cached["feature_utilities"],
+                    "overall_utility": cached["overall_utility"]}
+
+    ensemble, _ = _require_ml()
+    t0 = time.perf_counter()
+    X, y, n_features = load_dataset(paths, label_column)
+    if len(np.unique(y)) < 2:
+        raise ValueError(f"{name}: label column {label_column} has a single class; "
+                         f"list the files of every class in class_files")
+    rng = np.random.default_rng(SEED)
+    train = _sample(len(X), MAX_TRAIN_ROWS, rng)
+    model = ensemble.RandomForestClassifier(**MODEL_PARAMS).fit(X[train], y[train])
+    t_fit = time.perf_counter() - t0
+
+    background = X[_sample(len(X), BACKGROUND_ROWS, rng)]
+    explained = X[_sample(len(X), MAX_EXPLAIN_ROWS, rng)]
+    importance = mean_abs_shap(model, background, explained)
+    t_shap = time.perf_counter() - t0 - t_fit
+
+    utilities = scale_utilities(importance)
+    label_index = range(n_features)[label_column]
+    utilities.insert(label_index, 0)
+    importance = importance.tolist()
+    importance.insert(label_index, 0.0)
+    result = {
+        "key": key, "inputs": list(paths), "rows": int(len(X)), "explained_rows": int(len(explained)),
+        "settings": settings, "mean_abs_shap": importance,
+        "feature_utilities": utilities, "overall_utility": sum(utilities),
+        "fit_seconds": round(t_fit, 3), "shap_seconds": round(t_shap, 3),
+    }
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(cache_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print_fn(f"✅ {name}: model fitted on {len(train)} rows in {t_fit:.2f} s, SHAP over "
+             f"{len(explained)} rows in {t_shap:.2f} s -> {cache_path}")
+    print_fn(f"   feature_utilities = {utilities}, overall_utility = {result['overall_utility']}")
+    return {**table, "feature_utilities": utilities, "overall_utility": result["overall_utility"]}
+
+
+def main(names):
+    if not names:
+        names = [n for n, t in UTILITY_TABLES.items()
+                 if t.get("class_files") and all(os.path.exists(p) for p in t["class_files"].values())]
+        if not names:
+            print("No utility table with class files found in", os.getcwd())
+            return
+    unknown = [n for n in names if n not in UTILITY_TABLES]
+    if unknown:
+        print(f"❌ Unknown utility table(s): {', '.join(unknown)}. Known: {', '.join(UTILITY_TABLES)}")
+        sys.exit(1)
+    for name in names:
+        run_table(name, derive_utilities(name))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
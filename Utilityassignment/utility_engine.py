@@ -0,0 +1,522 @@
+"""
+One utility-assignment engine for every dataset.
+
+The per-dataset conversion scripts all ran the same loop with different
+utilities. Here the loop is written once and driven by a utility table
+(utility_tables.py); both output formats come out of a single pass:
+
+    HUIM  (EFIM, ...):   "v1 v2 ... vk:<overall>:u1 u2 ... uk"
+    USPAN (USPAN, ...):  "v1[u1] -1 v2[u2] -1 ... vk[uk] -1 -2 SUtility:<overall>"
+
+The input is processed in blocks of lines. The per-column suffixes ("[u_i] -1 ")
+are fixed strings, so for a block where every line holds exactly k tokens
+separated by single spaces or tabs (checked with NumPy on the block's bytes) the
+whole block is split once, the suffixes are interleaved with the tokens by list
+slicing and joined in one call; HUIM is one str.replace on the line breaks.
+Other blocks (missing tokens, extra whitespace, non-ASCII) fall back to
+precomputed per-line format templates. A .txm transaction matrix is read as
+memory-mapped integer rows, without going through text: each distinct item of a
+block is turned into its token once, and full rows (no missing cell) take the same
+interleave-and-join path. Either way the output is byte-identical to the original
+per-token f-string loop. Output goes out in large buffered writes;
+inputs and outputs named .gz/.zst are (de)compressed on the fly (compressed.py).
+
+    python utility_engine.py CKD DD      # named tables
+    python utility_engine.py             # every table whose input file exists
+
+Streaming: encoded lines can come straight from an abstraction script instead of
+its output file, so the encoded dataset is never written out and read back:
+
+    python CSD.py | python utility_engine.py CSD --stdin         # (CSD.py: OUTPUT_PATH = "-")
+    python utility_engine.py CSD --stdin --stdout huim < CDCLCC.txt | ...
+
+From Python, convert_lines(lines, ...) takes any iterable of encoded lines (e.g. a
+generator over CSD.encoded_chunks()) and consumes it block by block.
+
+Item index and TWU pruning (item_index.py):
+
+    python utility_engine.py CKD --index                 # + CKDYesHUIM.items.tsv
+    python utility_engine.py CKD --minutil 50000         # drop items with TWU < 50000 from HUIM
+
+Deduplication (--dedup): identical transactions are written once with their
+utilities multiplied by the number of copies. Every itemset/sequence keeps its total
+utility, so high-utility mining gives the same patterns and utilities on a much
+smaller file; only the transaction counts (support) change.
+"""
+
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+from contextlib import nullcontext
+from itertools import islice
+
+import numpy as np
+
+# read .txm transaction matrices written with MATRIX_OUTPUT = True
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "abstraction"))
+from compressed import open_text
+from item_index import ItemStats, index_path, prune_huim_line, unpromising, write_index
+from txmatrix import is_matrix, open_matrix
+from utility_tables import UTILITY_TABLES
+
+BLOCK_CHARS = 4 << 20          # text read per block
+BLOCK_LINES = 65_536           # lines per block when the input is an iterable of lines
+MATRIX_BLOCK_ROWS = 65_536     # matrix rows per block
+WRITE_BUFFER = 8 << 20
+
+
+def build_templates(feature_utilities, overall_utility):
+    """
+    (HUIM suffix, USPAN per-column suffixes, USPAN line templates by token count).
+    Each USPAN suffix includes the separator that follows the token; the last one
+    carries the " -2 SUtility:<overall>" tail and the line break.
+    """
+    utils = [str(u) for u in feature_utilities]
+    huim_suffix = f":{overall_utility}:{' '.join(utils)}"
+    tail = f" -2 SUtility:{overall_utility}"
+    uspan_suffixes = [f"[{u}] -1 " for u in utils]
+    if utils:
+        uspan_suffixes[-1] = f"[{utils[-1]}] -1{tail}\n"
+    uspan_templates = [" ".join(f"{{}}[{u}] -1" for u in utils[:n]) + tail + "\n" for n in range(len(utils) + 1)]
+    return huim_suffix, uspan_suffixes, uspan_templates
+
+
+def _is_regular(block: str, k: int) -> bool:
+    """True if every line of the block is exactly k ASCII tokens separated by one space or tab."""
+    if not block.isascii():
+        return False
+    b = np.frombuffer(block.encode("ascii"), dtype=np.uint8)
+    delim = (b == ord(" ")) | (b == ord("\t")) | (b == ord("\n"))
+    # other whitespace/control characters would change what str.split() sees
+    if ((b <= ord(" ")) & ~delim).any() or delim[0] or (delim[1:] & delim[:-1]).any():
+        return False
+    newline = b[np.flatnonzero(delim)] == ord("\n")
+    return len(newline) % k == 0 and newline[k - 1::k].all() and newline.sum() == len(newline) // k
+
+
+def _assign_regular(block: str, tokens: list, k: int, huim_suffix: str, uspan_suffixes):
+    """Whole-block path for a regular block (tokens = block.split()): interleave the suffixes, join once."""
+    parts = [None] * (2 * len(tokens))
+    parts[0::2] = tokens
+    parts[1::2] = uspan_suffixes * (len(tokens) // k)
+    if "\t" in block:   # tab-delimited abstraction output (FLCD)
+        block = block.replace("\t", " ")
+    return block.replace("\n", huim_suffix + "\n"), "".join(parts)
+
+
+def _assign_lines(block: str, k: int, huim_suffix: str, uspan_templates):
+    """Per-line path: the original split() semantics with precomputed templates."""
+    return _assign_rows([line.split() for line in block.split("\n")[:-1]], k, huim_suffix, uspan_templates)
+
+
+def _assign_rows(rows, k: int, huim_suffix: str, uspan_templates):
+    """(HUIM, USPAN) text of transactions given as lists of tokens."""
+    huim, uspan = [], []
+    formats = [t.format for t in uspan_templates]
+    for values in rows:
+        if len(values) > k:
+            raise ValueError(f"Line has {len(values)} values but the utility table has {k}: {' '.join(values)!r}")
+        huim.append(" ".join(values) + huim_suffix + "\n")
+        uspan.append(formats[len(values)](*values))
+    return "".join(huim), "".join(uspan)
+
+
+def _interleave(tokens: list, suffixes: list) -> str:
+    """Tokens of full rows (k per row) joined with the k per-column suffixes."""
+    parts = [None] * (2 * len(tokens))
+    parts[0::2] = tokens
+    parts[1::2] = suffixes * (len(tokens) // len(suffixes))
+    return "".join(parts)
+
+
+def _prune_block(block: str, huim_suffix: str, feature_utilities, overall_utility, pruned: set) -> str:
+    """HUIM lines of a block with the pruned items dropped (see item_index.prune_huim_line)."""
+    return _prune_rows([line.split() for line in block.split("\n")[:-1]], huim_suffix,
+                       feature_utilities, overall_utility, pruned)
+
+
+def _prune_rows(rows, huim_suffix: str, feature_utilities, overall_utility, pruned: set) -> str:
+    """_prune_block for transactions given as lists of tokens."""
+    huim = []
+    for values in rows:
+        if pruned.isdisjoint(values):
+            huim.append(" ".join(values) + huim_suffix + "\n")
+        else:
+            huim.append(prune_huim_line(values, feature_utilities, overall_utility, pruned))
+    return "".join(huim)
+
+
+def text_blocks(f):
+    """Yield an open text stream as blocks of complete "\\n"-terminated lines."""
+    rest = ""
+    while True:
+        chunk = f.read(BLOCK_CHARS)
+        if not chunk:
+            if rest:
+                yield rest + "\n"
+            return
+        chunk = rest + chunk
+        cut = chunk.rfind("\n") + 1
+        rest = chunk[cut:]
+        if cut:
+            yield chunk[:cut]
+
+
+def read_blocks(input_file: str):
+    """Yield a text input ("-" = stdin) as blocks of complete "\\n"-terminated lines."""
+    if input_file == "-":
+        yield from text_blocks(sys.stdin)
+        return
+    with open_text(input_file, "r", encoding=None) as f:
+        yield from text_blocks(f)
+
+
+def matrix_blocks(input_file: str, k: int):
+    """
+    Yield a .txm matrix as (tokens, rows) per MATRIX_BLOCK_ROWS memory-mapped rows:
+    when every row has exactly k non-missing cells, tokens is the flat row-major list
+    of their tokens and rows is None; otherwise tokens is None and rows holds the
+    non-missing tokens of each row (like split() on the exported text).
+    """
+    data, _ = open_matrix(input_file)
+    n_cols = data.shape[1]
+    for start in range(0, len(data), MATRIX_BLOCK_ROWS):
+        block = np.asarray(data[start:start + MATRIX_BLOCK_ROWS])
+        items, inverse = np.unique(block, return_inverse=True)
+        names = np.array([str(v) if v else "" for v in items.tolist()], dtype=object)
+        tokens = names[inverse.reshape(-1)].tolist()
+        if k and n_cols == k and items[0] != 0:
+            yield tokens, None
+            continue
+        rows = [[t for t in tokens[i:i + n_cols] if t] for i in range(0, len(tokens), n_cols)]
+        too_long = next((r for r in rows if len(r) > k), None)
+        if too_long is not None:
+            raise ValueError(f"Line has {len(too_long)} values but the utility table has {k}: "
+                             f"{' '.join(too_long)!r}")
+        yield None, rows
+
+
+def lines_to_blocks(lines, block_lines: int = BLOCK_LINES):
+    """Group an iterable of encoded lines (without line breaks) into blocks, lazily."""
+    lines = iter(lines)
+    while True:
+        batch = list(islice(lines, block_lines))
+        if not batch:
+            return
+        yield "\n".join(batch) + "\n"
+
+
+def _output(path, report=None):
+    """
+    Writable text stream for an output path: "-" = stdout, None = not written,
+    .gz/.zst = compressed (report: print function for the compression summary).
+    """
+    if path is None:
+        return nullcontext(None)
+    if path == "-":
+        return nullcontext(sys.stdout)
+    return open_text(path, "w", encoding=None, buffering=WRITE_BUFFER, report=report)
+
+
+def convert_blocks(blocks, output_file_fixed, output_file_utilities,
+                   feature_utilities, overall_utility, report=None, stats=None, pruned=None) -> int:
+    """
+    Write the HUIM and USPAN lines of an iterable of line blocks in one pass; returns
+    the line count. An output path of "-" is stdout, None skips that format.
+    stats: optional ItemStats that counts the items on the way; pruned: items left
+    out of the HUIM lines (USPAN keeps them).
+    """
+    k = len(feature_utilities)
+    huim_suffix, uspan_suffixes, uspan_templates = build_templates(feature_utilities, overall_utility)
+
+    def parts():
+        for block in blocks:
+            if k and _is_regular(block, k):
+                tokens = block.split()
+                huim, uspan = _assign_regular(block, tokens, k, huim_suffix, uspan_suffixes)
+                if stats is not None:
+                    stats.add_regular(tokens)
+            else:
+                huim, uspan = _assign_lines(block, k, huim_suffix, uspan_templates)
+                tokens = None
+                if stats is not None:
+                    stats.add_lines(block)
+            if pruned and not pruned.isdisjoint(tokens if tokens is not None else block.split()):
+                huim = _prune_block(block, huim_suffix, feature_utilities, overall_utility, pruned)
+            yield huim, uspan, block.count("\n")
+
+    return _write_parts(parts(), output_file_fixed, output_file_utilities, report)
+
+
+def convert_matrix(input_file: str, output_file_fixed: str, output_file_utilities: str,
+                   feature_utilities, overall_utility, report=None, stats=None, pruned=None) -> int:
+    """convert() for a .txm matrix, from its integer rows (see matrix_blocks)."""
+    k = len(feature_utilities)
+    huim_suffix, uspan_suffixes, uspan_templates = build_templates(feature_utilities, overall_utility)
+    huim_separators = [" "] * (k - 1) + [huim_suffix + "\n"]
+
+    def parts():
+        for tokens, rows in matrix_blocks(input_file, k):
+            if tokens is not None:
+                huim, uspan = _interleave(tokens, huim_separators), _interleave(tokens, uspan_suffixes)
+                if stats is not None:
+                    stats.add_regular(tokens)
+                if pruned and not pruned.isdisjoint(tokens):
+                    rows = [tokens[i:i + k] for i in range(0, len(tokens), k)]
+                    huim = _prune_rows(rows, huim_suffix, feature_utilities, overall_utility, pruned)
+                yield huim, uspan, len(tokens) // k
+                continue
+            huim, uspan = _assign_rows(rows, k, huim_suffix, uspan_templates)
+            if stats is not None:
+                stats.add_rows(rows)
+            if pruned and any(not pruned.isdisjoint(values) for values in rows):
+                huim = _prune_rows(rows, huim_suffix, feature_utilities, overall_utility, pruned)
+            yield huim, uspan, len(rows)
+
+    return _write_parts(parts(), output_file_fixed, output_file_utilities, report)
+
+
+def _write_parts(parts, output_file_fixed, output_file_utilities, report=None) -> int:
+    """Write (HUIM text, USPAN text, line count) blocks to the two outputs; returns the line count."""
+    lines = 0
+    with _output(output_file_fixed, report) as outfile_fixed, \
+         _output(output_file_utilities, report) as outfile_utils:
+        for huim, uspan, n in parts:
+            if outfile_fixed is not None:
+                outfile_fixed.write(huim)
+            if outfile_utils is not None:
+                outfile_utils.write(uspan)
+            lines += n
+    return lines
+
+
+def convert(input_file: str, output_file_fixed: str, output_file_utilities: str,
+            feature_utilities, overall_utility, report=None, stats=None, pruned=None) -> int:
+    """Write the HUIM and USPAN files for input_file ("-" = stdin, or a .txm) in one pass; returns the line count."""
+    if is_matrix(input_file):
+        return convert_matrix(input_file, output_file_fixed, output_file_utilities,
+                              feature_utilities, overall_utility, report, stats, pruned)
+    return convert_blocks(read_blocks(input_file), output_file_fixed, output_file_utilities,
+                          feature_utilities, overall_utility, report, stats, pruned)
+
+
+def convert_lines(lines, output_file_fixed: str, output_file_utilities: str,
+                  feature_utilities, overall_utility, report=None, stats=None, pruned=None) -> int:
+    """convert() for an iterable of encoded lines, e.g. straight from an abstraction encoder."""
+    return convert_blocks(lines_to_blocks(lines), output_file_fixed, output_file_utilities,
+                          feature_utilities, overall_utility, report, stats, pruned)
+
+
+def count_transactions(blocks, k: int) -> dict:
+    """
+    {transaction (tuple of tokens): multiplicity} of an iterable of line blocks, in
+    order of first occurrence. Lines that differ only in whitespace are the same
+    transaction (they convert to the same output line).
+    """
+    lines = Counter()
+    for block in blocks:
+        lines.update(block.split("\n")[:-1])
+    counts = {}
+    for line, n in lines.items():
+        values = tuple(line.split())
+        if len(values) > k:
+            raise ValueError(f"Line has {len(values)} values but the utility table has {k}: {line!r}")
+        counts[values] = counts.get(values, 0) + n
+    return counts
+
+
+def count_matrix_transactions(input_file: str, k: int, stats: ItemStats = None) -> dict:
+    """count_transactions() for a .txm matrix; stats (optional) counts every row."""
+    counts = Counter()
+    for tokens, rows in matrix_blocks(input_file, k):
+        if tokens is not None:
+            if stats is not None:
+                stats.add_regular(tokens)
+            counts.update(zip(*[iter(tokens)] * k))
+        else:
+            if stats is not None:
+                stats.add_rows(rows)
+            counts.update(map(tuple, rows))
+    return dict(counts)
+
+
+def _weighted_blocks(counts: dict, feature_utilities, overall_utility, pruned=None,
+                     block_rows: int = BLOCK_LINES):
+    """
+    (HUIM, USPAN) text of deduplicated transactions, block_rows at a time. A transaction
+    seen m times is written once with every utility (and the transaction utility) times m,
+    so the utility of any itemset or sequence summed over the file is unchanged.
+    """
+    templates = {}
+    huim, uspan = [], []
+    for values, m in counts.items():
+        if m not in templates:
+            utils = [u * m for u in feature_utilities]
+            huim_suffix, _, uspan_templates = build_templates(utils, overall_utility * m)
+            templates[m] = (utils, huim_suffix, [t.format for t in uspan_templates])
+        utils, huim_suffix, formats = templates[m]
+        if pruned and not pruned.isdisjoint(values):
+            huim.append(prune_huim_line(values, utils, overall_utility * m, pruned))
+        else:
+            huim.append(" ".join(values) + huim_suffix + "\n")
+        uspan.append(formats[len(values)](*values))
+        if len(huim) == block_rows:
+            yield "".join(huim), "".join(uspan)
+            huim, uspan = [], []
+    if huim:
+        yield "".join(huim), "".join(uspan)
+
+
+def convert_dedup(input_file: str, output_file_fixed: str, output_file_utilities: str,
+                  feature_utilities, overall_utility, report=None, stats=None, pruned=None):
+    """
+    convert() with identical transactions collapsed into one weighted line (see
+    _weighted_blocks); returns (line count, distinct transactions). Item statistics
+    count every input line.
+    """
+    if is_matrix(input_file):
+        counts = count_matrix_transactions(input_file, len(feature_utilities), stats)
+    else:
+        blocks = read_blocks(input_file)
+        if stats is not None:
+            blocks = _with_stats(blocks, stats)
+        counts = count_transactions(blocks, len(feature_utilities))
+    with _output(output_file_fixed, report) as outfile_fixed, \
+         _output(output_file_utilities, report) as outfile_utils:
+        for huim, uspan in _weighted_blocks(counts, feature_utilities, overall_utility, pruned):
+            if outfile_fixed is not None:
+                outfile_fixed.write(huim)
+            if outfile_utils is not None:
+                outfile_utils.write(uspan)
+    return sum(counts.values()), len(counts)
+
+
+def _with_stats(blocks, stats: ItemStats):
+    """Pass the blocks through, counting their items into stats."""
+    k = len(stats.utilities)
+    for block in blocks:
+        if k and _is_regular(block, k):
+            stats.add_regular(block.split())
+        else:
+            stats.add_lines(block)
+        yield block
+
+
+def collect_stats(input_file: str, feature_utilities, overall_utility) -> ItemStats:
+    """Item statistics of an encoded file (a counting pass, nothing is written)."""
+    stats = ItemStats(feature_utilities, overall_utility)
+    if is_matrix(input_file):
+        for tokens, rows in matrix_blocks(input_file, len(feature_utilities)):
+            if tokens is not None:
+                stats.add_regular(tokens)
+            else:
+                stats.add_rows(rows)
+        return stats
+    for _ in _with_stats(read_blocks(input_file), stats):
+        pass
+    return stats
+
+
+def _class_label(table: dict, input_file: str) -> str:
+    for label, path in table.get("class_files", {}).items():
+        if os.path.abspath(path) == os.path.abspath(input_file):
+            return label
+    return "input"
+
+
+def run_table(name: str, table: dict = None, print_fn=print, input_file: str = None,
+              stdout: str = None, index: bool = False, minutil: int = None, dedup: bool = False) -> int:
+    """
+    Convert the dataset described by UTILITY_TABLES[name] (or by `table`). input_file
+    overrides the table's input ("-" = stdin); stdout = "huim"/"uspan" writes that
+    format to stdout instead of its file. index writes the item index of the input
+    and the other class files (item_index.py); minutil drops the items whose TWU is
+    below it from the HUIM output (needs a counting pass, so not with stdin). dedup
+    writes each distinct transaction once, weighted by its multiplicity.
+    """
+    table = table or UTILITY_TABLES[name]
+    input_file = input_file or table["input_file"]
+    utils, overall = table["feature_utilities"], table["overall_utility"]
+    outputs = [table["output_file_fixed"], table["output_file_utilities"]]
+    if stdout:
+        outputs[("huim", "uspan").index(stdout)] = "-"
+    t0 = time.perf_counter()
+    pruned = None
+    if minutil is not None:
+        if input_file == "-":
+            raise ValueError("minutil needs a counting pass over the input, which stdin cannot provide")
+        pruned = unpromising(collect_stats(input_file, utils, overall), minutil)
+        print_fn(f"• {name}: {len(pruned)} items with TWU < {minutil} left out of the HUIM file")
+    stats = ItemStats(utils, overall) if index else None
+    if dedup:
+        lines, distinct = convert_dedup(input_file, *outputs, utils, overall, report=print_fn,
+                                        stats=stats, pruned=pruned)
+        print_fn(f"• {name}: {lines} transactions -> {distinct} distinct "
+                 f"({lines / max(1, distinct):.1f}x smaller)")
+    else:
+        lines = convert(input_file, *outputs, utils, overall, report=print_fn, stats=stats, pruned=pruned)
+    secs = time.perf_counter() - t0
+    if stdout:
+        created = [p for p in outputs if p != "-"][0]
+        print_fn(f"✅ {name}: {lines} lines in {secs:.2f} s. {stdout.upper()} on stdout, created {created}")
+    else:
+        print_fn(f"✅ {name}: {lines} lines in {secs:.2f} s. Created two files:\n - "
+                 f"{outputs[0]} \n - {outputs[1]}")
+    if index:
+        write_item_index(name, table, input_file, stats, outputs[0], print_fn)
+    return lines
+
+
+def write_item_index(name: str, table: dict, input_file: str, stats: ItemStats,
+                     output_file_fixed: str, print_fn=print) -> str:
+    """Item index of the converted input plus the table's other class files that exist."""
+    per_class = {_class_label(table, input_file): stats}
+    for label, path in table.get("class_files", {}).items():
+        if label in per_class:
+            continue
+        if not os.path.exists(path):
+            print_fn(f"⚠️ {name}: class file {path} not found, left out of the item index")
+            continue
+        per_class[label] = collect_stats(path, table["feature_utilities"], table["overall_utility"])
+    path = index_path(table["output_file_fixed"] if output_file_fixed == "-" else output_file_fixed)
+    n = write_index(path, per_class)
+    print_fn(f"✅ {name}: item index of {n} items ({', '.join(per_class)}) -> {path}")
+    return path
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Write the HUIM and USPAN files of utility tables.")
+    parser.add_argument("names", nargs="*", help="utility tables (default: every table whose input file exists)")
+    parser.add_argument("--stdin", action="store_true", help="read the encoded lines of one table from stdin")
+    parser.add_argument("--stdout", choices=("huim", "uspan"), help="write this format to stdout instead of its file")
+    parser.add_argument("--index", action="store_true", help="also write the per-class item index (support, utility, TWU, lift)")
+    parser.add_argument("--minutil", type=int, help="leave items whose TWU is below this out of the HUIM file")
+    parser.add_argument("--dedup", action="store_true", help="write identical transactions once, utilities x multiplicity")
+    args = parser.parse_args(argv)
+    names = args.names
+    if args.stdin and len(names) != 1:
+        parser.error("--stdin needs exactly one table name")
+    if args.stdout and len(names) != 1:
+        parser.error("--stdout needs exactly one table name")
+    if args.stdin and args.minutil is not None:
+        parser.error("--minutil needs a counting pass over the input file, not --stdin")
+    if not names:
+        names = [n for n, t in UTILITY_TABLES.items() if os.path.exists(t["input_file"])]
+        if not names:
+            print("No input file of any utility table found in", os.getcwd())
+            return
+    unknown = [n for n in names if n not in UTILITY_TABLES]
+    if unknown:
+        print(f"❌ Unknown utility table(s): {', '.join(unknown)}. Known: {', '.join(UTILITY_TABLES)}")
+        sys.exit(1)
+    # keep stdout clean for the converted lines
+    status = (lambda m: print(m, file=sys.stderr)) if args.stdout else print
+    for name in names:
+        run_table(name, print_fn=status, input_file="-" if args.stdin else None, stdout=args.stdout,
+                  index=args.index, minutil=args.minutil, dedup=args.dedup)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,64 @@
+# -----------------------------
+# Utility tables (one per dataset)
+# -----------------------------
+# feature_utilities: per-feature utilities, index-based (token i of a line gets utility i)
+# overall_utility:   transaction utility written after every line
+# input_file:        abstraction output (.txt, or the .txm matrix from MATRIX_OUTPUT = True)
+# output_file_fixed / output_file_utilities: HUIM and USPAN outputs
+# class_files:       encoded file of every class, {label: file}; shap_utilities.py derives
+#                    utilities from them and the item index (--index) compares them
+# label_column:      index of the outcome column in those files (default -1, the last)
+
+UTILITY_TABLES = {
+    "CKD": {
+        "feature_utilities": [11, 25, 6, 8, 4, 9, 7, 5, 1, 3, 2, 12, 10, 18, 28, 22, 35, 14, 41, 16, 31, 20, 48, 0],
+        "overall_utility": 376,
+        "input_file": "CKDYes.txt",
+        "output_file_fixed": "CKDYesHUIM.txt",
+        "output_file_utilities": "CKDYesHUIMUSPAN.txt",
+        "class_files": {"Yes": "CKDYes.txt", "No": "CKDNo.txt"},
+    },
+    "CSD": {
+        "feature_utilities": [27, 21, 32, 9, 5, 13, 10, 12, 6, 17, 4, 0, 1, 8, 2, 3, 7],
+           # 21, 32, 27, 17, 13, 5, 6, 4, 2, 12, 3, 0, 1, 7, 8, 10, 9]
+        "overall_utility": 177,
+        "input_file": "CDCLCC.txt",
+        "output_file_fixed": "CDCLCCCHUIM.txt",
+        "output_file_utilities": "CDCLCCCHUIMUSPAN.txt",
+        "class_files": {"all": "CDCLCC.txt"},
+        "label_column": 15,   # death
+    },
+    "DD": {
+        "feature_utilities": [2, 17, 6, 3, 5, 13, 8, 11, 0],
+        "overall_utility": 65,
+        "input_file": "DiabetisNo.txt",
+        "output_file_fixed": "DDNoHUIM.txt",
+        "output_file_utilities": "DDNoHUIMUSPAN.txt",
+        "class_files": {"Yes": "DiabetisYes.txt", "No": "DiabetisNo.txt"},
+    },
+    "DSPP": {
+        "feature_utilities": [1, 1, 1, 1, 1, 1, 1, 1, 1, 1],
+        "overall_utility": 10,
+        "input_file": "DSPPNegative.txt",
+        "output_file_fixed": "DSPPNegativeU1HUIM.txt",
+        "output_file_utilities": "DSPPNegativeU1HUIMUSPAN.txt",
+        "class_files": {"Positive": "DSPPPositive.txt", "Negative": "DSPPNegative.txt"},
+    },
+    "FLCD": {
+        "feature_utilities": [15, 6, 10, 2, 4, 9, 11, 1, 22, 0],
+        "overall_utility": 80,
+        "input_file": "FLCDall.txt",
+        "output_file_fixed": "FLCDallHUIM.txt",
+        "output_file_utilities": "FLCDallHUIMUSPAN.txt",
+        "class_files": {"all": "FLCDall.txt"},
+        "label_column": 8,    # death
+    },
+    "HFP": {
+        "feature_utilities": [6, 5, 13, 1, 10, 3, 2, 4, 9, 8, 19, 0],
+        "overall_utility": 80,
+        "input_file": "heartNo.txt",
+        "output_file_fixed": "NoHUIM.txt",
+        "output_file_utilities": "NoHUIMUSPAN.txt",
+        "class_files": {"Yes": "heartYes.txt", "No": "heartNo.txt"},
+    },
+}
@@ -1,7 +1,41 @@
+from functools import partial
+
+import numpy as np
 import pandas as pd
 
+from codebook import Codebook
+from columnar import integral_or_unique, join_columns, map_unique, prefixed
+from compressed import open_text
+from parallel import encode_parallel
+from partition import labels_by_path, report_routing, route_by_class
+from pipe import STDOUT, is_stdout, status_to_stderr, write_lines
+from snapshot import read_excel_cached
+from txmatrix import save_matrix
+
 INPUT_PATH = "2. chronic kidney diseasesNo.xlsx"
 OUTPUT_PATH = "CKDNo.txt"
+# "-" writes the encoded lines to stdout (messages go to stderr), e.g. to pipe them into
+# Utilityassignment/utility_engine.py --stdin without an intermediate file.
+
+# Read a combined (No + Yes) workbook once and route each row by EventCKD35 instead of
+# writing OUTPUT_PATH, e.g. {"1": "CKDYes.txt", "0": "CKDNo.txt"}. None = single output.
+CLASS_OUTPUTS = None
+
+# Reuse a Feather snapshot of the workbook while it is unchanged (needs pyarrow)
+USE_SNAPSHOT = True
+
+# N_WORKERS > 1 encodes row ranges in a process pool (output keeps the input row order).
+# None/0 uses every core; 1 stays single-process.
+N_WORKERS = 1
+
+# CODEBOOK_PATH = "CKD.codebook.tsv" writes dense consecutive item IDs (one per
+# feature/value pair) instead of prefix+value tokens. Point the Yes and No runs at the
+# same codebook so both class files share IDs. None keeps the prefix+value tokens.
+CODEBOOK_PATH = None
+
+# MATRIX_OUTPUT = True also writes each output as a binary transaction matrix next to the
+# text file (CKDYes.txt -> CKDYes.txm) for the utility-assignment scripts to memory-map.
+MATRIX_OUTPUT = False
 
 def clean_header(s: str) -> str:
     return str(s).replace("\u00A0", " ").strip()
@@ -55,23 +89,6 @@ prefix = {
     "TimeToEventMonths": 132, "EventCKD35": 133
 }
 
-# Load as strings so "#NULL!" is preserved
-df = pd.read_excel(INPUT_PATH, dtype=str)
-df.columns = [clean_header(c) for c in df.columns]
-if "StudyID" in df.columns:
-    df = df.drop(columns=["StudyID"])
-
-# 🔹 Remove rows that contain any NaN/missing value
-rows_before = len(df)
-df = df.dropna()
-rows_after = len(df)
-print(f"Removed {rows_before - rows_after} rows with missing/NaN values.")
-
-required = list(prefix.keys())
-missing = [c for c in required if c not in df.columns]
-if missing:
-    raise ValueError(f"Missing expected columns: {missing}")
-
 bin_cols_without_event = [
     "HistoryDiabetes","HistoryCHD","HistoryVascular","HistorySmoking","HistoryHTN",
     "HistoryDLD","HistoryObesity","DLDmeds","DMmeds","HTNmeds","ACEIARB"
@@ -82,49 +99,98 @@ num_cols = [
 ]
 event_col = "EventCKD35"
 
-converted_strings = []
-for _, row in df.iterrows():
-    parts = []
+# Age.3.categories spellings -> code
+age3_map = {
+    "< 50":"0","<50":"0","less than 50":"0","lt50":"0",
+    "age > 51 < 65":"1","> 51 < 65":"1",">51 & <65":"1","51-65":"1",
+    "> 65":"2",">65":"2","over 65":"2","gt65":"2",
+    "0":"0","1":"1","2":"2"
+}
+
+def encode_rows(df: pd.DataFrame) -> list:
+    """Encode df column by column; per-cell rules run once per distinct value."""
+    n = len(df)
+    columns = []
 
     # Gender
-    g = norm_str(row.get("Gender"))
-    if g and g.lower() in {"male","m","1"}:
-        gv = "1"
-    elif g and g.lower() in {"female","f","0"}:
-        gv = "0"
-    else:
-        gv = "0"
-    parts.append(f"{prefix['Gender']}{gv}")
+    g = df["Gender"].str.strip().str.lower()
+    gv = np.where(g.isin({"male","m","1"}), "1", "0")
+    columns.append(prefixed(str(prefix["Gender"]), gv))
 
     # AgeBaseline
-    parts.append(f"{prefix['AgeBaseline']}{convert_numeric(row.get('AgeBaseline'))}")
-
-    # Age.3.categories
-    a3 = norm_str(row.get("Age.3.categories"))
-    mapping = {
-        "< 50":"0","<50":"0","less than 50":"0","lt50":"0",
-        "age > 51 < 65":"1","> 51 < 65":"1",">51 & <65":"1","51-65":"1",
-        "> 65":"2",">65":"2","over 65":"2","gt65":"2",
-        "0":"0","1":"1","2":"2"
-    }
-    av = mapping.get(a3.lower() if a3 else "0", "0")
-    parts.append(f"{prefix['Age.3.categories']}{av}")
+    columns.append(prefixed(str(prefix["AgeBaseline"]), integral_or_unique(df["AgeBaseline"], convert_numeric)))
+
+    # Age.3.categories (missing/blank -> "0")
+    av = df["Age.3.categories"].str.strip().str.lower().map(age3_map).fillna("0")
+    columns.append(prefixed(str(prefix["Age.3.categories"]), av))
 
     # Binary features
     for c in bin_cols_without_event:
-        parts.append(f"{prefix[c]}{map_yn(row.get(c))}")
+        columns.append(prefixed(str(prefix[c]), map_unique(df[c], map_yn)))
 
     # Numeric features (special case for TriglyceridesBaseline, HgbA1C)
     for c in num_cols:
-        parts.append(f"{prefix[c]}{convert_numeric(row.get(c), feature_name=c)}")
+        fn = partial(convert_numeric, feature_name=c)
+        columns.append(prefixed(str(prefix[c]), integral_or_unique(df[c], fn)))
 
     # EventCKD35 last
-    parts.append(f"{prefix[event_col]}{map_yn(row.get(event_col))}")
+    columns.append(prefixed(str(prefix[event_col]), map_unique(df[event_col], map_yn)))
 
-    converted_strings.append(" ".join(parts))
+    return join_columns(columns, n)
 
-# Save TXT
-with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
-    f.writelines(line + "\n" for line in converted_strings)
+def save_lines(path: str, converted_strings: list):
+    if is_stdout(path):
+        write_lines(converted_strings)
+        return
+    # Save TXT
+    with open_text(path, "w", report=print) as f:
+        f.writelines(line + "\n" for line in converted_strings)
+
+    print(f"✅ Done! Saved {len(converted_strings)} rows to {path}")
+
+def main():
+    # Load as strings so "#NULL!" is preserved
+    if USE_SNAPSHOT:
+        df = read_excel_cached(INPUT_PATH, dtype=str)
+    else:
+        df = pd.read_excel(INPUT_PATH, dtype=str)
+    df.columns = [clean_header(c) for c in df.columns]
+    if "StudyID" in df.columns:
+        df = df.drop(columns=["StudyID"])
+
+    # 🔹 Remove rows that contain any NaN/missing value
+    rows_before = len(df)
+    df = df.dropna()
+    rows_after = len(df)
+    print(f"Removed {rows_before - rows_after} rows with missing/NaN values.")
+
+    required = list(prefix.keys())
+    missing = [c for c in required if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing expected columns: {missing}")
+
+    converted_strings = encode_parallel(df, encode_rows, workers=N_WORKERS)
+
+    if CODEBOOK_PATH:
+        codebook = Codebook(CODEBOOK_PATH)
+        converted_strings = codebook.encode_lines(converted_strings, list(prefix), [str(p) for p in prefix.values()])
+        codebook.save()
+        print(f"Dense item IDs: {len(codebook)} items in {CODEBOOK_PATH}")
+
+    if CLASS_OUTPUTS:
+        labels = map_unique(df[event_col], map_yn).tolist()
+        groups, unrouted = route_by_class(converted_strings, labels, CLASS_OUTPUTS)
+        class_of = labels_by_path(CLASS_OUTPUTS)
+        for path, lines in groups.items():
+            save_lines(path, lines)
+            if MATRIX_OUTPUT and not is_stdout(path):
+                save_matrix(path, lines, list(prefix), class_of[path], final_newline=True)
+        report_routing(groups, unrouted)
+    else:
+        save_lines(OUTPUT_PATH, converted_strings)
+        if MATRIX_OUTPUT and not is_stdout(OUTPUT_PATH):
+            save_matrix(OUTPUT_PATH, converted_strings, list(prefix), final_newline=True)
 
-print(f"✅ Done! Saved {len(converted_strings)} rows to {OUTPUT_PATH}")
+if __name__ == "__main__":
+    with status_to_stderr(is_stdout(OUTPUT_PATH) or STDOUT in (CLASS_OUTPUTS or {}).values()):
+        main()
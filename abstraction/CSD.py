@@ -1,18 +1,64 @@
 import os
 import sys
 import re
+from functools import partial
+
+import numpy as np
 import pandas as pd
 
+from codebook import Codebook
+from columnar import join_columns, map_unique
+from compressed import open_text
+from incremental import load_manifest, plan_append, write_manifest
+from memo import cache_key, memoize, report_caches
+from parallel import encode_parallel, imap_ordered
+from pipe import is_stdout, status_to_stderr, write_lines
+from sniff import detect_encoding
+from txmatrix import MatrixWriter, lines_to_matrix, matrix_path, save_matrix
+
 # -------------------- Paths --------------------
 # -------------------- Paths --------------------
 INPUT_PATH = "8. MC CDC_DataLCC.csv"   # <-- change if needed
-OUTPUT_PATH = "CDCLCC.txt"                   # relative or absolute path is fine
+OUTPUT_PATH = "CDCLCC.txt"                   # relative or absolute path is fine; "-" = stdout
+                                             # CDCLCC.txt.gz / .zst writes it compressed
+ENCODINGS = ("utf-8-sig", "latin1", "cp1252")  # tried in order; the first that decodes the file wins
+
+# -------------------- Run mode --------------------
+# OUTPUT_PATH = "-" writes the encoded lines to stdout and the messages to stderr, so the
+# rows can be piped into Utilityassignment/utility_engine.py --stdin without an
+# intermediate file; with STREAMING each chunk goes out as soon as it is encoded.
+# STREAMING = True reads the CSV in CHUNK_SIZE-row chunks and appends each encoded
+# chunk to OUTPUT_PATH, so peak memory depends on CHUNK_SIZE instead of the file size.
+# The output is byte-identical to the in-memory path.
+STREAMING = False
+CHUNK_SIZE = 100_000
+
+# N_WORKERS > 1 encodes row ranges (or streamed chunks) in a process pool and writes
+# them back in the original row order. None/0 uses every core; 1 stays single-process.
+N_WORKERS = 1
+
+# INCREMENTAL = True keeps OUTPUT_PATH + ".manifest.json" (row count, byte offset and a
+# hash of the already-encoded input prefix). When the CDC republishes an extract that
+# only appends rows, the next run encodes just the new rows and appends them; if the
+# prefix, CODEBOOK_PATH or MATRIX_OUTPUT changed it falls back to a full rebuild.
+INCREMENTAL = False
+
+# CODEBOOK_PATH = "CDC.codebook.tsv" replaces the prefix+value tokens ("9991"+"1", raw
+# FIPS codes, ...) with dense consecutive item IDs and keeps the (feature, value) -> ID
+# table in that file; later runs and appended rows reuse the same IDs. None disables it.
+CODEBOOK_PATH = None
+
+# MATRIX_OUTPUT = True also writes the output as a binary transaction matrix next to the
+# text file (CDCLCC.txt -> CDCLCC.txm) for the utility-assignment scripts to memory-map.
+# Streaming and incremental runs write/extend it chunk by chunk.
+MATRIX_OUTPUT = False
 
 # -------------------- Helpers --------------------
 def norm_key(s: str) -> str:
     """Normalize header names to alphanumeric lowercase (removes spaces, ?, etc.)."""
     return re.sub(r"[^0-9a-z]", "", str(s).lower())
 
+@memoize()
 def norm_val(s: str) -> str:
     """Normalize cell values for mapping (lowercase, trim, dash normalize, collapse spaces)."""
     if s is None or (isinstance(s, float) and pd.isna(s)):
@@ -34,6 +80,7 @@ def to_int_str(v) -> str:
     except Exception:
         return "0"
 
+@memoize()
 def age_to_code(v) -> int:
     """Map many age-group variants (and digits) to 1..4; unknown/missing -> 0."""
     if v is None:
@@ -74,6 +121,7 @@ def age_to_code(v) -> int:
 
     return 0
 
+@memoize(key=lambda mapper, v, default=0: (id(mapper), cache_key(v), default))
 def coded_lookup(mapper, v, default=0):
     """Accept already-coded integers; else normalize and map."""
     s = norm_val(v)
@@ -167,58 +215,32 @@ def fail(msg: str):
 def info(msg: str):
     print(f"• {msg}")
 
-# -------------------- Validate input path --------------------
-abs_in = os.path.abspath(INPUT_PATH)
-info(f"Looking for input CSV at: {abs_in}")
-if not os.path.exists(INPUT_PATH):
-    fail("Input file not found. Check INPUT_PATH.")
-
-# -------------------- Load CSV (encoding fallback) --------------------
-df = None
-for enc in ("utf-8-sig", "latin1", "cp1252"):
-    try:
-        df = pd.read_csv(INPUT_PATH, dtype=str, low_memory=False, encoding=enc)
-        info(f"Loaded CSV with encoding: {enc}")
-        break
-    except Exception as e:
-        info(f"Encoding {enc} failed: {e}")
-if df is None:
-    fail("Could not read the CSV with utf-8-sig/latin1/cp1252.")
-
-rows, cols = df.shape
-info(f"DataFrame shape: {rows} rows x {cols} columns")
-if rows == 0:
-    info("Warning: CSV has 0 rows. An empty output file will still be created.")
-
-# -------------------- Drop redundant columns --------------------
-drop_before = set(df.columns)
-for redundant in ["res_state", "res_county", "res_county "]:
-    if redundant in df.columns:
-        df = df.drop(columns=[redundant])
-dropped = drop_before - set(df.columns)
-if dropped:
-    info(f"Dropped redundant columns: {sorted(dropped)}")
-
-# -------------------- Inspect & map columns --------------------
-norm_cols = {col: norm_key(col) for col in df.columns}
-mapped_cols = {col: ALIASES.get(nk) for col, nk in norm_cols.items() if ALIASES.get(nk)}
-unmapped_cols = [col for col in df.columns if col not in mapped_cols]
-
-info(f"Mapped columns count: {len(mapped_cols)}")
-if len(mapped_cols) == 0:
-    info("No columns matched expected aliases. Check your CSV headers.")
-    info("Here are your headers (and their normalized form):")
-    for col, nk in norm_cols.items():
-        print(f"  - '{col}'  ->  '{nk}'")
-    # We'll still write an empty file to make behavior explicit.
-
-# -------------------- Build output following INPUT COLUMN ORDER --------------------
-lines = []
-cols_in_order = list(df.columns)  # preserve exact file order
-
-for r_idx, (_, row) in enumerate(df.iterrows(), start=1):
-    parts = []
-    for raw_col in cols_in_order:
+def drop_redundant(df: pd.DataFrame) -> pd.DataFrame:
+    """Drop the res_state/res_county columns (they duplicate the FIPS codes)."""
+    for redundant in ["res_state", "res_county", "res_county "]:
+        if redundant in df.columns:
+            df = df.drop(columns=[redundant])
+    return df
+
+def report_columns(columns):
+    """Print how the CSV headers resolve to known features."""
+    norm_cols = {col: norm_key(col) for col in columns}
+    mapped_cols = {col: ALIASES.get(nk) for col, nk in norm_cols.items() if ALIASES.get(nk)}
+
+    info(f"Mapped columns count: {len(mapped_cols)}")
+    if len(mapped_cols) == 0:
+        info("No columns matched expected aliases. Check your CSV headers.")
+        info("Here are your headers (and their normalized form):")
+        for col, nk in norm_cols.items():
+            print(f"  - '{col}'  ->  '{nk}'")
+        # We'll still write an empty file to make behavior explicit.
+
+INTERVAL_FEATURES = {"case_positive_specimen_interval", "case_onset_interval"}
+
+def resolve_columns(columns) -> list:
+    """Resolve the column -> feature mapping once: [(raw_col, std_key), ...] in input order."""
+    resolved = []
+    for raw_col in columns:
         nk = norm_key(raw_col)
 
         # Skip redundant (normalized)
@@ -226,53 +248,330 @@ for r_idx, (_, row) in enumerate(df.iterrows(), start=1):
             continue
 
         std = ALIASES.get(nk)
-        if not std:
-            continue
+        if std:
+            resolved.append((raw_col, std))
+    return resolved
+
+def encode_value(std: str, val) -> str:
+    """Encode one cell of feature `std` (the per-cell rules of the original row loop)."""
+    ftype, prefix, mapper = FEATURE_INFO[std]
+
+    if ftype == "raw":
+        if std == "case_month":
+            return "" if val is None else str(val).replace("-", "").strip()
+        return "" if val is None else str(val).strip()
+
+    if ftype == "age":
+        return str(age_to_code(val))  # 1–4 (or 0)
+
+    if std in INTERVAL_FEATURES:
+        try:
+            num = int(float(val))
+        except Exception:
+            num = 0
+        if num < 0:
+            num = 0
+        return prefix + str(num)
+
+    return prefix + str(coded_lookup(mapper, val, 0))
+
+def encode_categorical(std: str, col: pd.Series) -> np.ndarray:
+    """Factorize a column and encode only its distinct values."""
+    return map_unique(col, partial(encode_value, std))
+
+def encode_interval(std: str, col: pd.Series) -> np.ndarray:
+    """Vectorized int(float(v)) clipped at 0; unparseable/non-finite values -> 0."""
+    prefix = FEATURE_INFO[std][1]
+    num = pd.to_numeric(col, errors="coerce").to_numpy(dtype="float64")
+    ok = np.isfinite(num) & (np.abs(num) < 2.0 ** 63)
+    ints = np.where(ok, np.trunc(num), 0).astype(np.int64)
+    ints[ints < 0] = 0
+    out = np.char.add(prefix, ints.astype(str)).astype(object)
+
+    # Strings that float() accepts but to_numeric does not (e.g. "1_000") go through the scalar rule.
+    leftover = ~ok & col.notna().to_numpy()
+    if leftover.any():
+        out[leftover] = encode_categorical(std, col[leftover])
+    return out
+
+def item_layout(columns):
+    """(features, prefixes) of the tokens encode_rows emits for these columns, in order."""
+    resolved = resolve_columns(columns)
+    return [std for _, std in resolved], [FEATURE_INFO[std][1] for _, std in resolved]
+
+def encode_rows(df: pd.DataFrame) -> list:
+    """
+    Encode every row of df into one space-separated line, following INPUT COLUMN ORDER.
+    Works a column at a time: categorical columns are factorized and only their
+    distinct values go through the mappers; interval columns use numeric coercion.
+    """
+    resolved = resolve_columns(df.columns)
+    encoded_cols = []
+    for raw_col, std in resolved:
+        col = df[raw_col]
+        if std in INTERVAL_FEATURES:
+            encoded_cols.append(encode_interval(std, col))
+        else:
+            encoded_cols.append(encode_categorical(std, col))
+
+    return join_columns(encoded_cols, len(df))
+
+def prepare_output(path: str) -> str:
+    abs_out = os.path.abspath(path)
+    out_dir = os.path.dirname(abs_out)
+    if out_dir and not os.path.exists(out_dir):
+        os.makedirs(out_dir, exist_ok=True)
+    return abs_out
+
+def read_header(in_path: str, enc: str) -> list:
+    """Column names exactly as pd.read_csv resolves them (duplicates mangled)."""
+    return list(pd.read_csv(in_path, dtype=str, encoding=enc, nrows=0).columns)
+
+def read_chunks(in_path: str, enc: str, offset: int = 0, columns=None):
+    """
+    Yield CHUNK_SIZE-row chunks with redundant columns dropped; report columns on the first.
+    With offset > 0, parsing starts at that byte offset (a header-less tail) using `columns`.
+    """
+    with open(in_path, "rb") as fh:
+        if offset:
+            fh.seek(offset)
+            reader = pd.read_csv(fh, header=None, names=columns, dtype=str, encoding=enc, chunksize=CHUNK_SIZE)
+        else:
+            reader = pd.read_csv(in_path, dtype=str, encoding=enc, chunksize=CHUNK_SIZE)
+        for chunk_no, chunk in enumerate(reader):
+            before = set(chunk.columns)
+            chunk = drop_redundant(chunk)
+            if chunk_no == 0:
+                dropped = before - set(chunk.columns)
+                if dropped:
+                    info(f"Dropped redundant columns: {sorted(dropped)}")
+                report_columns(chunk.columns)
+            yield chunk
+
+def encoded_chunks(in_path: str, enc: str, offset: int = 0, columns=None, codebook=None):
+    """
+    Generator stage of the streaming path: read in_path in CHUNK_SIZE-row chunks and
+    yield the encoded lines of each chunk, in input order (chunks are encoded in a
+    process pool with N_WORKERS != 1). With a codebook, tokens become dense item IDs.
+    """
+    features, prefixes = item_layout(columns if columns is not None else read_header(in_path, enc))
+    chunks = read_chunks(in_path, enc, offset=offset, columns=columns)
+    for lines in imap_ordered(encode_rows, chunks, N_WORKERS):
+        if lines and codebook is not None:
+            lines = codebook.encode_lines(lines, features, prefixes)
+        yield lines
+
+def stream_encode(in_path: str, abs_out: str, enc: str, offset: int = 0, columns=None,
+                  rows_before: int = 0, codebook=None, matrix=None) -> int:
+    """
+    Read in_path in CHUNK_SIZE-row chunks, encode each chunk and append it to abs_out.
+    With N_WORKERS != 1 the chunks are encoded in a process pool and written back in order.
+    Lines are joined with '\\n' and there is no trailing newline, exactly like the
+    in-memory path. With offset > 0 only the rows from that byte offset on are encoded
+    and appended after the rows_before lines already in abs_out. With a codebook, tokens
+    are replaced by dense item IDs. With a MatrixWriter, every chunk is also added to the
+    transaction matrix. Returns the number of lines written.
+    """
+    written = 0
+    n_features = len(item_layout(columns if columns is not None else read_header(in_path, enc))[0])
+    chunks = encoded_chunks(in_path, enc, offset=offset, columns=columns, codebook=codebook)
+    with open_text(abs_out, "a" if offset else "w", report=info) as f:
+        for chunk_no, lines in enumerate(chunks):
+            if not lines:
+                continue
+            if matrix is not None:
+                matrix.write(lines_to_matrix(lines, n_features))
+            if rows_before + written:
+                f.write("\n")
+            f.write("\n".join(lines))
+            written += len(lines)
+            info(f"Encoded chunk {chunk_no + 1}: {written} rows so far")
+    return written
+
+def stream_to_stdout(in_path: str, enc: str, codebook=None) -> int:
+    """Streaming path with OUTPUT_PATH = "-": write every encoded chunk to stdout."""
+    written = 0
+    for chunk_no, lines in enumerate(encoded_chunks(in_path, enc, codebook=codebook)):
+        write_lines(lines)
+        written += len(lines)
+        info(f"Encoded chunk {chunk_no + 1}: {written} rows so far")
+    return written
+
+def open_matrix_append(abs_out: str, columns, rows: int):
+    """MatrixWriter that extends the matrix of abs_out, or None if it has to be rebuilt."""
+    try:
+        return MatrixWriter(matrix_path(abs_out), item_layout(columns)[0], append=True, rows=rows)
+    except (OSError, ValueError) as e:
+        info(f"Incremental: transaction matrix not reusable ({e}); rebuilding it from the text output.")
+        return None
+
+def rebuild_matrix(abs_out: str, columns):
+    """Write the transaction matrix of abs_out from the text output."""
+    with open_text(abs_out, "r") as f:
+        text = f.read()
+    save_matrix(abs_out, text.split("\n") if text else [], item_layout(columns)[0], print_fn=info)
+
+def output_settings() -> dict:
+    """The options that change the output format; an incremental run only appends if they are unchanged."""
+    return {"codebook": os.path.abspath(CODEBOOK_PATH) if CODEBOOK_PATH else None,
+            "matrix_output": bool(MATRIX_OUTPUT)}
+
+def append_new_rows(abs_out: str, enc: str, codebook=None) -> bool:
+    """
+    Incremental mode: encode only the rows added since the last run and append them.
+    Returns False when the manifest does not vouch for the existing output (full rebuild needed).
+    """
+    manifest = load_manifest(abs_out)
+    offset, reason = plan_append(INPUT_PATH, abs_out, enc, manifest, output_settings())
+    if offset is None:
+        info(f"Incremental: full rebuild ({reason}).")
+        return False
+
+    in_size = os.path.getsize(INPUT_PATH)
+    matrix = open_matrix_append(abs_out, manifest["columns"], manifest["rows"]) if MATRIX_OUTPUT else None
+    if offset >= in_size:
+        info(f"Incremental: no new rows since the last run ({manifest['rows']} rows already encoded).")
+    else:
+        info(f"Incremental: prefix unchanged, encoding rows after byte {offset} "
+             f"({manifest['rows']} rows already encoded).")
+        try:
+            added = stream_encode(INPUT_PATH, abs_out, enc, offset=offset,
+                                  columns=manifest["columns"], rows_before=manifest["rows"],
+                                  codebook=codebook, matrix=matrix)
+        except Exception as e:
+            fail(f"Could not encode the new rows: {e}")
+        total = manifest["rows"] + added
+        write_manifest(INPUT_PATH, abs_out, enc, manifest["columns"], total, in_size, output_settings())
+        info(f"✅ Appended {added} rows to: {abs_out}  ({total} rows in total)")
+
+    if matrix is not None:
+        matrix.close()
+    elif MATRIX_OUTPUT:
+        rebuild_matrix(abs_out, manifest["columns"])
+    return True
+
+def finish(codebook):
+    """Persist the codebook (if any) and report cache counters."""
+    if codebook is not None:
+        codebook.save()
+        info(f"Dense item IDs: {len(codebook)} items in {os.path.abspath(CODEBOOK_PATH)}")
+    report_caches(info)
+
+def main():
+    # -------------------- Validate input path --------------------
+    abs_in = os.path.abspath(INPUT_PATH)
+    info(f"Looking for input CSV at: {abs_in}")
+    if not os.path.exists(INPUT_PATH):
+        fail("Input file not found. Check INPUT_PATH.")
+
+    # -------------------- Detect encoding (one decode pass, no trial parses) --------------------
+    enc, secs = detect_encoding(INPUT_PATH, ENCODINGS)
+    if enc is None:
+        fail(f"Could not decode the CSV with {'/'.join(ENCODINGS)}.")
+    info(f"Detected encoding: {enc} (detection took {secs * 1000:.1f} ms)")
+
+    # -------------------- Incremental mode --------------------
+    in_size = os.path.getsize(INPUT_PATH)
+    codebook = Codebook(CODEBOOK_PATH) if CODEBOOK_PATH else None
+    to_stdout = is_stdout(OUTPUT_PATH)
+    if to_stdout and INCREMENTAL:
+        fail("INCREMENTAL appends to an output file; it cannot be combined with OUTPUT_PATH = \"-\".")
+    if to_stdout and MATRIX_OUTPUT:
+        info("MATRIX_OUTPUT is ignored when writing to stdout.")
+    if INCREMENTAL and append_new_rows(prepare_output(OUTPUT_PATH), enc, codebook):
+        finish(codebook)
+        return
+
+    # -------------------- Streaming mode --------------------
+    if STREAMING and to_stdout:
+        try:
+            total = stream_to_stdout(INPUT_PATH, enc, codebook=codebook)
+        except Exception as e:
+            fail(f"Could not stream the CSV with encoding {enc}: {e}")
+        info(f"✅ Streamed {total} rows to stdout (chunk size {CHUNK_SIZE})")
+        finish(codebook)
+        return
+
+    if STREAMING:
+        abs_out = prepare_output(OUTPUT_PATH)
+        header = read_header(INPUT_PATH, enc)
+        matrix = MatrixWriter(matrix_path(abs_out), item_layout(header)[0]) if MATRIX_OUTPUT else None
+        try:
+            total = stream_encode(INPUT_PATH, abs_out, enc, codebook=codebook, matrix=matrix)
+        except Exception as e:
+            fail(f"Could not stream the CSV with encoding {enc}: {e}")
+        info(f"Streamed CSV with encoding: {enc} (chunk size {CHUNK_SIZE})")
+        if matrix is not None:
+            matrix.close()
+            info(f"Transaction matrix: {matrix.rows} x {len(matrix.features)} -> {matrix.path}")
+
+        size = os.path.getsize(abs_out)
+        info(f"✅ Wrote {total} rows to: {abs_out}  ({size} bytes)")
+        if INCREMENTAL:
+            write_manifest(INPUT_PATH, abs_out, enc, header, total, in_size, output_settings())
+        finish(codebook)
+        return
+
+    # -------------------- Load CSV (parsed once with the detected encoding) --------------------
+    try:
+        df = pd.read_csv(INPUT_PATH, dtype=str, low_memory=False, encoding=enc)
+    except Exception as e:
+        fail(f"Could not read the CSV with encoding {enc}: {e}")
+    info(f"Loaded CSV with encoding: {enc}")
+
+    rows, cols = df.shape
+    info(f"DataFrame shape: {rows} rows x {cols} columns")
+    if rows == 0:
+        info("Warning: CSV has 0 rows. An empty output file will still be created.")
+
+    # -------------------- Drop redundant columns --------------------
+    header = list(df.columns)
+    drop_before = set(df.columns)
+    df = drop_redundant(df)
+    dropped = drop_before - set(df.columns)
+    if dropped:
+        info(f"Dropped redundant columns: {sorted(dropped)}")
+
+    # -------------------- Inspect & map columns --------------------
+    report_columns(df.columns)
 
-        ftype, prefix, mapper = FEATURE_INFO[std]
-        val = row.get(raw_col, None)
-
-        if ftype == "raw":
-            if std == "case_month":
-                parts.append("" if val is None else str(val).replace("-", "").strip())
-            else:
-                parts.append("" if val is None else str(val).strip())
-
-        elif ftype == "age":
-            parts.append(str(age_to_code(val)))  # 1–4 (or 0)
-
-        elif ftype == "coded":
-            if std in {"case_positive_specimen_interval", "case_onset_interval"}:
-                try:
-                    num = int(float(val))
-                except Exception:
-                    num = 0
-                if num < 0:
-                    num = 0
-                parts.append(prefix + str(num))
-            else:
-                mapped_int = coded_lookup(mapper, val, 0)
-                parts.append(prefix + str(mapped_int))
-
-    lines.append(" ".join(parts))
-
-info(f"Built {len(lines)} output lines.")
-
-# -------------------- Save --------------------
-abs_out = os.path.abspath(OUTPUT_PATH)
-out_dir = os.path.dirname(abs_out)
-if out_dir and not os.path.exists(out_dir):
-    os.makedirs(out_dir, exist_ok=True)
-
-try:
-    with open(abs_out, "w", encoding="utf-8") as f:
-        f.write("\n".join(lines))
-except Exception as e:
-    fail(f"Could not write output file: {e}")
-
-# Verify
-if os.path.exists(abs_out):
-    size = os.path.getsize(abs_out)
-    info(f"✅ Wrote {len(lines)} rows to: {abs_out}  ({size} bytes)")
-else:
-    fail("Write completed without error but file not found (unexpected).")
+    # -------------------- Build output following INPUT COLUMN ORDER --------------------
+    lines = encode_parallel(df, encode_rows, workers=N_WORKERS)
+    if codebook is not None:
+        lines = codebook.encode_lines(lines, *item_layout(df.columns))
+
+    info(f"Built {len(lines)} output lines.")
+
+    # -------------------- Save --------------------
+    if to_stdout:
+        write_lines(lines)
+        info(f"✅ Wrote {len(lines)} rows to stdout")
+        finish(codebook)
+        return
+
+    abs_out = prepare_output(OUTPUT_PATH)
+
+    try:
+        with open_text(abs_out, "w", report=info) as f:
+            f.write("\n".join(lines))
+    except Exception as e:
+        fail(f"Could not write output file: {e}")
+
+    # Verify
+    if os.path.exists(abs_out):
+        size = os.path.getsize(abs_out)
+        info(f"✅ Wrote {len(lines)} rows to: {abs_out}  ({size} bytes)")
+    else:
+        fail("Write completed without error but file not found (unexpected).")
+    if MATRIX_OUTPUT:
+        try:
+            save_matrix(abs_out, lines, item_layout(df.columns)[0], print_fn=info)
+        except (OSError, ValueError) as e:
+            fail(f"Could not write the transaction matrix: {e}")
+    if INCREMENTAL:
+        write_manifest(INPUT_PATH, abs_out, enc, header, len(lines), in_size, output_settings())
+    finish(codebook)
+
+if __name__ == "__main__":
+    with status_to_stderr(is_stdout(OUTPUT_PATH)):
+        main()
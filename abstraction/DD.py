@@ -1,15 +1,47 @@
 import os
 import re
 import sys
+from functools import partial
+
+import numpy as np
 import pandas as pd
 
+from codebook import Codebook
+from columnar import join_columns, prefixed
+from compressed import open_text
+from parallel import encode_parallel
+from partition import labels_by_path, report_routing, route_by_class
+from pipe import STDOUT, is_stdout, status_to_stderr, write_lines
+from sniff import detect_encoding
+from txmatrix import save_matrix
+
 # -------------------- CONFIG --------------------
 INPUT_PATH = "diabetesYes.csv"        # <-- set to your diabetes dataset
 OUTPUT_PATH = "DiabetisYes.txt"  # output text file
+# "-" writes the encoded lines to stdout (messages go to stderr), e.g. to pipe them into
+# Utilityassignment/utility_engine.py --stdin without an intermediate file.
+ENCODINGS = ("utf-8-sig", "utf-8", "cp1252", "latin1")  # tried in order; the first that decodes the file wins
+
+# Read a combined diabetes CSV once and route each row by Outcome instead of writing
+# OUTPUT_PATH, e.g. {"1": "DiabetisYes.txt", "0": "DiabetisNo.txt"}. None = single output.
+CLASS_OUTPUTS = None
 
 # If you want to also drop a leading '0' after handling '0.' in DiabetesPedigreeFunction, set True
 DROP_LEADING_ZERO_IN_DPF = False
 
+# N_WORKERS > 1 encodes row ranges in a process pool (output keeps the input row order).
+# None/0 uses every core; 1 stays single-process.
+N_WORKERS = 1
+
+# CODEBOOK_PATH = "DD.codebook.tsv" writes dense consecutive item IDs (one per
+# feature/value pair) instead of prefix+value tokens. Point the Yes and No runs at the
+# same codebook so both class files share IDs. None keeps the prefix+value tokens.
+CODEBOOK_PATH = None
+
+# MATRIX_OUTPUT = True also writes each output as a binary transaction matrix next to the
+# text file (DiabetisYes.txt -> DiabetisYes.txm) for the utility-assignment scripts to memory-map.
+MATRIX_OUTPUT = False
+
 # -------------------- LABEL/PREFIX MAP --------------------
 PREFIX = {
     "pregnancies": "111",
@@ -69,83 +101,129 @@ def passthrough_num(v) -> str:
         return ""
     return str(v).strip()
 
-# -------------------- LOAD --------------------
-if not os.path.exists(INPUT_PATH):
-    print(f"❌ Input file not found: {os.path.abspath(INPUT_PATH)}")
-    sys.exit(1)
+def passthrough_col(c: pd.Series) -> pd.Series:
+    """passthrough_num for a whole column."""
+    return c.str.strip().fillna("")
+
+def transform_bmi_col(c: pd.Series) -> pd.Series:
+    """transform_bmi for a whole column."""
+    return c.str.strip().str.replace(".", "0", regex=False).fillna("")
+
+def transform_dpf_col(c: pd.Series) -> np.ndarray:
+    """transform_dpf for a whole column."""
+    s = c.str.strip()
+    leading = s.str.startswith("0.").fillna(False).to_numpy(dtype=bool)
+    # '0.626' -> '0626' (or '626' with DROP_LEADING_ZERO_IN_DPF, unless nothing follows the dot)
+    rest = s.str[2:]
+    if DROP_LEADING_ZERO_IN_DPF:
+        dotted = rest.where(rest.str.len() > 0, "0")
+    else:
+        dotted = "0" + rest
+    replaced = s.str.replace(".", "0", regex=False)
+    out = np.where(leading, dotted.fillna("").to_numpy(dtype=object), replaced.fillna("").to_numpy(dtype=object))
+    return out
+
+def encode_rows(df: pd.DataFrame, cols: dict) -> list:
+    """Encode df column by column; cols maps each required field name to its actual column."""
+    columns = [
+        # Pregnancies (prefix 111)
+        prefixed(PREFIX["pregnancies"], passthrough_col(df[cols["Pregnancies"]])),
+        # Glucose (222)
+        prefixed(PREFIX["glucose"], passthrough_col(df[cols["Glucose"]])),
+        # BloodPressure (333)
+        prefixed(PREFIX["bloodpressure"], passthrough_col(df[cols["BloodPressure"]])),
+        # SkinThickness (444)
+        prefixed(PREFIX["skinthickness"], passthrough_col(df[cols["SkinThickness"]])),
+        # Insulin (555)
+        prefixed(PREFIX["insulin"], passthrough_col(df[cols["Insulin"]])),
+        # BMI (66) – replace '.' with '0'
+        prefixed(PREFIX["bmi"], transform_bmi_col(df[cols["BMI"]])),
+        # DiabetesPedigreeFunction (77) – special dot rules
+        prefixed(PREFIX["diabetespedigreefunction"], transform_dpf_col(df[cols["DiabetesPedigreeFunction"]])),
+        # Age (888)
+        prefixed(PREFIX["age"], passthrough_col(df[cols["Age"]])),
+        # Outcome (9999)
+        prefixed(PREFIX["outcome"], passthrough_col(df[cols["Outcome"]])),
+    ]
+    return join_columns(columns, len(df))
+
+def save_lines(path: str, lines: list):
+    if is_stdout(path):
+        write_lines(lines)
+        return
+    out_path = os.path.abspath(path)
+    os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+    with open_text(out_path, "w", report=lambda m: print(f"• {m}")) as f:
+        f.write("\n".join(lines))
+
+    print(f"✅ Wrote {len(lines)} rows to {out_path}")
+
+def main():
+    # -------------------- LOAD --------------------
+    if not os.path.exists(INPUT_PATH):
+        print(f"❌ Input file not found: {os.path.abspath(INPUT_PATH)}")
+        sys.exit(1)
+
+    # Decide the encoding with one validating decode pass, then parse the CSV once
+    enc, secs = detect_encoding(INPUT_PATH, ENCODINGS)
+    if enc is None:
+        print("❌ Could not decode the CSV with common encodings.")
+        sys.exit(1)
+    print(f"• Detected encoding: {enc} (detection took {secs * 1000:.1f} ms)")
 
-df = None
-for enc in ("utf-8-sig", "utf-8", "cp1252", "latin1"):
     try:
         df = pd.read_csv(INPUT_PATH, dtype=str, encoding=enc)
-        print(f"• Loaded CSV with encoding: {enc}")
-        break
     except Exception as e:
-        print(f"• Failed encoding {enc}: {e}")
-
-if df is None:
-    print("❌ Could not read the CSV with common encodings.")
-    sys.exit(1)
-
-# -------------------- COLUMN RESOLUTION --------------------
-# Map your expected fields to actual dataframe columns by normalized key
-norm_cols = {col: norm_key(col) for col in df.columns}
-rev = {}
-for raw, nk in norm_cols.items():
-    rev.setdefault(nk, raw)
-
-def col(name):
-    nk = norm_key(name)
-    return rev.get(nk)
-
-required = [
-    "Pregnancies","Glucose","BloodPressure","SkinThickness","Insulin",
-    "BMI","DiabetesPedigreeFunction","Age","Outcome"
-]
-missing = [c for c in required if col(c) is None]
-if missing:
-    print("❌ Missing expected columns:", ", ".join(missing))
-    print("Columns found:", list(df.columns))
-    sys.exit(1)
-
-# -------------------- BUILD LINES --------------------
-lines = []
-for _, row in df.iterrows():
-    parts = []
-
-    # Pregnancies (prefix 111)
-    parts.append(PREFIX["pregnancies"] + passthrough_num(row[col("Pregnancies")]))
-
-    # Glucose (222)
-    parts.append(PREFIX["glucose"] + passthrough_num(row[col("Glucose")]))
-
-    # BloodPressure (333)
-    parts.append(PREFIX["bloodpressure"] + passthrough_num(row[col("BloodPressure")]))
-
-    # SkinThickness (444)
-    parts.append(PREFIX["skinthickness"] + passthrough_num(row[col("SkinThickness")]))
-
-    # Insulin (555)
-    parts.append(PREFIX["insulin"] + passthrough_num(row[col("Insulin")]))
-
-    # BMI (66) – replace '.' with '0'
-    parts.append(PREFIX["bmi"] + transform_bmi(row[col("BMI")]))
-
-    # DiabetesPedigreeFunction (77) – special dot rules
-    parts.append(PREFIX["diabetespedigreefunction"] + transform_dpf(row[col("DiabetesPedigreeFunction")]))
-
-    # Age (888)
-    parts.append(PREFIX["age"] + passthrough_num(row[col("Age")]))
-
-    # Outcome (9999)
-    parts.append(PREFIX["outcome"] + passthrough_num(row[col("Outcome")]))
-
-    lines.append(" ".join(parts))
-
-# -------------------- SAVE --------------------
-out_path = os.path.abspath(OUTPUT_PATH)
-os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
-with open(out_path, "w", encoding="utf-8") as f:
-    f.write("\n".join(lines))
-
-print(f"✅ Wrote {len(lines)} rows to {out_path}")
+        print(f"❌ Could not read the CSV with encoding {enc}: {e}")
+        sys.exit(1)
+    print(f"• Loaded CSV with encoding: {enc}")
+
+    # -------------------- COLUMN RESOLUTION --------------------
+    # Map your expected fields to actual dataframe columns by normalized key
+    norm_cols = {col: norm_key(col) for col in df.columns}
+    rev = {}
+    for raw, nk in norm_cols.items():
+        rev.setdefault(nk, raw)
+
+    def col(name):
+        nk = norm_key(name)
+        return rev.get(nk)
+
+    required = [
+        "Pregnancies","Glucose","BloodPressure","SkinThickness","Insulin",
+        "BMI","DiabetesPedigreeFunction","Age","Outcome"
+    ]
+    missing = [c for c in required if col(c) is None]
+    if missing:
+        print("❌ Missing expected columns:", ", ".join(missing))
+        print("Columns found:", list(df.columns))
+        sys.exit(1)
+    cols = {c: col(c) for c in required}
+
+    # -------------------- BUILD LINES --------------------
+    lines = encode_parallel(df, partial(encode_rows, cols=cols), workers=N_WORKERS)
+
+    if CODEBOOK_PATH:
+        codebook = Codebook(CODEBOOK_PATH)
+        lines = codebook.encode_lines(lines, required, list(PREFIX.values()))
+        codebook.save()
+        print(f"• Dense item IDs: {len(codebook)} items in {CODEBOOK_PATH}")
+
+    # -------------------- SAVE --------------------
+    if CLASS_OUTPUTS:
+        labels = [passthrough_num(v) for v in df[cols["Outcome"]]]
+        groups, unrouted = route_by_class(lines, labels, CLASS_OUTPUTS)
+        class_of = labels_by_path(CLASS_OUTPUTS)
+        for path, class_lines in groups.items():
+            save_lines(path, class_lines)
+            if MATRIX_OUTPUT and not is_stdout(path):
+                save_matrix(path, class_lines, required, class_of[path], print_fn=lambda m: print(f"• {m}"))
+        report_routing(groups, unrouted, lambda m: print(f"• {m}"))
+    else:
+        save_lines(OUTPUT_PATH, lines)
+        if MATRIX_OUTPUT and not is_stdout(OUTPUT_PATH):
+            save_matrix(OUTPUT_PATH, lines, required, print_fn=lambda m: print(f"• {m}"))
+
+if __name__ == "__main__":
+    with status_to_stderr(is_stdout(OUTPUT_PATH) or STDOUT in (CLASS_OUTPUTS or {}).values()):
+        main()
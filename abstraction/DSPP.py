@@ -1,9 +1,37 @@
 import pandas as pd
 import re
+from functools import partial
+
+from codebook import Codebook
+from columnar import constant, integral_or_unique, join_columns, map_unique, prefixed
+from compressed import open_text
+from parallel import encode_parallel
+from partition import labels_by_path, report_routing, route_by_class
+from pipe import STDOUT, is_stdout, status_to_stderr, write_lines
+from txmatrix import save_matrix
 
 # ---- Paths ----
 INPUT_PATH = "Disease_symptom_and_patient_profile_datasetPositive.csv"  # adjust if needed
 OUTPUT_PATH = "DSPPPositive.txt"
+# "-" writes the encoded lines to stdout (messages go to stderr), e.g. to pipe them into
+# Utilityassignment/utility_engine.py --stdin without an intermediate file.
+
+# Read the full dataset once and route each row by Outcome Variable instead of writing
+# OUTPUT_PATH, e.g. {"1": "DSPPPositive.txt", "0": "DSPPNegative.txt"}. None = single output.
+CLASS_OUTPUTS = None
+
+# N_WORKERS > 1 encodes row ranges in a process pool (output keeps the input row order).
+# None/0 uses every core; 1 stays single-process.
+N_WORKERS = 1
+
+# CODEBOOK_PATH = "DSPP.codebook.tsv" writes dense consecutive item IDs (one per
+# feature/value pair) instead of prefix+value tokens. Point the Yes and No runs at the
+# same codebook so both class files share IDs. None keeps the prefix+value tokens.
+CODEBOOK_PATH = None
+
+# MATRIX_OUTPUT = True also writes each output as a binary transaction matrix next to the
+# text file (DSPPPositive.txt -> DSPPPositive.txm) for the utility-assignment scripts to memory-map.
+MATRIX_OUTPUT = False
 
 # ---- Header normalization helper ----
 def norm_key(s: str) -> str:
@@ -16,24 +44,8 @@ expected = [
 ]
 expected_norm = {c: norm_key(c) for c in expected}
 
-# ---- Load CSV as strings (robust to mixed content) ----
-df = pd.read_csv(INPUT_PATH, dtype=str)
-orig_cols = list(df.columns)
-norm_lookup = {norm_key(c): c for c in orig_cols}
-
-# Map canonical -> actual column names
-col_map, missing = {}, []
-for c in expected:
-    nk = expected_norm[c]
-    if nk in norm_lookup:
-        col_map[c] = norm_lookup[nk]
-    else:
-        missing.append(c)
-
-# Require at least Disease and Outcome
-for crit in ["Disease", "Outcome Variable"]:
-    if crit not in col_map:
-        raise ValueError(f"Critical column missing: {crit}. Found columns: {orig_cols}")
+# Item prefix of each expected column, in output order
+item_prefix = ["1", "2", "3", "4", "5", "6", "7", "8", "9", "991"]
 
 # ---- Mappings ----
 disease_map_list = [
@@ -75,6 +87,10 @@ bp_map      = {"normal":0, "high":1, "low":2}
 chol_map    = {"normal":0, "high":1, "low":2}  # <- categorical per your correction
 outcome_map = {"positive":1, "1":1, "negative":0, "0":0}
 
+def norm_cat(v) -> str:
+    """Lookup key for a categorical cell: stripped and lower-cased; NaN -> ''."""
+    return str(v).strip().lower() if pd.notna(v) else ""
+
 def to_int_str(v):
     """Coerce to integer string; empty/NaN -> '0'."""
     if v is None:
@@ -87,56 +103,84 @@ def to_int_str(v):
     except Exception:
         return "0"
 
-# ---- Build output ----
-converted = []
-for _, row in df.iterrows():
-    parts = []
-
-    # 1) Disease
-    raw = str(row[col_map["Disease"]]).strip() if "Disease" in col_map and pd.notna(row[col_map["Disease"]]) else ""
-    parts.append(f"1{disease_map.get(raw.lower(), 0)}")
-
-    # 2) Fever
-    raw = str(row[col_map["Fever"]]).strip() if "Fever" in col_map and pd.notna(row[col_map["Fever"]]) else ""
-    parts.append(f"2{yn_map.get(raw.lower(), 0)}")
+# Lookup table of each categorical column (Age is the only numeric one)
+value_maps = {
+    "Disease": disease_map, "Fever": yn_map, "Cough": yn_map, "Fatigue": yn_map,
+    "Difficulty Breathing": yn_map, "Gender": gender_map, "Blood Pressure": bp_map,
+    "Cholesterol Level": chol_map, "Outcome Variable": outcome_map,
+}
 
-    # 3) Cough
-    raw = str(row[col_map["Cough"]]).strip() if "Cough" in col_map and pd.notna(row[col_map["Cough"]]) else ""
-    parts.append(f"3{yn_map.get(raw.lower(), 0)}")
-
-    # 4) Fatigue
-    raw = str(row[col_map["Fatigue"]]).strip() if "Fatigue" in col_map and pd.notna(row[col_map["Fatigue"]]) else ""
-    parts.append(f"4{yn_map.get(raw.lower(), 0)}")
-
-    # 5) Difficulty Breathing
-    raw = str(row[col_map["Difficulty Breathing"]]).strip() if "Difficulty Breathing" in col_map and pd.notna(row[col_map["Difficulty Breathing"]]) else ""
-    parts.append(f"5{yn_map.get(raw.lower(), 0)}")
-
-    # 6) Age (integer)
-    raw = row[col_map["Age"]] if "Age" in col_map else None
-    parts.append(f"6{to_int_str(raw)}")
-
-    # 7) Gender
-    raw = str(row[col_map["Gender"]]).strip() if "Gender" in col_map and pd.notna(row[col_map["Gender"]]) else ""
-    parts.append(f"7{gender_map.get(raw.lower(), 0)}")
-
-    # 8) Blood Pressure
-    raw = str(row[col_map["Blood Pressure"]]).strip() if "Blood Pressure" in col_map and pd.notna(row[col_map["Blood Pressure"]]) else ""
-    parts.append(f"8{bp_map.get(raw.lower(), 0)}")
-
-    # 9) Cholesterol Level (categorical)
-    raw = str(row[col_map["Cholesterol Level"]]).strip() if "Cholesterol Level" in col_map and pd.notna(row[col_map["Cholesterol Level"]]) else ""
-    parts.append(f"9{chol_map.get(raw.lower(), 0)}")
-
-    # 991) Outcome Variable
-    raw = str(row[col_map["Outcome Variable"]]).strip() if "Outcome Variable" in col_map and pd.notna(row[col_map["Outcome Variable"]]) else ""
-    parts.append(f"991{outcome_map.get(raw.lower(), 0)}")
-
-    converted.append(" ".join(parts))
-
-# ---- Save TXT ----
-with open(OUTPUT_PATH, "w", encoding="utf-8") as f:
-    for line in converted:
-        f.write(line + "\n")
+# ---- Build output ----
+def encode_rows(df: pd.DataFrame, col_map: dict) -> list:
+    """Encode df column by column: lower-cased lookups via .map, Age via integer coercion."""
+    n = len(df)
+    columns = []
+    for c, p in zip(expected, item_prefix):
+        if c == "Age":
+            # 6) Age (integer)
+            vals = integral_or_unique(df[col_map[c]], to_int_str) if c in col_map else constant(to_int_str(None), n)
+        elif c in col_map:
+            # Missing / unknown values -> 0
+            vals = df[col_map[c]].str.strip().str.lower().map(value_maps[c]).fillna(0).astype(int).astype(str)
+        else:
+            vals = constant(str(value_maps[c].get("", 0)), n)
+        columns.append(prefixed(p, vals))
+    return join_columns(columns, n)
+
+def save_lines(path: str, converted: list):
+    if is_stdout(path):
+        write_lines(converted)
+        return
+    # ---- Save TXT ----
+    with open_text(path, "w", report=print) as f:
+        for line in converted:
+            f.write(line + "\n")
+
+    print(f"✅ Done! Saved {len(converted)} rows to {path}")
+
+def main():
+    # ---- Load CSV as strings (robust to mixed content) ----
+    df = pd.read_csv(INPUT_PATH, dtype=str)
+    orig_cols = list(df.columns)
+    norm_lookup = {norm_key(c): c for c in orig_cols}
+
+    # Map canonical -> actual column names
+    col_map, missing = {}, []
+    for c in expected:
+        nk = expected_norm[c]
+        if nk in norm_lookup:
+            col_map[c] = norm_lookup[nk]
+        else:
+            missing.append(c)
+
+    # Require at least Disease and Outcome
+    for crit in ["Disease", "Outcome Variable"]:
+        if crit not in col_map:
+            raise ValueError(f"Critical column missing: {crit}. Found columns: {orig_cols}")
+
+    converted = encode_parallel(df, partial(encode_rows, col_map=col_map), workers=N_WORKERS)
+
+    if CODEBOOK_PATH:
+        codebook = Codebook(CODEBOOK_PATH)
+        converted = codebook.encode_lines(converted, expected, item_prefix)
+        codebook.save()
+        print(f"Dense item IDs: {len(codebook)} items in {CODEBOOK_PATH}")
+
+    if CLASS_OUTPUTS:
+        outcome = map_unique(df[col_map["Outcome Variable"]], lambda v: str(outcome_map.get(norm_cat(v), 0)))
+        labels = outcome.tolist()
+        groups, unrouted = route_by_class(converted, labels, CLASS_OUTPUTS)
+        class_of = labels_by_path(CLASS_OUTPUTS)
+        for path, lines in groups.items():
+            save_lines(path, lines)
+            if MATRIX_OUTPUT and not is_stdout(path):
+                save_matrix(path, lines, expected, class_of[path], final_newline=True)
+        report_routing(groups, unrouted)
+    else:
+        save_lines(OUTPUT_PATH, converted)
+        if MATRIX_OUTPUT and not is_stdout(OUTPUT_PATH):
+            save_matrix(OUTPUT_PATH, converted, expected, final_newline=True)
 
-print(f"✅ Done! Saved {len(converted)} rows to {OUTPUT_PATH}")
+if __name__ == "__main__":
+    with status_to_stderr(is_stdout(OUTPUT_PATH) or STDOUT in (CLASS_OUTPUTS or {}).values()):
+        main()
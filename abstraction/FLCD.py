@@ -9,12 +9,37 @@ CSV transformer with custom dot handling:
 
 import os
 import sys
+from functools import partial
+
+import numpy as np
 import pandas as pd
 
+from codebook import Codebook
+from columnar import map_unique
+from compressed import open_text, strip_compression
+from parallel import imap_ordered, resolve_workers, split_rows
+from txmatrix import matrix_path, tokens_to_matrix, write_matrix
+
 # ---- set your CSV file name here ----
 IN_PATH = "FLCDYes.csv"
 # -------------------------------------
 
+# Output name = CSV base name + OUT_SUFFIX; ".txt.gz" or ".txt.zst" writes it compressed
+OUT_SUFFIX = ".txt"
+
+# N_WORKERS > 1 transforms row ranges of CHUNK_ROWS rows in a process pool and
+# reassembles them in the original order. None/0 uses every core; 1 stays single-process.
+N_WORKERS = 1
+CHUNK_ROWS = 50_000
+
+# Set to e.g. "FLCD.codebook.tsv" to write dense consecutive item IDs (one per
+# column/value pair, shared through the codebook file) instead of column-ID+value tokens
+CODEBOOK_PATH = None
+
+# MATRIX_OUTPUT = True also writes the output as a binary transaction matrix next to the
+# text file (FLCDYes.txt -> FLCDYes.txm) for the utility-assignment scripts to memory-map.
+MATRIX_OUTPUT = False
+
 def assign_ids(columns):
     """Assign sequential IDs: 11, 22, 33, ..."""
     return {col: (i + 1) * 11 for i, col in enumerate(columns)}
@@ -51,15 +76,84 @@ def transform_token(s: str) -> str:
     else:
         return s
 
+def transform_cell(v, col_id: str) -> str:
+    """Token of one cell: column ID + transform_token; blank cells stay empty."""
+    if v is None or str(v).strip() == "":
+        return ""
+    return col_id + transform_token(str(v))
+
+def transform_column(col: pd.Series, col_id: str) -> np.ndarray:
+    """
+    transform_cell for a whole column without per-cell string surgery.
+    Distinct values are parsed once into integer and fraction parts and the token
+    is computed arithmetically:
+        int_part * 10**(1 + k) + first k fraction digits      (k = 0..2)
+    zero-padded to its digit count, which is 1 + k when int_part is "0" (the
+    leading zero is dropped: 0.05 -> 5 -> "005"). Values without a dot pass through.
+    Anything else (signs, exponents, leading zeros, non-ASCII, non-strings) goes
+    through transform_cell.
+    """
+    codes, uniques = pd.factorize(col, use_na_sentinel=False)
+    values = uniques.tolist()
+    if not values:
+        return np.empty(len(col), dtype=object)
+    if not all(isinstance(v, str) for v in values):
+        return map_unique(col, partial(transform_cell, col_id=col_id))
+
+    u = np.array(values, dtype=str)
+    # Only plain ASCII without NULs (NumPy treats NUL as padding) is safe to parse
+    points = u.view(np.uint32).reshape(len(u), -1)
+    fast = (points != 0).sum(axis=1) == np.fromiter(map(len, values), dtype=np.int64, count=len(values))
+    fast &= (points < 128).all(axis=1)
+
+    s = np.strings.strip(u)
+    before, dot, after = np.strings.partition(s, ".")
+    frac = np.strings.slice(after, 0, 2)
+    k = np.strings.str_len(frac)
+    n_int = np.strings.str_len(before)
+    is_zero = before == "0"
+    dotted = dot == "."
+    fast &= ~dotted | (
+        np.strings.isdigit(before) & (np.strings.isdigit(frac) | (k == 0))
+        & (n_int <= 15) & (is_zero | ~np.strings.startswith(before, "0"))
+    )
+
+    arith = fast & dotted
+    int_part = np.where(arith, before, "0").astype(np.int64)
+    frac_part = np.where(arith & (k > 0), frac, "0").astype(np.int64)
+    number = int_part * 10 ** (1 + k) + frac_part
+    width = np.where(is_zero, 0, n_int) + 1 + k
+
+    encoded = np.empty(len(values), dtype=object)
+    tokens = np.where(dotted, np.strings.zfill(number.astype(str), width), s)
+    tokens = np.where(s == "", "", np.strings.add(col_id, tokens))
+    encoded[fast] = tokens[fast].tolist()
+    slow = np.flatnonzero(~fast)
+    encoded[slow] = [transform_cell(values[i], col_id) for i in slow]
+    return encoded[codes]
+
 def transform_dataframe(df: pd.DataFrame, col_id_map: dict) -> pd.DataFrame:
     out = pd.DataFrame(index=df.index)
     for col in df.columns:
-        col_id = str(col_id_map[col])
-        out[col] = df[col].map(
-            lambda v: "" if (v is None or str(v).strip() == "") else col_id + transform_token(str(v))
-        )
+        out[col] = transform_column(df[col], str(col_id_map[col]))
     return out
 
+def transform_dataframe_parallel(df: pd.DataFrame, col_id_map: dict, workers=None) -> pd.DataFrame:
+    """transform_dataframe over row ranges in a process pool; row order is preserved."""
+    if resolve_workers(workers) == 1 or len(df) <= CHUNK_ROWS:
+        return transform_dataframe(df, col_id_map)
+    parts = imap_ordered(partial(transform_dataframe, col_id_map=col_id_map),
+                         split_rows(df, CHUNK_ROWS), workers)
+    return pd.concat(list(parts))
+
+def apply_codebook(df_out: pd.DataFrame, col_id_map: dict, codebook: Codebook) -> pd.DataFrame:
+    """Replace column-ID+value tokens with dense item IDs; empty cells stay empty."""
+    for col in df_out.columns:
+        codes, uniques = pd.factorize(df_out[col], use_na_sentinel=False)
+        coded = [codebook.encode_token(str(col), str(col_id_map[col]), tok) for tok in uniques]
+        df_out[col] = np.asarray(coded, dtype=object)[codes]
+    return df_out
+
 def main():
     in_path = IN_PATH
     if not os.path.isfile(in_path):
@@ -76,22 +170,38 @@ def main():
     print("Assigned IDs:", id_map)
 
     try:
-        df_out = transform_dataframe(df, id_map)
+        df_out = transform_dataframe_parallel(df, id_map, workers=N_WORKERS)
+        if CODEBOOK_PATH:
+            codebook = Codebook(CODEBOOK_PATH)
+            df_out = apply_codebook(df_out, id_map, codebook)
+            codebook.save()
+            print(f"Dense item IDs: {len(codebook)} items in {CODEBOOK_PATH}")
     except Exception as e:
         print(f"Transformation failed: {e}", file=sys.stderr)
         sys.exit(1)
 
-    base, _ = os.path.splitext(in_path)
-    out_txt  = f"{base}.txt"
+    base, _ = os.path.splitext(strip_compression(in_path))
+    out_txt  = f"{base}{OUT_SUFFIX}"
 
     try:
         # Write without header row
-        df_out.to_csv(out_txt, sep="\t", index=False, header=False, encoding="utf-8", lineterminator="\n")
+        with open_text(out_txt, "w", newline="", report=print) as f:
+            df_out.to_csv(f, sep="\t", index=False, header=False, lineterminator="\n")
     except Exception as e:
         print(f"Failed to write outputs: {e}", file=sys.stderr)
         sys.exit(1)
 
     print(f"Wrote: {out_txt}")
 
+    if MATRIX_OUTPUT:
+        out_matrix = matrix_path(out_txt)
+        try:
+            write_matrix(out_matrix, tokens_to_matrix(df_out.to_numpy(dtype=str)), list(df_out.columns),
+                         final_newline=True, sep="\t")
+        except (OSError, ValueError) as e:
+            print(f"Failed to write the transaction matrix: {e}", file=sys.stderr)
+            sys.exit(1)
+        print(f"Wrote: {out_matrix}")
+
 if __name__ == "__main__":
     main()
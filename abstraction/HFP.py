@@ -1,7 +1,34 @@
 import pandas as pd
 
-# Load dataset
-df = pd.read_csv("heartNo.csv")
+from codebook import Codebook
+from columnar import join_columns, map_iterrows, prefixed
+from compressed import open_text
+from parallel import encode_parallel
+from partition import labels_by_path, report_routing, route_by_class
+from pipe import STDOUT, is_stdout, status_to_stderr, write_lines
+from txmatrix import save_matrix
+
+INPUT_PATH = "heartNo.csv"
+OUTPUT_PATH = "heartNo.txt"
+# "-" writes the encoded lines to stdout (messages go to stderr), e.g. to pipe them into
+# Utilityassignment/utility_engine.py --stdin without an intermediate file.
+
+# Read the combined heart.csv once and route each row by HeartDisease instead of writing
+# OUTPUT_PATH, e.g. {"1": "heartYes.txt", "0": "heartNo.txt"}. None = single output.
+CLASS_OUTPUTS = None
+
+# N_WORKERS > 1 encodes row ranges in a process pool (output keeps the input row order).
+# None/0 uses every core; 1 stays single-process.
+N_WORKERS = 1
+
+# CODEBOOK_PATH = "HFP.codebook.tsv" writes dense consecutive item IDs (one per
+# feature/value pair) instead of prefix+value tokens. Point the Yes and No runs at the
+# same codebook so both class files share IDs. None keeps the prefix+value tokens.
+CODEBOOK_PATH = None
+
+# MATRIX_OUTPUT = True also writes each output as a binary transaction matrix next to the
+# text file (heartNo.txt -> heartNo.txm) for the utility-assignment scripts to memory-map.
+MATRIX_OUTPUT = False
 
 # Mapping rules
 sex_map = {"M": 1, "F": 0}
@@ -26,45 +53,8 @@ prefixes = {
     "HeartDisease": 899
 }
 
-converted_rows = []
-
-for _, row in df.iterrows():
-    parts = []
-
-    # Age
-    parts.append(f"{prefixes['Age']}{row['Age']}")
-
-    # Sex
-    sex_val = sex_map.get(row['Sex'], row['Sex'])
-    parts.append(f"{prefixes['Sex']}{sex_val}")
-
-    # ChestPainType
-    cp_val = chest_pain_map.get(row['ChestPainType'], row['ChestPainType'])
-    parts.append(f"{prefixes['ChestPainType']}{cp_val}")
-
-    # RestingBP
-    parts.append(f"{prefixes['RestingBP']}{row['RestingBP']}")
-
-    # Cholesterol
-    parts.append(f"{prefixes['Cholesterol']}{row['Cholesterol']}")
-
-    # FastingBS
-    parts.append(f"{prefixes['FastingBS']}{row['FastingBS']}")
-
-    # RestingECG
-    ecg_val = resting_ecg_map.get(row['RestingECG'], row['RestingECG'])
-    parts.append(f"{prefixes['RestingECG']}{ecg_val}")
-
-    # MaxHR
-    parts.append(f"{prefixes['MaxHR']}{row['MaxHR']}")
-
-    # ExerciseAngina
-    angina_val = exercise_angina_map.get(row['ExerciseAngina'], row['ExerciseAngina'])
-    parts.append(f"{prefixes['ExerciseAngina']}{angina_val}")
-
-    # Oldpeak (handle negatives + format)
-    oldpeak_val = row['Oldpeak']
-
+def oldpeak_token(oldpeak_val) -> str:
+    """Oldpeak (handle negatives + format)."""
     if isinstance(oldpeak_val, (int, float)) and oldpeak_val < 0:
         oldpeak_val = "999"
     elif str(oldpeak_val).strip() == ".":
@@ -73,22 +63,68 @@ for _, row in df.iterrows():
         oldpeak_val = str(int(oldpeak_val))
     else:
         oldpeak_val = str(oldpeak_val).replace(".", "0")
+    return oldpeak_val
+
+# Categorical columns; unmapped values are kept as they are
+value_maps = {
+    "Sex": sex_map,
+    "ChestPainType": chest_pain_map,
+    "RestingECG": resting_ecg_map,
+    "ExerciseAngina": exercise_angina_map,
+    "ST_Slope": st_slope_map,
+}
 
-    parts.append(f"{prefixes['Oldpeak']}{oldpeak_val}")
-
-    # ST_Slope
-    slope_val = st_slope_map.get(row['ST_Slope'], row['ST_Slope'])
-    parts.append(f"{prefixes['ST_Slope']}{slope_val}")
-
-    # HeartDisease
-    parts.append(f"{prefixes['HeartDisease']}{row['HeartDisease']}")
-
-    converted_rows.append(" ".join(map(str, parts)))
-
-# Save output
-output_file = "heartNo.txt"
-with open(output_file, "w") as f:
-    for line in converted_rows:
-        f.write(line + "\n")
+def encode_rows(df: pd.DataFrame) -> list:
+    """Encode df column by column; each rule runs once per distinct value of a column."""
+    columns = []
+    for c, p in prefixes.items():
+        if c in value_maps:
+            m = value_maps[c]
+            tokens = map_iterrows(df, c, lambda v, m=m: str(m.get(v, v)))
+        elif c == "Oldpeak":
+            tokens = map_iterrows(df, c, oldpeak_token)
+        else:
+            tokens = map_iterrows(df, c, str)
+        columns.append(prefixed(str(p), tokens))
+    return join_columns(columns, len(df))
+
+def save_lines(output_file: str, converted_rows: list):
+    if is_stdout(output_file):
+        write_lines(converted_rows)
+        return
+    # Save output
+    with open_text(output_file, "w", encoding=None, report=print) as f:
+        for line in converted_rows:
+            f.write(line + "\n")
+
+    print("✅ Conversion complete! Saved to", output_file)
+
+def main():
+    # Load dataset
+    df = pd.read_csv(INPUT_PATH)
+
+    converted_rows = encode_parallel(df, encode_rows, workers=N_WORKERS)
+
+    if CODEBOOK_PATH:
+        codebook = Codebook(CODEBOOK_PATH)
+        converted_rows = codebook.encode_lines(converted_rows, list(prefixes), [str(p) for p in prefixes.values()])
+        codebook.save()
+        print(f"Dense item IDs: {len(codebook)} items in {CODEBOOK_PATH}")
+
+    if CLASS_OUTPUTS:
+        labels = df["HeartDisease"].astype(str).str.strip().tolist()
+        groups, unrouted = route_by_class(converted_rows, labels, CLASS_OUTPUTS)
+        class_of = labels_by_path(CLASS_OUTPUTS)
+        for path, lines in groups.items():
+            save_lines(path, lines)
+            if MATRIX_OUTPUT and not is_stdout(path):
+                save_matrix(path, lines, list(prefixes), class_of[path], final_newline=True)
+        report_routing(groups, unrouted)
+    else:
+        save_lines(OUTPUT_PATH, converted_rows)
+        if MATRIX_OUTPUT and not is_stdout(OUTPUT_PATH):
+            save_matrix(OUTPUT_PATH, converted_rows, list(prefixes), final_newline=True)
 
-print("✅ Conversion complete! Saved to", output_file)
+if __name__ == "__main__":
+    with status_to_stderr(is_stdout(OUTPUT_PATH) or STDOUT in (CLASS_OUTPUTS or {}).values()):
+        main()
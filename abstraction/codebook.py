@@ -0,0 +1,95 @@
+"""
+Dense item IDs with a persisted codebook.
+
+By default an item is its feature prefix followed by its value ("111"+"6",
+"66"+"3106", "9991"+"1"). Those IDs are large and sparse, and two different
+(feature, value) pairs can concatenate to the same digits. With a codebook,
+every (feature, value) pair gets the next consecutive ID (1, 2, 3, ...) and the
+mapping is stored as a tab-separated file:
+
+    id  feature          value  token
+    1   Gender           1      1101
+    2   AgeBaseline      64     11164
+    ...
+
+The file is loaded before encoding and extended with any new pairs, so the Yes
+and No class files of a dataset (and later re-runs) share the same IDs as long
+as they point at the same codebook. IDs start at 1 because SPMF and the pattern
+post-processing only keep positive integers.
+"""
+
+import csv
+import os
+
+FIELDS = ["id", "feature", "value", "token"]
+
+
+class Codebook:
+    def __init__(self, path: str):
+        self.path = path
+        self.ids = {}          # (feature, value) -> id
+        self.entries = []      # [(id, feature, value, token)] in id order
+        self._dirty = False
+        if os.path.exists(path):
+            self.load()
+
+    def load(self):
+        with open(self.path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f, delimiter="\t"):
+                item = int(row["id"])
+                self.ids[(row["feature"], row["value"])] = item
+                self.entries.append((item, row["feature"], row["value"], row["token"]))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def item_id(self, feature: str, value: str, token: str = "") -> int:
+        """Dense ID of (feature, value); unseen pairs get the next ID."""
+        key = (feature, value)
+        item = self.ids.get(key)
+        if item is None:
+            item = len(self.entries) + 1
+            self.ids[key] = item
+            self.entries.append((item, feature, value, token))
+            self._dirty = True
+        return item
+
+    def encode_token(self, feature: str, prefix: str, tok: str) -> str:
+        """Dense ID (as a string) for one prefix+value token; empty tokens stay empty."""
+        if not tok:
+            return tok
+        value = tok[len(prefix):] if prefix and tok.startswith(prefix) else tok
+        return str(self.item_id(feature, value, tok))
+
+    def encode_lines(self, lines, features, prefixes, sep: str = " ") -> list:
+        """
+        Replace every prefix+value token with its dense ID. Token i of a line belongs to
+        features[i]/prefixes[i]; empty tokens (missing cells) stay empty.
+        """
+        per_position = [{} for _ in features]   # token -> id string, per feature
+        out = []
+        for line in lines:
+            tokens = line.split(sep) if line else []
+            if len(tokens) > len(features):
+                raise ValueError(f"Line has {len(tokens)} tokens, expected {len(features)}: {line!r}")
+            for i, tok in enumerate(tokens):
+                if not tok:
+                    continue
+                cache = per_position[i]
+                coded = cache.get(tok)
+                if coded is None:
+                    coded = cache[tok] = self.encode_token(features[i], prefixes[i], tok)
+                tokens[i] = coded
+            out.append(sep.join(tokens))
+        return out
+
+    def save(self):
+        if not self._dirty and os.path.exists(self.path):
+            return
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            w = csv.writer(f, delimiter="\t", lineterminator="\n")
+            w.writerow(FIELDS)
+            w.writerows(self.entries)
+        os.replace(tmp, self.path)
+        self._dirty = False
@@ -0,0 +1,82 @@
+"""
+Column-at-a-time helpers for the abstraction encoders.
+
+The row loops (`for _, row in df.iterrows()` + per-cell string building) are
+replaced by whole-column operations; the per-cell rules stay the scalar helpers
+of each script, but they only run on the distinct values of a column:
+
+    tokens = prefixed("124", map_unique(df["CholesterolBaseline"], convert_numeric))
+    lines = join_columns([tokens_a, tokens_b, ...])
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def map_unique(col: pd.Series, fn) -> np.ndarray:
+    """fn(v) for every cell, computed once per distinct value (NaN included)."""
+    codes, uniques = pd.factorize(col, use_na_sentinel=False)
+    # tolist() yields Python scalars (int/float/str), like the values iterrows() hands out
+    encoded = np.array([fn(v) for v in uniques.tolist()], dtype=object)
+    if len(encoded) == 0:
+        return np.empty(len(col), dtype=object)
+    return encoded[codes]
+
+
+def integral_or_unique(col: pd.Series, fn) -> np.ndarray:
+    """
+    fn(v) for every cell of a numeric column, computed per distinct value with a
+    vectorized fast path: distinct values that parse to an integral float become
+    str(int(value)) in one NumPy pass; the rest (decimals, blanks, markers such as
+    "#NULL!") go through fn. Only valid when fn(v) == str(int(float(v))) for integral v
+    (convert_numeric, to_int_str).
+    """
+    codes, uniques = pd.factorize(col, use_na_sentinel=False)
+    uniques = pd.Series(uniques, dtype=object)
+    num = pd.to_numeric(uniques, errors="coerce").to_numpy(dtype="float64")
+    integral = np.isfinite(num) & (np.abs(num) < 2.0 ** 63)
+    integral[integral] = num[integral] == np.trunc(num[integral])
+
+    encoded = np.empty(len(uniques), dtype=object)
+    encoded[integral] = num[integral].astype(np.int64).astype(str)
+    rest = np.flatnonzero(~integral)
+    encoded[rest] = [fn(v) for v in uniques.iloc[rest].tolist()]
+    if len(encoded) == 0:
+        return np.empty(len(col), dtype=object)
+    return encoded[codes]
+
+
+def map_iterrows(df: pd.DataFrame, col: str, fn) -> np.ndarray:
+    """
+    fn(row[col]) exactly as a df.iterrows() loop sees the cell, once per distinct value.
+    iterrows() upcasts each row to the frame's common dtype: mixed frames hand out
+    Python scalars, all-numeric frames NumPy scalars of the common type ("40" -> 40.0).
+    """
+    dtypes = list(df.dtypes)
+    numeric = bool(dtypes) and all(
+        pd.api.types.is_numeric_dtype(t) and not pd.api.types.is_bool_dtype(t) for t in dtypes)
+    if not numeric:
+        return map_unique(df[col], fn)
+
+    values = df[col].to_numpy(dtype=np.result_type(*dtypes))
+    codes, uniques = pd.factorize(values, use_na_sentinel=False)
+    encoded = np.array([fn(v) for v in uniques], dtype=object)
+    if len(encoded) == 0:
+        return np.empty(len(values), dtype=object)
+    return encoded[codes]
+
+
+def prefixed(prefix: str, tokens) -> np.ndarray:
+    """prefix + token for every token (tokens: array/Series of str), built per distinct token."""
+    return map_unique(pd.Series(tokens, dtype=object), lambda t: prefix + t)
+
+
+def constant(token: str, n: int) -> np.ndarray:
+    return np.full(n, token, dtype=object)
+
+
+def join_columns(columns, n_rows: int, sep: str = " ") -> list:
+    """Assemble one line per row from per-column token arrays."""
+    if not columns:
+        return [""] * n_rows
+    return [sep.join(parts) for parts in zip(*columns)]
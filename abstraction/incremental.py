@@ -0,0 +1,112 @@
+"""
+Manifest bookkeeping for append-only re-encoding of republished extracts.
+
+After a full encode the manifest records what the output covers:
+
+    {"input": ..., "encoding": "utf-8-sig", "columns": [...], "rows": 1234567,
+     "byte_offset": 987654321, "ends_with_newline": true,
+     "prefix_sha256": "<sha256 of input bytes [0, byte_offset)>",
+     "output_bytes": 123456789,
+     "settings": {"codebook": null, "matrix_output": false}}
+
+settings are the encoder options that change what the output looks like (dense
+codebook IDs instead of prefix+value tokens, a .txm next to the text). On the next
+run plan_append() checks that the input still starts with exactly those bytes
+(same size-bounded hash), that the encoding, the settings and the output file are
+unchanged, and returns the byte offset where the new rows begin. Any mismatch
+returns None plus a reason, and the caller rebuilds from scratch.
+"""
+
+import hashlib
+import json
+import os
+
+MANIFEST_SUFFIX = ".manifest.json"
+
+
+def manifest_path(out_path: str) -> str:
+    return out_path + MANIFEST_SUFFIX
+
+
+def prefix_sha256(path: str, nbytes: int, block_bytes: int = 4 * 1024 * 1024) -> str:
+    """sha256 of the first nbytes of path."""
+    h = hashlib.sha256()
+    remaining = nbytes
+    with open(path, "rb") as f:
+        while remaining > 0:
+            block = f.read(min(block_bytes, remaining))
+            if not block:
+                break
+            h.update(block)
+            remaining -= len(block)
+    return h.hexdigest()
+
+
+def load_manifest(out_path: str):
+    try:
+        with open(manifest_path(out_path), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(in_path: str, out_path: str, encoding: str, columns, rows: int, byte_offset: int,
+                   settings: dict = None) -> dict:
+    """Record that out_path holds `rows` encoded rows covering in_path[0:byte_offset], written with settings."""
+    with open(in_path, "rb") as f:
+        f.seek(max(byte_offset - 1, 0))
+        last = f.read(1) if byte_offset else b"\n"
+    manifest = {
+        "input": os.path.abspath(in_path),
+        "encoding": encoding,
+        "columns": list(columns),
+        "rows": rows,
+        "byte_offset": byte_offset,
+        "ends_with_newline": last == b"\n",
+        "prefix_sha256": prefix_sha256(in_path, byte_offset),
+        "output_bytes": os.path.getsize(out_path),
+        "settings": settings or {},
+    }
+    with open(manifest_path(out_path), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def plan_append(in_path: str, out_path: str, encoding: str, manifest, settings: dict = None):
+    """
+    Return (offset, None) where the not-yet-encoded rows start, or (None, reason)
+    when the already-encoded prefix cannot be trusted and a full rebuild is needed.
+    offset == file size means there is nothing new.
+    """
+    if manifest is None:
+        return None, "no manifest"
+    if manifest.get("input") != os.path.abspath(in_path):
+        return None, "manifest was written for a different input"
+    if manifest.get("encoding") != encoding:
+        return None, f"encoding changed ({manifest.get('encoding')} -> {encoding})"
+    if manifest.get("settings", {}) != (settings or {}):
+        return None, f"output settings changed ({manifest.get('settings', {})} -> {settings or {}})"
+    if not os.path.exists(out_path) or os.path.getsize(out_path) != manifest.get("output_bytes"):
+        return None, "output file is missing or was modified"
+
+    offset = manifest["byte_offset"]
+    size = os.path.getsize(in_path)
+    if size < offset:
+        return None, "input is shorter than the encoded prefix"
+    if prefix_sha256(in_path, offset) != manifest["prefix_sha256"]:
+        return None, "encoded prefix changed"
+    if size == offset:
+        return offset, None
+
+    if not manifest["ends_with_newline"]:
+        # The old last row had no line break: it must now end exactly where it did.
+        with open(in_path, "rb") as f:
+            f.seek(offset)
+            nxt = f.read(2)
+        if nxt.startswith(b"\n"):
+            offset += 1
+        elif nxt == b"\r\n":
+            offset += 2
+        else:
+            return None, "last encoded row was extended"
+    return offset, None
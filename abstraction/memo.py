@@ -0,0 +1,100 @@
+"""
+Bounded memoization with hit/miss counters for the per-cell normalizers.
+
+Categorical columns hold only a few dozen distinct raw strings ("65+ years",
+"Laboratory-confirmed case", ...) repeated over millions of rows, so each
+normalizer only has to run once per distinct value:
+
+    @memoize()
+    def age_to_code(v) -> int: ...
+
+    report_caches()   # at the end of a run
+
+Counters are per process; with N_WORKERS > 1 the report covers the main process only.
+"""
+
+import math
+from collections import OrderedDict
+
+DEFAULT_MAXSIZE = 65_536
+
+_NAN = object()          # every NaN shares one cache slot (nan != nan)
+_REGISTRY = []
+
+
+def cache_key(v):
+    """Hashable cache key for a cell value; NaN values map to one shared key."""
+    if isinstance(v, float) and math.isnan(v):
+        return _NAN
+    return v
+
+
+class MemoCache:
+    """LRU cache around fn with hit/miss counters; at most maxsize entries are kept."""
+
+    def __init__(self, fn, maxsize=DEFAULT_MAXSIZE, key=None):
+        self.fn = fn
+        self.maxsize = maxsize
+        self.key = key
+        self.store = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.__name__ = getattr(fn, "__name__", "memo")
+        self.__doc__ = getattr(fn, "__doc__", None)
+
+    def __call__(self, *args, **kwargs):
+        if self.key is not None:
+            k = self.key(*args, **kwargs)
+        else:
+            k = (tuple(cache_key(a) for a in args),
+                 tuple(sorted((n, cache_key(v)) for n, v in kwargs.items())))
+        try:
+            value = self.store[k]
+        except KeyError:
+            pass
+        except TypeError:
+            # Unhashable argument: compute without caching.
+            self.misses += 1
+            return self.fn(*args, **kwargs)
+        else:
+            self.hits += 1
+            self.store.move_to_end(k)
+            return value
+
+        self.misses += 1
+        value = self.fn(*args, **kwargs)
+        self.store[k] = value
+        if len(self.store) > self.maxsize:
+            self.store.popitem(last=False)
+        return value
+
+    def clear(self):
+        self.store.clear()
+        self.hits = self.misses = 0
+
+    def stats(self) -> dict:
+        calls = self.hits + self.misses
+        return {
+            "name": self.__name__, "hits": self.hits, "misses": self.misses,
+            "size": len(self.store), "maxsize": self.maxsize,
+            "hit_rate": (self.hits / calls) if calls else 0.0,
+        }
+
+
+def memoize(maxsize=DEFAULT_MAXSIZE, key=None):
+    """Decorator: wrap fn in a registered MemoCache (key(*args) overrides the default key)."""
+    def wrap(fn):
+        cache = MemoCache(fn, maxsize=maxsize, key=key)
+        _REGISTRY.append(cache)
+        return cache
+    return wrap
+
+
+def report_caches(print_fn=print):
+    """Print hit/miss counters for every cache that was used in this run."""
+    for cache in _REGISTRY:
+        s = cache.stats()
+        if s["hits"] + s["misses"] == 0:
+            continue
+        print_fn(f"cache {s['name']}: {s['hits']} hits, {s['misses']} misses, "
+                 f"{s['size']}/{s['maxsize']} entries ({s['hit_rate']:.1%} hit rate)")
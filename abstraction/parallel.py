@@ -0,0 +1,81 @@
+"""
+Order-preserving process-pool encoding shared by the abstraction scripts.
+
+Every row is encoded independently, so a script can split its DataFrame into
+row ranges, encode them in worker processes and stitch the results back in the
+original row order:
+
+    lines = encode_parallel(df, encode_rows, workers=N_WORKERS)
+
+`encode_rows` must be a module-level function (or a functools.partial of one)
+so it can be pickled, and the calling script must keep its top-level work under
+`if __name__ == "__main__":` so worker processes can import it safely.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_CHUNK_ROWS = 50_000
+
+
+def resolve_workers(workers) -> int:
+    """None/0 -> all cores; otherwise the requested count (at least 1)."""
+    if not workers:
+        return os.cpu_count() or 1
+    return max(1, int(workers))
+
+
+def row_ranges(n_rows: int, chunk_rows: int):
+    """Yield (start, stop) row ranges of at most chunk_rows rows."""
+    chunk_rows = max(1, int(chunk_rows))
+    for start in range(0, n_rows, chunk_rows):
+        yield start, min(start + chunk_rows, n_rows)
+
+
+def imap_ordered(fn, items, workers, max_pending=None):
+    """
+    Apply fn to every item in a process pool and yield the results in input order.
+    At most max_pending items (default 2 x workers) are in flight, so a lazy
+    `items` iterator (e.g. a chunked CSV reader) is never fully materialized.
+    """
+    workers = resolve_workers(workers)
+    if workers == 1:
+        for item in items:
+            yield fn(item)
+        return
+
+    max_pending = max_pending or 2 * workers
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for item in items:
+            pending.append(pool.submit(fn, item))
+            if len(pending) >= max_pending:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def split_rows(df, chunk_rows: int):
+    """Yield consecutive row-range slices of df."""
+    for start, stop in row_ranges(len(df), chunk_rows):
+        yield df.iloc[start:stop]
+
+
+def encode_parallel(df, encode_rows, workers=None, chunk_rows=None) -> list:
+    """
+    Encode df with encode_rows(df_slice) -> list of lines, spread over a process pool.
+    Returns the concatenated lines in the original row order.
+    """
+    workers = resolve_workers(workers)
+    if workers == 1 or len(df) < 2:
+        return encode_rows(df)
+
+    if not chunk_rows:
+        # Several ranges per worker keeps the pool busy when ranges finish unevenly.
+        chunk_rows = min(DEFAULT_CHUNK_ROWS, -(-len(df) // (workers * 4)))
+
+    lines = []
+    for part in imap_ordered(encode_rows, split_rows(df, chunk_rows), workers):
+        lines.extend(part)
+    return lines
@@ -0,0 +1,42 @@
+"""
+Single-pass class partitioning for the abstraction scripts.
+
+Instead of pre-splitting a dataset into Yes/No files and running a script once
+per file, a script can read the combined dataset once, encode every row and
+route each encoded line to its class file by the outcome column:
+
+    CLASS_OUTPUTS = {"1": "CKDYes.txt", "0": "CKDNo.txt"}
+
+Both class files then come from the same parse (and the same codebook, if one is
+used), so they cannot drift apart. Row order within each class follows the input.
+"""
+
+from collections import Counter
+
+
+def route_by_class(lines, labels, outputs: dict):
+    """
+    Group encoded lines by class label. outputs maps label -> output path.
+    Returns ({path: [lines]}, Counter of labels that have no output).
+    """
+    groups = {path: [] for path in outputs.values()}
+    unrouted = Counter()
+    for line, label in zip(lines, labels):
+        path = outputs.get(label)
+        if path is None:
+            unrouted[label] += 1
+        else:
+            groups[path].append(line)
+    return groups, unrouted
+
+
+def labels_by_path(outputs: dict) -> dict:
+    """Output path -> class label (the inverse of CLASS_OUTPUTS)."""
+    return {path: label for label, path in outputs.items()}
+
+
+def report_routing(groups: dict, unrouted: Counter, print_fn=print):
+    for path, lines in groups.items():
+        print_fn(f"Class output {path}: {len(lines)} rows")
+    for label, n in unrouted.items():
+        print_fn(f"⚠️  {n} rows with class value {label!r} have no output in CLASS_OUTPUTS and were skipped.")
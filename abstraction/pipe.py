@@ -0,0 +1,46 @@
+"""
+Standard-output mode for the abstraction scripts.
+
+With OUTPUT_PATH = "-" a script writes its encoded lines to stdout instead of a file
+and its status messages to stderr, so it can feed the utility engine directly:
+
+    python CSD.py | python ../Utilityassignment/utility_engine.py CSD --stdin
+
+The encoded dataset is then never written to or read back from disk. Streaming
+scripts (CSD.py with STREAMING = True) write every chunk as soon as it is encoded.
+"""
+
+import sys
+from contextlib import contextmanager, redirect_stdout
+
+STDOUT = "-"
+
+_stdout = None   # the real stdout while status messages are redirected
+
+
+def is_stdout(path) -> bool:
+    return path == STDOUT
+
+
+@contextmanager
+def status_to_stderr(enabled: bool = True):
+    """Send print() output to stderr, keeping stdout for write_lines()."""
+    global _stdout
+    if not enabled:
+        yield
+        return
+    _stdout = sys.stdout
+    try:
+        with redirect_stdout(sys.stderr):
+            yield
+    finally:
+        _stdout.flush()
+        _stdout = None
+
+
+def write_lines(lines):
+    """Write encoded lines to stdout, each terminated by a line break."""
+    if lines:
+        out = _stdout or sys.stdout
+        out.write("\n".join(lines))
+        out.write("\n")
@@ -0,0 +1,111 @@
+"""
+Columnar snapshot cache for slow spreadsheet reads.
+
+pd.read_excel through openpyxl is much slower than the encoding that follows it,
+so the first read stores the DataFrame as a Feather file next to the source:
+
+    "2. chronic kidney diseasesNo.xlsx"
+    "2. chronic kidney diseasesNo.xlsx.snapshot.feather"
+    "2. chronic kidney diseasesNo.xlsx.snapshot.json"   (source size/mtime/sha256 + read options)
+
+Later runs load the snapshot instead. It is rebuilt when the read options change,
+when the source size changes, or when the mtime changes and the content hash no
+longer matches (a plain `touch` keeps the snapshot). Feather needs pyarrow; without
+it the source is read directly.
+"""
+
+import hashlib
+import json
+import os
+import time
+
+import pandas as pd
+
+SNAPSHOT_SUFFIX = ".snapshot.feather"
+META_SUFFIX = ".snapshot.json"
+
+
+def file_sha256(path: str, block_bytes: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_bytes), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _have_pyarrow() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _load_meta(meta_path: str):
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _snapshot_is_fresh(src: str, snap_path: str, meta_path: str, options: dict) -> bool:
+    meta = _load_meta(meta_path)
+    if meta is None or not os.path.exists(snap_path):
+        return False
+    st = os.stat(src)
+    if meta.get("options") != options or meta.get("size") != st.st_size:
+        return False
+    if meta.get("mtime_ns") == st.st_mtime_ns:
+        return True
+
+    # Same size, new mtime: only the content hash can tell whether it really changed.
+    if meta.get("sha256") != file_sha256(src):
+        return False
+    meta["mtime_ns"] = st.st_mtime_ns
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return True
+
+
+def read_excel_cached(path: str, print_fn=print, **read_kwargs) -> pd.DataFrame:
+    """
+    pd.read_excel(path, **read_kwargs), served from a Feather snapshot when the
+    source is unchanged. Only JSON-serializable read options are supported.
+    """
+    if not _have_pyarrow():
+        print_fn("pyarrow not installed: reading the workbook without a snapshot.")
+        return pd.read_excel(path, **read_kwargs)
+
+    t0 = time.perf_counter()
+    snap_path = path + SNAPSHOT_SUFFIX
+    meta_path = path + META_SUFFIX
+    options = {k: (v.__name__ if isinstance(v, type) else v) for k, v in sorted(read_kwargs.items())}
+
+    if _snapshot_is_fresh(path, snap_path, meta_path, options):
+        df = pd.read_feather(snap_path)
+        # Feather returns missing strings as None; keep read_excel's NaN.
+        df = df.where(df.notna(), float("nan"))
+        print_fn(f"Loaded snapshot {snap_path} in {(time.perf_counter() - t0) * 1000:.1f} ms")
+        return df
+
+    df = pd.read_excel(path, **read_kwargs)
+    read_secs = time.perf_counter() - t0
+
+    # Feather needs unique string column names and a default index.
+    snap = df.reset_index(drop=True)
+    snap.columns = [str(c) for c in snap.columns]
+    if snap.columns.duplicated().any():
+        print_fn("Duplicate column names: snapshot skipped.")
+        return df
+    snap.to_feather(snap_path)
+
+    st = os.stat(path)
+    meta = {
+        "source": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns,
+        "sha256": file_sha256(path), "options": options,
+    }
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    print_fn(f"Read {path} in {read_secs:.2f} s; wrote snapshot {snap_path}")
+    return df
@@ -0,0 +1,67 @@
+"""
+Pick a CSV's text encoding without trial-parsing the whole file once per candidate.
+
+The candidates are tried in the same order the scripts used to try them with
+pd.read_csv, and the first one that decodes the whole file wins:
+
+1) A bounded sample from the head of the file rules out candidates cheaply
+   (e.g. invalid UTF-8 in the first block).
+2) The first surviving candidate is confirmed with an incremental, strict
+   decode of the whole file in fixed-size blocks. Nothing is parsed, so a bad
+   byte near the end costs one decode pass rather than a full DataFrame load.
+
+Encodings that map every byte (latin1) always succeed and need no confirmation.
+"""
+
+import codecs
+import time
+
+SAMPLE_BYTES = 64 * 1024
+BLOCK_BYTES = 4 * 1024 * 1024
+
+_TOTAL_ENCODINGS = {"iso8859-1"}   # codecs.lookup("latin1").name
+
+
+def _decodes(data: bytes, enc: str, final: bool) -> bool:
+    decoder = codecs.getincrementaldecoder(enc)(errors="strict")
+    try:
+        decoder.decode(data, final=final)
+        return True
+    except UnicodeDecodeError:
+        return False
+
+
+def _decodes_file(path: str, enc: str, block_bytes: int) -> bool:
+    decoder = codecs.getincrementaldecoder(enc)(errors="strict")
+    try:
+        with open(path, "rb") as f:
+            while True:
+                block = f.read(block_bytes)
+                if not block:
+                    decoder.decode(b"", final=True)
+                    return True
+                decoder.decode(block, final=False)
+    except UnicodeDecodeError:
+        return False
+
+
+def detect_encoding(path: str, candidates, sample_bytes: int = SAMPLE_BYTES,
+                    block_bytes: int = BLOCK_BYTES):
+    """
+    Return (encoding, seconds_spent): the first candidate that decodes the whole
+    file, or (None, seconds_spent) if none does.
+    """
+    t0 = time.perf_counter()
+    with open(path, "rb") as f:
+        sample = f.read(sample_bytes)
+        whole_file = len(sample) < sample_bytes
+
+    for enc in candidates:
+        if codecs.lookup(enc).name in _TOTAL_ENCODINGS:
+            return enc, time.perf_counter() - t0
+        if not _decodes(sample, enc, final=whole_file):
+            continue
+        if whole_file or _decodes_file(path, enc, block_bytes):
+            return enc, time.perf_counter() - t0
+
+    return None, time.perf_counter() - t0
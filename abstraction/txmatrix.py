@@ -0,0 +1,302 @@
+"""
+Binary transaction matrix: the hand-off between abstraction and utility assignment.
+
+The text outputs ("1101 11164 1220 ...") are re-split line by line by every later
+stage. With MATRIX_OUTPUT the abstraction scripts also write the same rows as a
+fixed-width integer matrix next to the text file (CKDYes.txt -> CKDYes.txm):
+
+    offset 0   fixed header: b"TXMATRIX", version, itemsize (4/8), cols, rows, JSON length
+    offset 32  JSON: {"features": [...], "class": "1" or null, "sep": " ", "final_newline": true/false}
+    padding to a 64-byte boundary, then rows x cols little-endian int32/int64, row-major
+
+Cell j of a row is the item of features[j]; 0 marks a missing cell (items are
+positive integers, as SPMF expects). open_matrix() maps the data with numpy.memmap
+without copying it; read_transactions() yields the same token lists as
+`line.strip().split()` on the text file, so readers accept either format.
+sep and final_newline record the encoder's token separator (a tab for FLCD, a
+space elsewhere) and whether it ended its text file with a line break (CKD, DSPP,
+FLCD, HFP) or not (CSD, DD), so export_text() gives back the same file.
+
+    python txmatrix.py CKDYes.txm             # print the header
+    python txmatrix.py CKDYes.txm out.txt     # export as text, like the encoder wrote it
+"""
+
+import json
+import os
+import struct
+import sys
+
+import numpy as np
+
+from compressed import open_text, strip_compression
+
+MAGIC = b"TXMATRIX"
+VERSION = 1
+MATRIX_SUFFIX = ".txm"
+ALIGN = 64
+_FIXED = struct.Struct("<8sHHIQQ")  # magic, version, itemsize, cols, rows, JSON bytes
+_POWERS = 10 ** np.arange(19, dtype=np.int64)
+
+
+def matrix_path(text_path: str) -> str:
+    """CKDYes.txt (or CKDYes.txt.gz) -> CKDYes.txm"""
+    return os.path.splitext(strip_compression(text_path))[0] + MATRIX_SUFFIX
+
+
+def is_matrix(path: str) -> bool:
+    return path.endswith(MATRIX_SUFFIX)
+
+
+def _data_offset(json_bytes: int) -> int:
+    end = _FIXED.size + json_bytes
+    return -(-end // ALIGN) * ALIGN
+
+
+def _is_item(token: str) -> bool:
+    return token.isascii() and token.isdigit() and token[0] != "0" and int(token) <= np.iinfo(np.int64).max
+
+
+def _checked_items(raw: np.ndarray) -> np.ndarray:
+    """
+    int64 items of an array of token strings; "" becomes 0. Raises ValueError unless
+    every other token is a positive integer written without sign, padding or leading
+    zeros (so that exporting the matrix gives back the same text).
+    """
+    empty = raw == ""
+    try:
+        values = np.where(empty, "0", raw).astype(np.int64)
+        ok = empty | ((values > 0) & (values.astype(str) == raw))
+    except (ValueError, OverflowError):
+        ok = np.zeros(raw.shape, dtype=bool)
+    if not ok.all():
+        bad = next(t for t in raw[~ok].tolist() if t and not _is_item(t))
+        raise ValueError(f"Token {bad!r} is not a positive integer; a transaction matrix needs "
+                         f"integer items (set CODEBOOK_PATH for dense item IDs).")
+    return values
+
+
+def _parse_items(text: str, n_values: int, sep: str):
+    """
+    Fast path of lines_to_matrix/tokens_to_matrix: the items of a "\n"-joined block of
+    lines when every token is empty or 1-18 ASCII digits without a leading zero, else None.
+    """
+    if not text.isascii():
+        return None
+    b = np.frombuffer(text.encode("ascii"), dtype=np.uint8)
+    digit = (b >= ord("0")) & (b <= ord("9"))
+    if not (digit | (b == ord(sep)) | (b == ord("\n"))).all():
+        return None
+    edges = np.diff(np.concatenate(([False], digit, [False])).astype(np.int8))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    if (b[starts] == ord("0")).any() or (ends - starts).max(initial=0) > 18:
+        return None
+
+    # Empty tokens (two delimiters in a row, or one at either end) become "0" so that
+    # every cell is one number; split() takes tabs and line breaks like spaces
+    delim = np.concatenate(([True], ~digit, [True]))
+    b = np.insert(b, np.flatnonzero(delim[:-1] & delim[1:]), ord("0"))
+    values = np.array(b.tobytes().decode("ascii").split(), dtype=np.int64)
+    return values if values.size == n_values else None
+
+
+def lines_to_matrix(lines, n_cols: int, sep: str = " ") -> np.ndarray:
+    """int64 matrix from encoded lines that each hold exactly n_cols sep-separated tokens."""
+    for line in lines:
+        if line.count(sep) != n_cols - 1:
+            raise ValueError(f"Line has {line.count(sep) + 1} tokens, expected {n_cols}: {line!r}")
+    if not lines:
+        return np.zeros((0, n_cols), dtype=np.int64)
+    values = _parse_items("\n".join(lines), len(lines) * n_cols, sep)
+    if values is None:
+        values = _checked_items(np.array(sep.join(lines).split(sep), dtype=str))
+    return values.reshape(len(lines), n_cols)
+
+
+def tokens_to_matrix(tokens) -> np.ndarray:
+    """int64 matrix from a 2-D array of token strings ("" becomes 0)."""
+    raw = np.asarray(tokens, dtype=str)
+    if raw.ndim != 2:
+        raise ValueError(f"Expected a 2-D token array, got shape {raw.shape}")
+    values = _parse_items("\n".join(" ".join(row) for row in raw.tolist()), raw.size, " ")
+    if values is None:
+        values = _checked_items(raw)
+    return values.reshape(raw.shape)
+
+
+class MatrixWriter:
+    """
+    Write a matrix block by block (the row count is patched into the header on close).
+    With append=True an existing matrix of the same features is extended (in its own
+    dtype); it must hold exactly `rows` rows, otherwise ValueError is raised.
+    """
+
+    def __init__(self, path: str, features, class_label=None, dtype=np.int64,
+                 append: bool = False, rows: int = 0, final_newline: bool = False, sep: str = " "):
+        self.path = path
+        self.features = [str(f) for f in features]
+        self.dtype = np.dtype(dtype).newbyteorder("<")
+        if append:
+            header = read_header(path)
+            if header["features"] != self.features:
+                raise ValueError(f"{path} was written for different features")
+            self.dtype = np.dtype(header["dtype"])
+            if header["rows"] != rows:
+                raise ValueError(f"{path} holds {header['rows']} rows, expected {rows}")
+            self.rows = rows
+            self._meta = json.dumps({"features": header["features"], "class": header["class"],
+                                     "sep": header["sep"], "final_newline": header["final_newline"]}).encode("utf-8")
+            self.f = open(path, "r+b")
+            self.f.truncate(header["data_offset"] + rows * len(self.features) * self.dtype.itemsize)
+            self.f.seek(0, os.SEEK_END)
+        else:
+            self.rows = 0
+            self._meta = json.dumps({"features": self.features, "class": class_label,
+                                     "sep": sep, "final_newline": final_newline}).encode("utf-8")
+            self.f = open(path, "wb")
+            self._write_fixed()
+            self.f.write(self._meta)
+            self.f.write(b"\0" * (_data_offset(len(self._meta)) - _FIXED.size - len(self._meta)))
+
+    def _write_fixed(self):
+        self.f.write(_FIXED.pack(MAGIC, VERSION, self.dtype.itemsize, len(self.features),
+                                 self.rows, len(self._meta)))
+
+    def write(self, block: np.ndarray):
+        block = np.asarray(block)
+        if block.ndim != 2 or block.shape[1] != len(self.features):
+            raise ValueError(f"Expected a (rows, {len(self.features)}) block, got {block.shape}")
+        if block.size and block.max() > np.iinfo(self.dtype).max:
+            raise ValueError(f"Item {block.max()} does not fit {self.dtype.name}")
+        self.f.write(np.ascontiguousarray(block, dtype=self.dtype).tobytes())
+        self.rows += len(block)
+
+    def close(self):
+        if self.f.closed:
+            return
+        self.f.seek(0)
+        self._write_fixed()
+        self.f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_matrix(path: str, matrix: np.ndarray, features, class_label=None, final_newline: bool = False,
+                 sep: str = " "):
+    """Write a whole matrix, as int32 when every item fits."""
+    fits32 = matrix.size == 0 or matrix.max() <= np.iinfo(np.int32).max
+    with MatrixWriter(path, features, class_label, np.int32 if fits32 else np.int64,
+                      final_newline=final_newline, sep=sep) as w:
+        w.write(matrix)
+
+
+def save_matrix(text_path: str, lines, features, class_label=None, sep: str = " ", print_fn=print,
+                final_newline: bool = False) -> str:
+    """
+    Write the encoded lines of text_path as its .txm matrix; returns the matrix path.
+    final_newline: text_path ends with a line break (recorded for export_text).
+    """
+    path = matrix_path(text_path)
+    matrix = lines_to_matrix(lines, len(features), sep)
+    write_matrix(path, matrix, features, class_label, final_newline, sep)
+    print_fn(f"Transaction matrix: {matrix.shape[0]} x {matrix.shape[1]} "
+             f"({os.path.getsize(path)} bytes) -> {path}")
+    return path
+
+
+def read_header(path: str) -> dict:
+    with open(path, "rb") as f:
+        fixed = f.read(_FIXED.size)
+        if len(fixed) < _FIXED.size or not fixed.startswith(MAGIC):
+            raise ValueError(f"{path} is not a transaction matrix")
+        _, version, itemsize, cols, rows, json_bytes = _FIXED.unpack(fixed)
+        if version != VERSION:
+            raise ValueError(f"{path}: unsupported matrix version {version}")
+        meta = json.loads(f.read(json_bytes).decode("utf-8"))
+    return {
+        "features": meta["features"], "class": meta.get("class"), "rows": rows, "cols": cols,
+        "sep": meta.get("sep", " "), "final_newline": meta.get("final_newline", False),
+        "itemsize": itemsize, "dtype": f"<i{itemsize}", "data_offset": _data_offset(json_bytes),
+    }
+
+
+def open_matrix(path: str):
+    """(rows x cols read-only memmap, header) of a .txm file."""
+    header = read_header(path)
+    shape = (header["rows"], header["cols"])
+    if 0 in shape:
+        return np.zeros(shape, dtype=header["dtype"]), header
+    data = np.memmap(path, dtype=header["dtype"], mode="r", offset=header["data_offset"], shape=shape)
+    return data, header
+
+
+def read_transactions(path: str, block_rows: int = 65_536):
+    """
+    Yield each transaction as a list of token strings: `line.strip().split()` for a
+    text file, the non-zero cells of each row for a .txm matrix.
+    """
+    if not is_matrix(path):
+        with open_text(path, "r", encoding=None) as f:
+            for line in f:
+                yield line.strip().split()
+        return
+    data, _ = open_matrix(path)
+    for start in range(0, len(data), block_rows):
+        for row in data[start:start + block_rows].tolist():
+            yield [str(v) for v in row if v]
+
+
+def format_rows(block: np.ndarray, sep: str = " ") -> str:
+    """
+    Text of a block of matrix rows, one "\n"-terminated line per row, built with NumPy
+    digit arithmetic instead of str() per cell. Missing cells (0) become empty tokens.
+    """
+    n_rows, n_cols = block.shape
+    if n_rows == 0:
+        return ""
+    values = np.asarray(block, dtype=np.int64).ravel()
+    n_digits = np.searchsorted(_POWERS, values, side="right")
+
+    ends = np.cumsum(n_digits + 1) - 1            # delimiter position of every cell
+    out = np.empty(int(ends[-1]) + 1, dtype=np.uint8)
+    out[ends] = ord(sep)
+    out[ends[n_cols - 1::n_cols]] = ord("\n")
+    rest, pos = values.copy(), ends - 1
+    for j in range(int(n_digits.max(initial=0))):   # last digit first
+        has = n_digits > j
+        if has.all():
+            out[pos] = ord("0") + rest % 10
+        else:
+            out[pos[has]] = ord("0") + rest[has] % 10
+        rest //= 10
+        pos -= 1
+    return out.tobytes().decode("ascii")
+
+
+def export_text(path: str, text_path: str, sep: str = None, block_rows: int = 65_536) -> int:
+    """
+    Write a .txm matrix back out as text: one line per row, tokens separated by the
+    encoder's separator (unless sep is given), missing cells as empty tokens, a line
+    break after the last row only if the encoder wrote one.
+    """
+    data, header = open_matrix(path)
+    with open(text_path, "w", encoding="utf-8") as f:
+        for start in range(0, len(data), block_rows):
+            text = format_rows(data[start:start + block_rows], sep or header["sep"])
+            last = start + block_rows >= len(data)
+            f.write(text[:-1] if last and not header["final_newline"] else text)
+    return len(data)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (2, 3):
+        print("usage: python txmatrix.py MATRIX.txm [OUT.txt]")
+        sys.exit(2)
+    if len(sys.argv) == 2:
+        print(json.dumps(read_header(sys.argv[1]), indent=2))
+    else:
+        rows = export_text(sys.argv[1], sys.argv[2])
+        print(f"✅ Exported {rows} rows to {sys.argv[2]}")
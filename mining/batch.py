@@ -0,0 +1,200 @@
+"""
+Batch SPMF runs from the command line instead of the GUI (README step 2).
+
+A run matrix (MATRIX below, or a JSON file with the same shape) lists the datasets
+with the HUIM/USPAN file of every class, and the SPMF algorithms with the input
+format they read and one parameter list per threshold. Every dataset x class x
+algorithm x parameter list is one job:
+
+    java -Xmx<JAVA_HEAP> -jar spmf.jar run <algorithm> <input> <output> <params...>
+
+Jobs run in a pool of MAX_WORKERS at a time, each with a timeout and a JVM heap
+cap. Finished outputs are cached in CACHE_DIR under a key made of the input file's
+SHA-256, the SPMF jar's SHA-256, the algorithm and the parameters; a job whose key
+is cached is never run again, its output is copied from the cache. Failed and
+timed-out jobs are not cached.
+
+A summary table (dataset, class, algorithm, parameters, status, seconds, patterns,
+output) is printed and written to SUMMARY_FILE.
+
+    python batch.py                          # MATRIX
+    python batch.py runs.json --workers 4    # matrix from a file
+    python batch.py runs.json --list         # show the jobs only
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "abstraction"))
+from snapshot import file_sha256
+from spmf_io import spmf_command
+
+# -----------------------------
+# Configurations
+# -----------------------------
+SPMF_JAR = "spmf.jar"
+JAVA = "java"                # or a stub script with the same command line, for testing
+MAX_WORKERS = 2              # SPMF jobs at a time
+TIMEOUT_SECONDS = 3600       # per job
+JAVA_HEAP = "4g"             # -Xmx of every job (None = JVM default)
+OUTPUT_DIR = "spmf_outputs"
+CACHE_DIR = "spmf_cache"
+SUMMARY_FILE = "batch_summary.tsv"
+
+MATRIX = {
+    # dataset -> class -> input file per format
+    "datasets": {
+        "CKD": {"Yes": {"huim": "CKDYesHUIM.txt", "uspan": "CKDYesHUIMUSPAN.txt"},
+                "No": {"huim": "CKDNoHUIM.txt", "uspan": "CKDNoHUIMUSPAN.txt"}},
+    },
+    # SPMF algorithm -> input format and one parameter list per threshold
+    "algorithms": {
+        "EFIM": {"input": "huim", "params": [["20000"], ["40000"]]},
+        "FCHM_bond": {"input": "huim", "params": [["20000", "0.5"]]},
+        "USpan": {"input": "uspan", "params": [["20000", "5"]]},
+        "HUSRM": {"input": "uspan", "params": [["20000", "0.5", "4", "4"]]},
+    },
+}
+
+SUMMARY_COLUMNS = ["dataset", "class", "algorithm", "params", "status", "seconds", "patterns", "output"]
+
+
+def jobs(matrix: dict) -> list:
+    """One dict per dataset x class x algorithm x parameter list."""
+    out = []
+    for dataset, classes in matrix["datasets"].items():
+        for label, files in classes.items():
+            for algorithm, spec in matrix["algorithms"].items():
+                input_file = files.get(spec["input"])
+                if input_file is None:
+                    continue
+                for params in spec["params"]:
+                    params = [str(p) for p in params]
+                    name = f"{dataset}{label}_{algorithm}_{'_'.join(params)}.txt"
+                    out.append({"dataset": dataset, "class": label, "algorithm": algorithm,
+                                "params": params, "input": input_file,
+                                "output": os.path.join(OUTPUT_DIR, dataset, algorithm, name)})
+    return out
+
+
+def cache_key(job: dict, jar_sha256: str) -> str:
+    """SHA-256 of the input contents, the SPMF jar, the algorithm and the parameters."""
+    h = hashlib.sha256()
+    h.update(file_sha256(job["input"]).encode("ascii"))
+    h.update(jar_sha256.encode("ascii"))
+    h.update(json.dumps([job["algorithm"], job["params"]]).encode("utf-8"))
+    return h.hexdigest()
+
+
+def count_patterns(path: str) -> int:
+    """Non-empty lines of an SPMF output (one pattern or rule per line)."""
+    with open(path, "rb") as f:
+        return sum(1 for line in f if line.strip())
+
+
+def run_job(job: dict, jar: str, jar_sha256: str, timeout: float = TIMEOUT_SECONDS,
+            java: str = JAVA, heap: str = JAVA_HEAP) -> dict:
+    """Run (or fetch from the cache) one job; returns its summary row."""
+    row = {**job, "params": " ".join(job["params"]), "seconds": "", "patterns": ""}
+    if not os.path.exists(job["input"]):
+        return {**row, "status": "missing input"}
+    key = cache_key(job, jar_sha256)
+    cached, meta_path = os.path.join(CACHE_DIR, key + ".txt"), os.path.join(CACHE_DIR, key + ".json")
+    os.makedirs(os.path.dirname(job["output"]), exist_ok=True)
+    if os.path.exists(cached) and os.path.exists(meta_path):
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        shutil.copyfile(cached, job["output"])
+        return {**row, "status": "cached", "seconds": meta["seconds"], "patterns": meta["patterns"]}
+
+    options = [f"-Xmx{heap}"] if heap else []
+    try:
+        cmd = spmf_command(jar, job["algorithm"], job["input"], job["output"], job["params"], java, options)
+    except FileNotFoundError as e:
+        return {**row, "status": f"error: {e}"}
+    if os.path.exists(job["output"]):
+        os.remove(job["output"])   # a run that writes nothing must not pass off the last output as its own
+    t0 = time.perf_counter()
+    try:
+        result = subprocess.run(cmd, timeout=timeout, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    except subprocess.TimeoutExpired:
+        return {**row, "status": "timeout", "seconds": f"{time.perf_counter() - t0:.2f}"}
+    seconds = f"{time.perf_counter() - t0:.2f}"
+    if result.returncode != 0 or not os.path.exists(job["output"]):
+        err = result.stderr.decode("utf-8", "replace").strip().splitlines()
+        detail = err[-1][:120] if err else "no output file"
+        return {**row, "status": f"exit {result.returncode}: {detail}", "seconds": seconds}
+
+    patterns = count_patterns(job["output"])
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    tmp = f"{cached}.{id(job)}.tmp"   # jobs with the same key may finish together
+    shutil.copyfile(job["output"], tmp)
+    os.replace(tmp, cached)
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump({"job": job, "seconds": seconds, "patterns": patterns}, f, indent=2)
+    return {**row, "status": "ok", "seconds": seconds, "patterns": patterns}
+
+
+def write_summary(rows: list, path: str = SUMMARY_FILE):
+    """Write the summary TSV and print it as a table."""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\t".join(SUMMARY_COLUMNS) + "\n")
+        for r in rows:
+            f.write("\t".join(str(r[c]) for c in SUMMARY_COLUMNS) + "\n")
+    shown = SUMMARY_COLUMNS[:-1]
+    widths = {c: max([len(c)] + [len(str(r[c])) for r in rows]) for c in shown}
+    print("  ".join(c.ljust(widths[c]) for c in shown))
+    for r in rows:
+        print("  ".join(str(r[c]).ljust(widths[c]) for c in shown))
+
+
+def run_matrix(matrix: dict, jar: str = SPMF_JAR, workers: int = MAX_WORKERS,
+               timeout: float = TIMEOUT_SECONDS, java: str = JAVA, heap: str = JAVA_HEAP) -> list:
+    """Run every job of the matrix; returns the summary rows in job order."""
+    todo = jobs(matrix)
+    jar_sha256 = file_sha256(jar) if os.path.exists(jar) else ""
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        # every job is its own java process; the threads only wait for them
+        rows = list(pool.map(lambda j: run_job(j, jar, jar_sha256, timeout, java, heap), todo))
+    secs = time.perf_counter() - t0
+    ok = sum(r["status"] == "ok" for r in rows)
+    cached = sum(r["status"] == "cached" for r in rows)
+    print(f"✅ {len(rows)} jobs in {secs:.2f} s: {ok} run, {cached} from cache, "
+          f"{len(rows) - ok - cached} failed")
+    return rows
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Run a matrix of SPMF jobs from the command line.")
+    parser.add_argument("matrix", nargs="?", help="JSON run matrix (default: MATRIX in batch.py)")
+    parser.add_argument("--jar", default=SPMF_JAR, help="SPMF jar")
+    parser.add_argument("--java", default=JAVA, help="java executable (or a stub for testing)")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="jobs at a time")
+    parser.add_argument("--timeout", type=float, default=TIMEOUT_SECONDS, help="seconds per job")
+    parser.add_argument("--heap", default=JAVA_HEAP, help="JVM heap cap per job, e.g. 4g")
+    parser.add_argument("--list", action="store_true", help="list the jobs without running them")
+    args = parser.parse_args(argv)
+
+    matrix = MATRIX
+    if args.matrix:
+        with open(args.matrix, "r", encoding="utf-8") as f:
+            matrix = json.load(f)
+    if args.list:
+        for job in jobs(matrix):
+            print(f"• {job['algorithm']} {job['input']} {' '.join(job['params'])} -> {job['output']}")
+        return
+    rows = run_matrix(matrix, args.jar, args.workers, args.timeout, args.java, args.heap)
+    write_summary(rows)
+    print(f"Summary written to {SUMMARY_FILE}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
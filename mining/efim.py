@@ -0,0 +1,212 @@
+"""
+EFIM high-utility itemset mining in-process, on the HUIM files of utility_engine.py.
+
+EFIM (Zida et al., 2015) as in SPMF, without the Java GUI:
+
+- Items whose TWU is below minutil are removed and the rest renamed 1..n in
+  increasing TWU order; every transaction is sorted in that order.
+- Transactions are stored array-style: an items tuple and a utilities list shared
+  by every projection, plus an offset, the utility of the prefix in that
+  transaction and the utility of the items after the offset. Projecting on an item
+  only moves the offset. Before an itemset is extended its projected database is
+  reduced to Secondary(itemset), the items with enough local utility to extend
+  it; a transaction that loses no item keeps sharing its arrays.
+- Transaction merging: projected transactions with the same remaining items are
+  merged into one (utilities and prefix utilities summed), so a projected database
+  holds at most one transaction per distinct reduced suffix.
+- Pruning with utility bins: an item is explored only if its sub-tree utility
+  reaches minutil and kept as an extension only if its local utility does.
+
+The output is SPMF's "v1 v2 ... #UTIL: <utility>" (spmf_io.py), so
+pattern_postprocessing/ reads it unchanged.
+
+    python efim.py CKDYesHUIM.txt CKD_patterns.txt 20000
+    python efim.py CKDYesHUIM.txt CKD_patterns.txt 5%          # of the total utility
+    python efim.py CKDYesHUIM.txt CKD_patterns.txt 5% --spmf spmf.jar   # benchmark
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from bisect import bisect_left
+
+from spmf_io import item_key, parse_minutil, read_huim, read_patterns, run_spmf, write_patterns
+
+# -----------------------------
+# Configurations
+# -----------------------------
+SPMF_JAR = "spmf.jar"        # for --spmf without a path
+MAX_LENGTH = None            # longest itemset mined (None = no limit)
+
+
+def _add_transaction(db: dict, items: tuple, utils: list, offset: int, prefix_utility: int,
+                     secondary: set = None) -> bool:
+    """
+    Insert a (projected) transaction into db, reduced to the items in secondary and
+    merged with one that has the same items; False if no item is left.
+    """
+    if secondary is not None and not secondary.issuperset(items[offset:]):
+        kept = [k for k in range(offset, len(items)) if items[k] in secondary]
+        if not kept:
+            return False
+        items, utils, offset = tuple(items[k] for k in kept), [utils[k] for k in kept], 0
+    key = items[offset:] if offset else items
+    rest = sum(utils[offset:])
+    t = db.get(key)
+    if t is None:
+        db[key] = [items, utils, offset, prefix_utility, rest]
+    else:
+        merged = [a + b for a, b in zip(t[1][t[2]:], utils[offset:])]
+        db[key] = [key, merged, 0, t[3] + prefix_utility, t[4] + rest]
+    return True
+
+
+class EFIM:
+    """One EFIM run; mine() returns [(items, utility)] in the input's item names."""
+
+    def __init__(self, minutil: int, max_length: int = MAX_LENGTH):
+        self.minutil = minutil
+        self.max_length = max_length
+        self.names = []
+        self.patterns = []
+        self.candidates = 0
+        self.merged = 0
+
+    def mine(self, transactions) -> list:
+        minutil = self.minutil
+        twu = {}
+        for items, _, tu in transactions:
+            for item in items:
+                twu[item] = twu.get(item, 0) + tu
+        promising = sorted((i for i, w in twu.items() if w >= minutil), key=lambda i: (twu[i], item_key(i)))
+        self.names = [None] + promising
+        new_id = {item: n for n, item in enumerate(promising, 1)}
+
+        db = {}
+        n_kept = 0
+        for items, utils, _ in transactions:
+            pairs = sorted((new_id[i], u) for i, u in zip(items, utils) if i in new_id)
+            if pairs:
+                _add_transaction(db, tuple(p[0] for p in pairs), [p[1] for p in pairs], 0, 0)
+                n_kept += 1
+        self.merged += n_kept - len(db)
+
+        # sub-tree utility of every item at the first level
+        su = [0] * len(self.names)
+        for items, utils, _, _, _ in db.values():
+            remaining = 0
+            for k in range(len(items) - 1, -1, -1):
+                remaining += utils[k]
+                su[items[k]] += remaining
+        keep = list(range(1, len(self.names)))
+        explore = [i for i in keep if su[i] >= minutil]
+        self._search((), list(db.values()), keep, explore)
+        return self._named(self.patterns)
+
+    def _named(self, patterns) -> list:
+        return [(tuple(self.names[i] for i in items), utility) for items, utility in patterns]
+
+    def _found(self, itemset: tuple, utility: int):
+        self.patterns.append((itemset, utility))
+
+    def _search(self, prefix: tuple, transactions: list, keep: list, explore: list):
+        # self.minutil is read at every step: a top-k run raises it while searching
+        for e in explore:
+            projected = {}
+            utility = support = n_projected = 0
+            for items, utils, offset, prefix_utility, _ in transactions:
+                pos = bisect_left(items, e, offset)
+                if pos == len(items) or items[pos] != e:
+                    continue
+                pu = prefix_utility + utils[pos]
+                utility += pu
+                support += 1
+                if pos + 1 < len(items):
+                    _add_transaction(projected, items, utils, pos + 1, pu)
+                    n_projected += 1
+            self.candidates += 1
+            self.merged += n_projected - len(projected)
+            itemset = prefix + (e,)
+            if support and utility >= self.minutil:
+                self._found(itemset, utility)
+            if not projected or (self.max_length and len(itemset) >= self.max_length):
+                continue
+
+            # local and sub-tree utilities of the items after e (utility bins); after the
+            # reduction every item of a projected transaction is one of them
+            later = keep[bisect_left(keep, e) + 1:]
+            lu = dict.fromkeys(later, 0)
+            su = dict.fromkeys(later, 0)
+            for items, utils, offset, pu, rest in projected.values():
+                remaining = 0
+                for k in range(len(items) - 1, offset - 1, -1):
+                    item = items[k]
+                    remaining += utils[k]
+                    su[item] += remaining + pu
+                    lu[item] += rest + pu
+            minutil = self.minutil
+            new_keep = [i for i in later if lu[i] >= minutil]
+            new_explore = [i for i in new_keep if su[i] >= minutil]
+            if not new_explore:
+                continue
+            if len(new_keep) < len(later):
+                # reduce to Secondary(itemset) and merge again
+                reduced, n_reduced, secondary = {}, 0, set(new_keep)
+                for t in projected.values():
+                    n_reduced += _add_transaction(reduced, t[0], t[1], t[2], t[3], secondary)
+                self.merged += n_reduced - len(reduced)
+                projected = reduced
+            self._search(itemset, list(projected.values()), new_keep, new_explore)
+
+
+def mine_file(input_file: str, minutil, max_length: int = MAX_LENGTH):
+    """(patterns, EFIM run, absolute minutil, seconds) for a HUIM file; minutil may be "5%"."""
+    t0 = time.perf_counter()
+    transactions = read_huim(input_file)
+    minutil = parse_minutil(minutil, sum(tu for _, _, tu in transactions))
+    efim = EFIM(minutil, max_length)
+    patterns = efim.mine(transactions)
+    return patterns, efim, minutil, time.perf_counter() - t0
+
+
+def benchmark(input_file: str, output_file: str, minutil: int, seconds: float, jar: str):
+    """Run SPMF's EFIM on the same file and threshold and compare runtime and patterns."""
+    spmf_output = os.path.splitext(output_file)[0] + "_spmf.txt"
+    try:
+        spmf_seconds = run_spmf(jar, "EFIM", input_file, spmf_output, minutil)
+    except (OSError, subprocess.SubprocessError) as e:
+        print(f"⚠️ SPMF benchmark skipped: {e}")
+        return
+    ours, theirs = read_patterns(output_file), read_patterns(spmf_output)
+    ours = {frozenset(k): v for k, v in ours.items()}
+    theirs = {frozenset(k): v for k, v in theirs.items()}
+    same = "same patterns" if ours == theirs else f"⚠️ patterns differ ({len(ours)} vs {len(theirs)})"
+    print(f"• SPMF EFIM: {spmf_seconds:.2f} s (JVM start included), native: {seconds:.2f} s "
+          f"({spmf_seconds / max(seconds, 1e-9):.1f}x), {same}")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Mine high-utility itemsets from a HUIM file with EFIM.")
+    parser.add_argument("input", help="HUIM file (items:TU:utilities)")
+    parser.add_argument("output", help="pattern file in SPMF's #UTIL: format")
+    parser.add_argument("minutil", help="minimum utility, absolute or a percentage of the total utility (5%%)")
+    parser.add_argument("--max-length", type=int, default=MAX_LENGTH, help="longest itemset to mine")
+    parser.add_argument("--spmf", nargs="?", const=SPMF_JAR, metavar="JAR",
+                        help="also run SPMF's EFIM and compare runtime and patterns")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input):
+        print(f"❌ Input file not found: {args.input}")
+        sys.exit(1)
+    patterns, efim, minutil, secs = mine_file(args.input, args.minutil, args.max_length)
+    n = write_patterns(args.output, patterns)
+    print(f"✅ EFIM {args.input}: {n} high-utility itemsets (minutil {minutil}) in {secs:.2f} s, "
+          f"{efim.candidates} candidates, {efim.merged} transactions merged -> {args.output}")
+    if args.spmf:
+        benchmark(args.input, args.output, minutil, secs, args.spmf)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,147 @@
+"""
+SPMF file formats shared by the native miners.
+
+    HUIM input      "v1 v2 ... vk:<transaction utility>:u1 u2 ... uk"   (utility_engine.py)
+    USPAN input     "v1[u1] -1 v2[u2] -1 ... -2 SUtility:<utility>"     (utility_engine.py)
+    pattern output  "v1 v2 ... #UTIL: <utility>"  (itemsets)
+                    "v1 -1 v2 -1 #UTIL: <utility>"  (sequences)
+
+The pattern files are what SPMF writes, so pattern_postprocessing/ reads the
+output of the native miners and of SPMF alike. Items are kept as the tokens of the
+input file; any file may be .gz/.zst (abstraction/compressed.py).
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "abstraction"))
+from compressed import open_text
+
+SPMF_COMMENT = ("#", "%", "@")   # lines SPMF skips in its input files
+UTIL_TAG = "#UTIL:"
+
+
+def item_key(token: str):
+    """Sort key of an item like SPMF's integer items: numeric order, then text."""
+    return (0, int(token), "") if token.lstrip("-").isdigit() else (1, 0, token)
+
+
+def read_huim(path: str) -> list:
+    """
+    Transactions of a HUIM file as (items, utilities, transaction utility). Utilities
+    beyond the last item are ignored (like SPMF); an item listed twice in a line is
+    one item with the summed utility.
+    """
+    transactions = []
+    with open_text(path, "r", encoding=None) as f:
+        for n, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith(SPMF_COMMENT):
+                continue
+            try:
+                items, tu, utils = line.split(":")
+                item_utils = {}
+                for item, u in zip(items.split(), utils.split()):
+                    item_utils[item] = item_utils.get(item, 0) + int(u)
+                transactions.append((list(item_utils), list(item_utils.values()), int(tu)))
+            except ValueError:
+                raise ValueError(f"{path}:{n}: not a HUIM line: {line[:80]!r}") from None
+    return transactions
+
+
+def read_uspan(path: str) -> list:
+    """
+    Sequences of a USPAN file as (itemsets, sequence utility); every itemset is a
+    list of (item, utility).
+    """
+    sequences = []
+    with open_text(path, "r", encoding=None) as f:
+        for n, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith(SPMF_COMMENT):
+                continue
+            itemsets, current, su = [], [], None
+            try:
+                for token in line.split():
+                    if token == "-1":
+                        itemsets.append(current)
+                        current = []
+                    elif token == "-2" or token.startswith("SUtility:"):
+                        break
+                    else:
+                        item, u = token.rstrip("]").split("[")
+                        current.append((item, int(u)))
+                tail = line.rsplit("SUtility:", 1)
+                su = int(tail[1].split()[0]) if len(tail) == 2 else None
+            except ValueError:
+                raise ValueError(f"{path}:{n}: not a USPAN line: {line[:80]!r}") from None
+            if current:
+                itemsets.append(current)
+            if su is None:
+                su = sum(u for itemset in itemsets for _, u in itemset)
+            sequences.append((itemsets, su))
+    return sequences
+
+
+def parse_minutil(value, total_utility: int) -> int:
+    """Absolute minutil from "12000" or "2.5%" (of the database's total utility)."""
+    value = str(value).strip()
+    if value.endswith("%"):
+        return int(float(value[:-1]) / 100 * total_utility)
+    return int(value)
+
+
+def write_patterns(path: str, patterns, sequences: bool = False) -> int:
+    """
+    Write (items, utility) patterns in SPMF's format; returns the number of patterns.
+    For sequences the items are the itemsets (tuples of items), each closed by -1.
+    """
+    n = 0
+    with open_text(path, "w") as f:
+        for items, utility in patterns:
+            if sequences:
+                text = " ".join(" ".join(itemset) + " -1" for itemset in items)
+            else:
+                text = " ".join(items)
+            f.write(f"{text} {UTIL_TAG} {utility}\n")
+            n += 1
+    return n
+
+
+def read_patterns(path: str) -> dict:
+    """{items (tuple, -1 separators dropped): utility} of an SPMF pattern file."""
+    patterns = {}
+    with open_text(path, "r", encoding=None, errors="ignore") as f:
+        for line in f:
+            if UTIL_TAG not in line:
+                continue
+            head, tail = line.split(UTIL_TAG, 1)
+            items = tuple(t for t in head.split() if t not in ("-1", "-2"))
+            patterns[items] = int(tail.split()[0])
+    return patterns
+
+
+def spmf_command(jar: str, algorithm: str, input_file: str, output_file: str, params=(),
+                 java: str = "java", java_options=()) -> list:
+    """`java [options] -jar <jar> run <algorithm> <input> <output> <params...>`; checks java and the jar."""
+    if shutil.which(java) is None:
+        raise FileNotFoundError(f"{java} not found on PATH")
+    if not os.path.exists(jar):
+        raise FileNotFoundError(f"SPMF jar not found: {jar}")
+    return [java, *java_options, "-jar", jar, "run", algorithm, input_file, output_file, *map(str, params)]
+
+
+def run_spmf(jar: str, algorithm: str, input_file: str, output_file: str, *params,
+             timeout: float = None, java: str = "java", java_options=()) -> float:
+    """
+    Run SPMF from the command line (spmf_command); returns the wall-clock seconds.
+    Raises FileNotFoundError without java or the jar and CalledProcessError/
+    TimeoutExpired when the run fails.
+    """
+    cmd = spmf_command(jar, algorithm, input_file, output_file, params, java, java_options)
+    t0 = time.perf_counter()
+    subprocess.run(cmd, check=True, timeout=timeout, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    return time.perf_counter() - t0
@@ -0,0 +1,189 @@
+"""
+Threshold sweep: mine once at the lowest minutil, answer every higher one by filtering.
+
+Every itemset (sequence) with utility >= minutil is also found at any lower
+minutil, and EFIM/USpan visit the search tree in the same order whatever the
+threshold. So the pattern file of a higher threshold is exactly the lowest
+threshold's file with the lines below it removed. The sweep mines once and keeps
+the result as a pattern store:
+
+    CKDYesHUIM.efim.patterns.txt   every pattern of the lowest minutil, in mining order (SPMF format)
+    CKDYesHUIM.efim.index.npz      utilities, line offsets, utility-sorted order, run settings
+
+A threshold is answered with one binary search in the utility-sorted order; the
+selected lines are copied from the store in mining order. A later sweep on the same
+input (same SHA-256 and settings) reuses the store when its minutil is low enough,
+without mining at all.
+
+    python sweep.py efim CKDYesHUIM.txt 1% 2% 5% 10%
+    python sweep.py uspan CKDYesHUIMUSPAN.txt 3000 5000 8000 --max-length 4 --compare
+
+--compare also mines every threshold independently, checks that the files are
+identical and reports the time saved.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "abstraction"))
+import efim
+import uspan
+from compressed import strip_compression
+from snapshot import file_sha256
+from spmf_io import parse_minutil, read_huim, read_uspan, write_patterns
+
+# -----------------------------
+# Configurations
+# -----------------------------
+STORE_DIR = "sweep_store"    # pattern stores, one per input file and algorithm
+OUTPUT_SUFFIX = "_{minutil}.txt"
+
+ALGORITHMS = {
+    # name: (reader, miner class, total utility of the input, sequence output)
+    "efim": (read_huim, efim.EFIM, lambda db: sum(tu for _, _, tu in db), False),
+    "uspan": (read_uspan, uspan.USpan, lambda db: sum(su for _, su in db), True),
+}
+
+
+class PatternStore:
+    """Patterns of one run in mining order, indexed by utility."""
+
+    def __init__(self, path: str, meta: dict, utilities: np.ndarray, offsets: np.ndarray):
+        self.path, self.meta = path, meta
+        self.utilities = utilities
+        self.offsets = offsets                                   # len(utilities) + 1 line offsets
+        self.order = np.argsort(-utilities, kind="stable")       # highest utility first
+        self.sorted_utilities = utilities[self.order]
+
+    @classmethod
+    def build(cls, prefix: str, patterns: list, meta: dict, sequences: bool) -> "PatternStore":
+        path = prefix + ".patterns.txt"
+        write_patterns(path, patterns, sequences=sequences)
+        with open(path, "rb") as f:
+            lengths = [len(line) for line in f]
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        utilities = np.array([u for _, u in patterns], dtype=np.int64)
+        np.savez(prefix + ".index.npz", utilities=utilities, offsets=offsets, meta=json.dumps(meta))
+        return cls(path, meta, utilities, offsets)
+
+    @classmethod
+    def load(cls, prefix: str):
+        """The store at prefix, or None if there is none."""
+        path, index = prefix + ".patterns.txt", prefix + ".index.npz"
+        if not (os.path.exists(path) and os.path.exists(index)):
+            return None
+        with np.load(index) as z:
+            return cls(path, json.loads(str(z["meta"])), z["utilities"], z["offsets"])
+
+    def count(self, minutil: int) -> int:
+        """Number of patterns with utility >= minutil."""
+        return int(np.searchsorted(-self.sorted_utilities, -minutil, side="right"))
+
+    def write(self, minutil: int, output_file: str) -> int:
+        """Write the patterns of minutil (in mining order) to output_file; returns their number."""
+        rows = np.sort(self.order[:self.count(minutil)])
+        with open(self.path, "rb") as f:
+            data = f.read()
+        starts, ends = self.offsets[rows], self.offsets[rows + 1]
+        with open(output_file, "wb") as out:
+            out.write(b"".join(data[a:b] for a, b in zip(starts.tolist(), ends.tolist())))
+        return len(rows)
+
+
+def _store_prefix(input_file: str, algorithm: str) -> str:
+    stem = os.path.splitext(os.path.basename(strip_compression(input_file)))[0]
+    return os.path.join(STORE_DIR, f"{stem}.{algorithm}")
+
+
+def output_path(input_file: str, minutil: int) -> str:
+    """CKDYesHUIM.txt, 4512 -> CKDYesHUIM_4512.txt"""
+    return os.path.splitext(strip_compression(input_file))[0] + OUTPUT_SUFFIX.format(minutil=minutil)
+
+
+def mine(algorithm: str, db: list, minutil: int, max_length):
+    _, miner, _, _ = ALGORITHMS[algorithm]
+    return miner(minutil, max_length).mine(db)
+
+
+def sweep(algorithm: str, input_file: str, thresholds, max_length=None, compare: bool = False,
+          print_fn=print) -> dict:
+    """Write the pattern file of every threshold; returns {minutil: output file}."""
+    reader, _, total_utility, sequences = ALGORITHMS[algorithm]
+    t0 = time.perf_counter()
+    db = reader(input_file)
+    t_read = time.perf_counter() - t0
+    levels = sorted({parse_minutil(t, total_utility(db)) for t in thresholds})
+    lowest = levels[0]
+
+    meta = {"algorithm": algorithm, "input_sha256": file_sha256(input_file), "max_length": max_length}
+    prefix = _store_prefix(input_file, algorithm)
+    store = PatternStore.load(prefix)
+    if store is not None and ({k: store.meta.get(k) for k in meta} != meta or store.meta["minutil"] > lowest):
+        store = None
+    t_mine = 0.0
+    if store is None:
+        t1 = time.perf_counter()
+        patterns = mine(algorithm, db, lowest, max_length)
+        t_mine = time.perf_counter() - t1
+        os.makedirs(STORE_DIR, exist_ok=True)
+        store = PatternStore.build(prefix, patterns, {**meta, "minutil": lowest}, sequences)
+        print_fn(f"✅ {algorithm} {input_file}: mined once at minutil {lowest} in {t_mine:.2f} s, "
+                 f"{len(store.utilities)} patterns -> {store.path}")
+    else:
+        print_fn(f"✅ {algorithm} {input_file}: input unchanged, patterns of minutil "
+                 f"{store.meta['minutil']} loaded from {store.path}")
+
+    t1 = time.perf_counter()
+    outputs = {}
+    for minutil in levels:
+        out = output_path(input_file, minutil)
+        n = store.write(minutil, out)
+        outputs[minutil] = out
+        print_fn(f"   minutil {minutil}: {n} patterns -> {out}")
+    t_filter = time.perf_counter() - t1
+    t_sweep = t_read + t_mine + t_filter
+    print_fn(f"• Sweep of {len(levels)} thresholds: {t_sweep:.2f} s "
+             f"(read {t_read:.2f} s, mine {t_mine:.2f} s, filter {t_filter:.2f} s)")
+
+    if compare:
+        t_independent, identical = 0.0, True
+        for minutil in levels:
+            t1 = time.perf_counter()
+            patterns = mine(algorithm, reader(input_file), minutil, max_length)
+            t_independent += time.perf_counter() - t1
+            check = outputs[minutil] + ".independent"
+            write_patterns(check, patterns, sequences=sequences)
+            with open(check, "rb") as a, open(outputs[minutil], "rb") as b:
+                identical &= a.read() == b.read()
+            os.remove(check)
+        status = "identical files" if identical else "⚠️ files differ"
+        print_fn(f"• Independent runs: {t_independent:.2f} s, sweep saved {t_independent - t_sweep:.2f} s "
+                 f"({t_independent / max(t_sweep, 1e-9):.1f}x), {status}")
+    return outputs
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Mine once at the lowest threshold and write every threshold's patterns.")
+    parser.add_argument("algorithm", choices=sorted(ALGORITHMS))
+    parser.add_argument("input", help="HUIM file (efim) or USPAN file (uspan)")
+    parser.add_argument("thresholds", nargs="+", help="minutil values, absolute or percentages (5%%)")
+    parser.add_argument("--max-length", type=int, help="most items in a pattern")
+    parser.add_argument("--compare", action="store_true", help="also mine every threshold on its own and report the time saved")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input):
+        print(f"❌ Input file not found: {args.input}")
+        sys.exit(1)
+    max_length = args.max_length if args.max_length is not None else (
+        uspan.MAX_LENGTH if args.algorithm == "uspan" else efim.MAX_LENGTH)
+    sweep(args.algorithm, args.input, args.thresholds, max_length, args.compare)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,101 @@
+"""
+Top-k high-utility itemsets: the k itemsets with the highest utility, without a minutil.
+
+preporcesspatterns.py keeps the first MAX_LINES = 500 patterns of every file; with a
+fixed minutil that meant re-running the miner until enough patterns came out. Here
+the EFIM search (efim.py) starts from a threshold that is already safe and raises
+it while it runs:
+
+- Start: the k-th largest single-item utility (those k items are k itemsets with at
+  least that utility, so no top-k itemset is below it).
+- While searching: the best k itemsets found so far are kept in a min-heap of size
+  k; once it is full, the threshold is the smallest utility in it. Every pruning
+  step (TWU, sub-tree and local utility) uses the current threshold, so the search
+  narrows as better itemsets are found.
+
+Each class file gets exactly k itemsets (fewer only if the file has fewer), written
+highest utility first in SPMF's #UTIL: format:
+
+    python topk.py 500 CKDYesHUIM.txt CKDNoHUIM.txt      # -> CKDYesHUIM_top500.txt, CKDNoHUIM_top500.txt
+"""
+
+import argparse
+import heapq
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "abstraction"))
+from compressed import strip_compression
+from efim import EFIM, MAX_LENGTH
+from spmf_io import read_huim, write_patterns
+
+# -----------------------------
+# Configurations
+# -----------------------------
+K = 500                      # matches preporcesspatterns.MAX_LINES
+OUTPUT_SUFFIX = "_top{k}.txt"
+
+
+class TopKEFIM(EFIM):
+    """EFIM with a rising threshold; mine() returns the k best itemsets, highest utility first."""
+
+    def __init__(self, k: int, max_length: int = MAX_LENGTH):
+        super().__init__(0, max_length)
+        self.k = k
+        self.heap = []   # (utility, itemset), smallest utility on top
+
+    def mine(self, transactions) -> list:
+        item_utility = {}
+        for items, utils, _ in transactions:
+            for item, u in zip(items, utils):
+                item_utility[item] = item_utility.get(item, 0) + u
+        if len(item_utility) >= self.k > 0:
+            self.minutil = heapq.nlargest(self.k, item_utility.values())[-1]
+        super().mine(transactions)
+        best = sorted(self.heap, key=lambda p: (-p[0], p[1]))
+        return self._named((itemset, utility) for utility, itemset in best)
+
+    def _found(self, itemset: tuple, utility: int):
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, (utility, itemset))
+        elif utility > self.heap[0][0]:
+            heapq.heapreplace(self.heap, (utility, itemset))
+        else:
+            return
+        if len(self.heap) == self.k:
+            self.minutil = max(self.minutil, self.heap[0][0])
+
+
+def output_path(input_file: str, k: int) -> str:
+    """CKDYesHUIM.txt -> CKDYesHUIM_top500.txt"""
+    return os.path.splitext(strip_compression(input_file))[0] + OUTPUT_SUFFIX.format(k=k)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Mine the k highest-utility itemsets of each HUIM file.")
+    parser.add_argument("k", type=int, help="itemsets per file")
+    parser.add_argument("inputs", nargs="+", help="HUIM files, e.g. one per class")
+    parser.add_argument("--max-length", type=int, default=MAX_LENGTH, help="longest itemset to mine")
+    args = parser.parse_args(argv)
+    if args.k < 1:
+        parser.error("k must be at least 1")
+
+    for input_file in args.inputs:
+        if not os.path.exists(input_file):
+            print(f"❌ Input file not found: {input_file}")
+            continue
+        t0 = time.perf_counter()
+        run = TopKEFIM(args.k, args.max_length)
+        patterns = run.mine(read_huim(input_file))
+        secs = time.perf_counter() - t0
+        out = output_path(input_file, args.k)
+        n = write_patterns(out, patterns)
+        print(f"✅ Top-{args.k} {input_file}: {n} itemsets in {secs:.2f} s, final minutil "
+              f"{run.minutil}, {run.candidates} candidates -> {out}")
+        if n < args.k:
+            print(f"⚠️  {input_file} has only {n} distinct itemsets (less than {args.k}).")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,230 @@
+"""
+High-utility sequential pattern mining in-process, on the USPAN files of utility_engine.py.
+
+The utility of a sequential pattern in a sequence is the largest utility of any of
+its occurrences, summed over the sequences (USpan, Yin et al., 2012). The search
+follows USpan with the tighter bounds of HUS-Span (Wang et al., 2016):
+
+- Utility matrix: every sequence is flattened into positions (item, utility,
+  itemset index, utility of everything after the position), with the positions of
+  each item, so extensions are found by position lookups.
+- Projected database: for a pattern, per sequence, the positions where an
+  occurrence can end together with the best utility of an occurrence ending there.
+  I-extensions (item added to the last itemset) and S-extensions (new itemset) are
+  built from these lists without rescanning the sequences.
+- Pruning: items whose SWU (sequence-weighted utility) is below minutil are removed
+  first; an extension is only projected if its RSU (sum of the pattern's
+  prefix-extension utility over the sequences where it occurs) reaches minutil, and
+  a pattern is only extended if its PEU does.
+- MAX_LENGTH bounds the number of items of a pattern.
+
+The output is SPMF's "a -1 b c -1 #UTIL: <utility>" (spmf_io.py), which
+pattern_postprocessing/ reads unchanged. Every run reports its runtime and peak
+memory.
+
+    python uspan.py CKDYesHUIMUSPAN.txt CKD_seq_patterns.txt 20000
+    python uspan.py CKDYesHUIMUSPAN.txt CKD_seq_patterns.txt 5% --max-length 4
+"""
+
+import argparse
+import os
+import sys
+import time
+from bisect import bisect_right
+
+from spmf_io import item_key, parse_minutil, read_uspan, write_patterns
+
+# -----------------------------
+# Configurations
+# -----------------------------
+MAX_LENGTH = 5               # most items in a pattern (None = no limit)
+
+
+def peak_memory_mb():
+    """Peak resident memory of this process in MB (None where resource is unavailable)."""
+    try:
+        import resource
+    except ImportError:   # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+
+
+class _Sequence:
+    """Utility matrix of one sequence, flattened in (itemset, item) order."""
+
+    __slots__ = ("items", "utils", "element", "rem", "element_end", "positions")
+
+    def __init__(self, itemsets):
+        self.items, self.utils, self.element = [], [], []
+        for e, itemset in enumerate(itemsets):
+            for item, u in itemset:
+                self.items.append(item)
+                self.utils.append(u)
+                self.element.append(e)
+        n = len(self.items)
+        self.rem = [0] * n               # utility after each position
+        for p in range(n - 2, -1, -1):
+            self.rem[p] = self.rem[p + 1] + self.utils[p + 1]
+        self.element_end = [n] * n       # first position of the next itemset
+        for p in range(n - 2, -1, -1):
+            self.element_end[p] = p + 1 if self.element[p + 1] != self.element[p] else self.element_end[p + 1]
+        self.positions = {}
+        for p, item in enumerate(self.items):
+            self.positions.setdefault(item, []).append(p)
+
+
+class USpan:
+    """
+    One mining run; mine() returns [(itemsets, utility)] in the input's item names.
+
+    Items of utility 0 (the outcome column of every utility table) still extend a
+    pattern (python -m doctest uspan.py):
+
+    >>> seq = ([[("1", 2)], [("2", 3)], [("3", 0)]], 5)
+    >>> USpan(6).mine([seq, seq])
+    [((('1',), ('2',)), 10), ((('1',), ('2',), ('3',)), 10), ((('2',),), 6), ((('2',), ('3',)), 6)]
+    """
+
+    def __init__(self, minutil: int, max_length: int = MAX_LENGTH):
+        self.minutil = minutil
+        self.max_length = max_length
+        self.names = []
+        self.patterns = []
+        self.candidates = 0
+
+    def mine(self, sequences) -> list:
+        minutil = self.minutil
+        swu = {}
+        for itemsets, su in sequences:
+            for item in {item for itemset in itemsets for item, _ in itemset}:
+                swu[item] = swu.get(item, 0) + su
+        promising = sorted((i for i, w in swu.items() if w >= minutil), key=item_key)
+        self.names = promising
+        new_id = {item: n for n, item in enumerate(promising)}
+
+        db = []
+        for itemsets, _ in sequences:
+            kept = []
+            for itemset in itemsets:
+                merged = {}
+                for item, u in itemset:
+                    if item in new_id:
+                        merged[new_id[item]] = merged.get(new_id[item], 0) + u
+                if merged:
+                    kept.append(sorted(merged.items()))
+            if kept:
+                db.append(_Sequence(kept))
+
+        for x in range(len(promising)):
+            projected = {}
+            for sid, s in enumerate(db):
+                if x in s.positions:
+                    projected[sid] = [(p, s.utils[p]) for p in s.positions[x]]
+            if projected:
+                self._grow(((x,),), 1, db, projected)
+        return [(tuple(tuple(self.names[i] for i in itemset) for itemset in pattern), utility)
+                for pattern, utility in self.patterns]
+
+    def _grow(self, pattern: tuple, length: int, db: list, projected: dict):
+        """Report pattern if it is a HUSP and extend it."""
+        minutil = self.minutil
+        self.candidates += 1
+        utility = 0
+        seq_peu = {}
+        for sid, ends in projected.items():
+            s = db[sid]
+            utility += max(u for _, u in ends)
+            # every end with items after it, even if they all have utility 0 (the class item)
+            last = len(s.items) - 1
+            bound = max((u + s.rem[p] for p, u in ends if p < last), default=None)
+            if bound is not None:
+                seq_peu[sid] = bound
+        peu = sum(seq_peu.values())
+        if utility >= minutil:
+            self.patterns.append((pattern, utility))
+        if peu < minutil or (self.max_length and length >= self.max_length):
+            return
+
+        # RSU of every I- and S-extension item
+        i_rsu, s_rsu = {}, {}
+        for sid, bound in seq_peu.items():
+            s, ends = db[sid], projected[sid]
+            i_items = set()
+            for p, _ in ends:
+                i_items.update(s.items[p + 1:s.element_end[p]])
+            for item in i_items:
+                i_rsu[item] = i_rsu.get(item, 0) + bound
+            for item in set(s.items[s.element_end[ends[0][0]]:]):
+                s_rsu[item] = s_rsu.get(item, 0) + bound
+
+        for x in sorted(i for i, r in i_rsu.items() if r >= minutil):
+            ext = {}
+            for sid, ends in projected.items():
+                s = db[sid]
+                positions = s.positions.get(x)
+                if not positions:
+                    continue
+                new_ends = []
+                for p, u in ends:
+                    q = bisect_right(positions, p)
+                    if q < len(positions) and positions[q] < s.element_end[p]:
+                        new_ends.append((positions[q], u + s.utils[positions[q]]))
+                if new_ends:
+                    ext[sid] = new_ends
+            if ext:
+                self._grow(pattern[:-1] + (pattern[-1] + (x,),), length + 1, db, ext)
+
+        for x in sorted(i for i, r in s_rsu.items() if r >= minutil):
+            ext = {}
+            for sid, ends in projected.items():
+                s = db[sid]
+                positions = s.positions.get(x)
+                if not positions:
+                    continue
+                new_ends, best, k = [], None, 0
+                for q in positions:
+                    # best occurrence ending in an earlier itemset than q
+                    while k < len(ends) and s.element[ends[k][0]] < s.element[q]:
+                        best = ends[k][1] if best is None else max(best, ends[k][1])
+                        k += 1
+                    if best is not None:
+                        new_ends.append((q, best + s.utils[q]))
+                if new_ends:
+                    ext[sid] = new_ends
+            if ext:
+                self._grow(pattern + ((x,),), length + 1, db, ext)
+
+
+def mine_file(input_file: str, minutil, max_length: int = MAX_LENGTH):
+    """(patterns, USpan run, absolute minutil, seconds) for a USPAN file; minutil may be "5%"."""
+    t0 = time.perf_counter()
+    sequences = read_uspan(input_file)
+    minutil = parse_minutil(minutil, sum(su for _, su in sequences))
+    run = USpan(minutil, max_length)
+    patterns = run.mine(sequences)
+    return patterns, run, minutil, time.perf_counter() - t0
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Mine high-utility sequential patterns from a USPAN file.")
+    parser.add_argument("input", help="USPAN file (item[utility] -1 ... -2 SUtility:N)")
+    parser.add_argument("output", help="pattern file in SPMF's #UTIL: format")
+    parser.add_argument("minutil", help="minimum utility, absolute or a percentage of the total utility (5%%)")
+    parser.add_argument("--max-length", type=int, default=MAX_LENGTH, help="most items in a pattern (0 = no limit)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input):
+        print(f"❌ Input file not found: {args.input}")
+        sys.exit(1)
+    patterns, run, minutil, secs = mine_file(args.input, args.minutil, args.max_length or None)
+    n = write_patterns(args.output, patterns, sequences=True)
+    peak = peak_memory_mb()
+    memory = f"{peak:.0f} MB" if peak is not None else "n/a"
+    print(f"✅ USpan {args.input}: {n} high-utility sequential patterns (minutil {minutil}, "
+          f"max length {args.max_length or '-'}) in {secs:.2f} s, peak memory {memory}, "
+          f"{run.candidates} candidates -> {args.output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
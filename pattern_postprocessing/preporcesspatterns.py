@@ -9,12 +9,19 @@ Rules:
 - Drop a line if it has fewer than 3 positive integers.
 - Write at most N lines per file (default: 500).
 - If an output file has fewer than N lines, print a warning.
+
+Inputs may be compressed (X.txt.gz / X.txt.zst, see abstraction/compressed.py);
+outputs are plain text.
 """
 
 import re
+import sys
 from pathlib import Path
 from typing import List
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "abstraction"))
+from compressed import glob_text, open_text, plain_stem
+
 # <<< EDIT THESE PATHS >>
 INPUT_FOLDER = Path("DSPPU1patterns")       # folder containing your input .txt files
 OUTPUT_FOLDER = Path("DSPPpatternsU1Cleaned") # folder where cleaned files will be saved
@@ -56,7 +63,7 @@ def process_file(input_path: Path, output_path: Path, max_lines: int = 500) -> i
     written = 0
     output_path.parent.mkdir(parents=True, exist_ok=True)
 
-    with input_path.open('r', encoding='utf-8', errors='ignore') as fin, \
+    with open_text(input_path, 'r', errors='ignore') as fin, \
          output_path.open('w', encoding='utf-8') as fout:
         for raw in fin:
             ints = clean_line(raw)
@@ -72,12 +79,12 @@ def main():
     if not INPUT_FOLDER.exists() or not INPUT_FOLDER.is_dir():
         raise SystemExit(f"Input folder not found: {INPUT_FOLDER}")
 
-    txt_files = list(INPUT_FOLDER.glob("*.txt"))
+    txt_files = glob_text(INPUT_FOLDER, "*.txt")
     if not txt_files:
         raise SystemExit(f"No .txt files found in {INPUT_FOLDER}")
 
     for file in txt_files:
-        out_file = OUTPUT_FOLDER / f"{file.stem}_cleaned.txt"
+        out_file = OUTPUT_FOLDER / f"{plain_stem(file)}_cleaned.txt"
         written = process_file(file, out_file, max_lines=MAX_LINES)
         print(f"Processed {file.name} -> {out_file.name} ({written} lines)")
 
@@ -23,16 +23,29 @@ Notes:
 - Pair detection: files whose stem (minus trailing "_cleaned") matches r"^(.*?)(Yes|No)$" (case-insensitive).
   The "base" is group(1) and the class is Yes/No.
 - Files that are not part of a Yes/No pair are processed individually using their own max length.
+- Inputs may be compressed (X.txt.gz / X.txt.zst, see abstraction/compressed.py); outputs are plain text.
+
+Fused mode (FUSED = True): the raw SPMF pattern files in RAW_INPUT_FOLDER are read
+directly, without running preporcesspatterns.py first. Its cleaning is the same
+clean_line / >=3 / MAX_LINES step as above, so the result is identical and the
+intermediate *_cleaned.txt folder is never written or read back. Output files keep
+the names of the two-step pipeline (EFIMYes.txt -> EFIMYes_cleaned_cleaned.txt).
 """
 
 import re
+import sys
 from pathlib import Path
 from typing import List, Tuple, Dict
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "abstraction"))
+from compressed import glob_text, open_text, plain_stem
+
 # <<< EDIT THESE PATHS >>>
 INPUT_FOLDER = Path("DSPPpatternsU1Cleaned")        # folder with input .txt files
 OUTPUT_FOLDER = Path("DSPPpatternsU1CleanedWKEA")   # folder for cleaned files
 MAX_LINES = 500
+FUSED = False                                       # read the raw SPMF outputs instead of INPUT_FOLDER
+RAW_INPUT_FOLDER = Path("DSPPU1patterns")           # raw pattern files (preporcesspatterns.INPUT_FOLDER)
 
 TAG_PATTERN = re.compile(r'^#\w+:$')          # e.g., #UTIL:  #BOND:
 INT_PATTERN = re.compile(r'^[+-]?\d+$')       # integer tokens
@@ -77,7 +90,7 @@ def collect_kept_lines(input_path: Path, max_lines: int = 500) -> List[List[str]
     Return a list of integer-string lists (no commas yet).
     """
     kept: List[List[str]] = []
-    with input_path.open('r', encoding='utf-8', errors='ignore') as fin:
+    with open_text(input_path, 'r', errors='ignore') as fin:
         for raw in fin:
             ints = clean_line(raw)
             if len(ints) >= 3:
@@ -121,13 +134,23 @@ def detect_pair(stem: str):
     return base, cls
 
 
+def output_path(input_path: Path) -> Path:
+    """
+    Output file for an input file; in fused mode the name the two-step pipeline
+    gives it (one "_cleaned" per step).
+    """
+    suffix = "_cleaned_cleaned.txt" if FUSED else "_cleaned.txt"
+    return OUTPUT_FOLDER / f"{plain_stem(input_path)}{suffix}"
+
+
 def main():
-    if not INPUT_FOLDER.exists() or not INPUT_FOLDER.is_dir():
-        raise SystemExit(f"Input folder not found: {INPUT_FOLDER}")
+    input_folder = RAW_INPUT_FOLDER if FUSED else INPUT_FOLDER
+    if not input_folder.exists() or not input_folder.is_dir():
+        raise SystemExit(f"Input folder not found: {input_folder}")
 
-    txt_files = list(INPUT_FOLDER.glob("*.txt"))
+    txt_files = glob_text(input_folder, "*.txt")
     if not txt_files:
-        raise SystemExit(f"No .txt files found in {INPUT_FOLDER}")
+        raise SystemExit(f"No .txt files found in {input_folder}")
 
     OUTPUT_FOLDER.mkdir(parents=True, exist_ok=True)
 
@@ -136,7 +159,7 @@ def main():
     singles: List[Path] = []
 
     for f in txt_files:
-        base, cls = detect_pair(core_stem(f.stem))
+        base, cls = detect_pair(core_stem(plain_stem(f)))
         if base is None:
             singles.append(f)
         else:
@@ -156,14 +179,14 @@ def main():
 
         # Write outputs with the pair-normalized target_len
         if 'Yes' in mapping:
-            out_yes = OUTPUT_FOLDER / f"{mapping['Yes'].stem}_cleaned.txt"
+            out_yes = output_path(mapping['Yes'])
             written_yes = write_lines(kept_yes, out_yes, target_len)
             print(f"Processed {mapping['Yes'].name} -> {out_yes.name} (lines={written_yes}, max_len={target_len})")
             if written_yes < MAX_LINES:
                 print(f"⚠️  Warning: {out_yes.name} has only {written_yes} lines (less than {MAX_LINES}).")
 
         if 'No' in mapping:
-            out_no = OUTPUT_FOLDER / f"{mapping['No'].stem}_cleaned.txt"
+            out_no = output_path(mapping['No'])
             written_no = write_lines(kept_no, out_no, target_len)
             print(f"Processed {mapping['No'].name} -> {out_no.name} (lines={written_no}, max_len={target_len})")
             if written_no < MAX_LINES:
@@ -183,7 +206,7 @@ def main():
     for f in singles:
         kept = collect_kept_lines(f, MAX_LINES)
         own_max = max((len(x) for x in kept), default=0)
-        out = OUTPUT_FOLDER / f"{f.stem}_cleaned.txt"
+        out = output_path(f)
         written = write_lines(kept, out, own_max)
         print(f"Processed {f.name} -> {out.name} (lines={written}, max_len={own_max})")
         if written < MAX_LINES:
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Vertical bitset index of the encoded transactions, for pattern support queries.
+
+Questions like "how many Yes and how many No patients contain this pattern" need a
+scan of the transaction files per pattern. The index turns them into a few
+bitwise operations: for every class file (the "class_files" of a utility table)
+and every item, one packed bitset of the transactions that contain it, as a NumPy
+uint64 array (bit t of word t // 64 = transaction t).
+
+    support of {a, b, c} in class y = popcount(bits[y][a] & bits[y][b] & bits[y][c])
+
+Items are indexed per position as well, so the summed utility of an itemset (the
+feature utilities of the table, token i of a line has utility i) is the popcount of
+the itemset's bitset with each (item, position) bitset times that position's
+utility.
+
+The index is saved as <table>.vindex.npz and rebuilt when a class file changes.
+Only the bitsets are saved: the feature utilities are taken from the table when the
+index is loaded, so edited or SHAP-derived utilities (--shap, shap_utilities.py)
+apply without a rebuild.
+
+Usage:
+    python vertical_index.py CKD DSPPpatternsU1Cleaned      # every pattern file in the folder
+    python vertical_index.py CKD EFIMYes.txt EFIMNo.txt
+    python vertical_index.py CKD --shap EFIMYes.txt         # utilities derived from SHAP
+
+For every pattern file a TSV (<stem>_support.tsv) with the support, utility and lift
+per class of every pattern is written.
+"""
+
+import csv
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "abstraction"))
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "Utilityassignment"))
+from compressed import glob_text, open_text, plain_stem
+from preporcesspatterns import clean_line
+from snapshot import file_sha256
+from txmatrix import is_matrix, open_matrix
+from utility_tables import UTILITY_TABLES
+
+INDEX_SUFFIX = ".vindex.npz"
+SUPPORT_SUFFIX = "_support.tsv"
+
+
+def _bitset(tids: np.ndarray, n_words: int) -> np.ndarray:
+    """Packed uint64 bitset with the bits of tids set."""
+    words = np.zeros(n_words, dtype=np.uint64)
+    np.bitwise_or.at(words, tids >> 6, np.left_shift(np.uint64(1), (tids & 63).astype(np.uint64)))
+    return words
+
+
+if hasattr(np, "bitwise_count"):          # NumPy >= 2.0
+    def popcount(words: np.ndarray) -> int:
+        return int(np.bitwise_count(words).sum(dtype=np.int64))
+else:
+    _BYTE_COUNTS = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+    def popcount(words: np.ndarray) -> int:
+        return int(_BYTE_COUNTS[words.view(np.uint8)].sum(dtype=np.int64))
+
+
+def _rows(path: str) -> Iterable[List[tuple]]:
+    """(position, token) pairs of every transaction of an encoded file (text or .txm)."""
+    if is_matrix(path):
+        data, _ = open_matrix(path)
+        for row in data:
+            yield [(j, str(v)) for j, v in enumerate(row.tolist()) if v != 0]
+        return
+    with open_text(path, "r", encoding=None) as f:
+        for line in f:
+            yield list(enumerate(line.split()))
+
+
+class ClassBits:
+    """Bitsets of one class file: one per (item, position), OR-ed per item."""
+
+    def __init__(self, n_transactions: int, items: np.ndarray, positions: np.ndarray, matrix: np.ndarray):
+        self.n_transactions = n_transactions
+        self.items, self.positions, self.matrix = items, positions, matrix   # one row per (item, position)
+        self.rows: Dict[str, List[int]] = {}
+        for r, item in enumerate(items.tolist()):
+            self.rows.setdefault(item, []).append(r)
+        self.bits = {item: np.bitwise_or.reduce(matrix[rows], axis=0) for item, rows in self.rows.items()}
+
+    @classmethod
+    def from_file(cls, path: str) -> "ClassBits":
+        tids: Dict[tuple, list] = {}
+        n = 0
+        for n, tokens in enumerate(_rows(path), 1):
+            for j, token in tokens:
+                tids.setdefault((token, j), []).append(n - 1)
+        n_words = (n + 63) // 64
+        keys = list(tids)
+        matrix = np.zeros((len(keys), n_words), dtype=np.uint64)
+        for r, key in enumerate(keys):
+            matrix[r] = _bitset(np.asarray(tids[key], dtype=np.int64), n_words)
+        items = np.array([k[0] for k in keys], dtype=str)
+        positions = np.array([k[1] for k in keys], dtype=np.int64)
+        return cls(n, items, positions, matrix)
+
+    def tidset(self, itemset):
+        """Bitset of the transactions that contain every item (None if one never occurs)."""
+        acc = None
+        for item in itemset:
+            bits = self.bits.get(item)
+            if bits is None:
+                return None
+            acc = bits.copy() if acc is None else np.bitwise_and(acc, bits, out=acc)
+        return acc
+
+    def support(self, itemset) -> int:
+        acc = self.tidset(itemset)
+        return popcount(acc) if acc is not None else 0
+
+    def utility(self, itemset, utilities) -> int:
+        """Summed utility of the itemset over the transactions that contain it."""
+        acc = self.tidset(itemset)
+        if acc is None:
+            return 0
+        total = 0
+        for item in itemset:
+            rows = self.rows[item]
+            if len(rows) == 1:
+                total += popcount(acc) * utilities[self.positions[rows[0]]]
+            else:
+                for r in rows:
+                    total += popcount(np.bitwise_and(acc, self.matrix[r])) * utilities[self.positions[r]]
+        return total
+
+
+class VerticalIndex:
+    """ClassBits of every class file of a utility table."""
+
+    def __init__(self, classes: Dict[str, ClassBits], feature_utilities: List[int], meta: dict):
+        self.classes = classes
+        self.feature_utilities = list(feature_utilities)
+        self.meta = meta
+
+    @classmethod
+    def build(cls, class_files: Dict[str, str], feature_utilities: List[int]) -> "VerticalIndex":
+        classes = {label: ClassBits.from_file(path) for label, path in class_files.items()}
+        meta = {"class_files": class_files, "sha256": {p: file_sha256(p) for p in class_files.values()}}
+        return cls(classes, feature_utilities, meta)
+
+    def save(self, path: Path):
+        arrays = {}
+        for k, (label, c) in enumerate(self.classes.items()):
+            arrays[f"items{k}"], arrays[f"positions{k}"], arrays[f"matrix{k}"] = c.items, c.positions, c.matrix
+        meta = {**self.meta, "labels": list(self.classes),
+                "n_transactions": [c.n_transactions for c in self.classes.values()]}
+        np.savez(path, meta=json.dumps(meta), **arrays)
+
+    @classmethod
+    def load(cls, path: Path, feature_utilities: List[int]) -> "VerticalIndex":
+        with np.load(path) as z:
+            meta = json.loads(str(z["meta"]))
+            classes = {label: ClassBits(n, z[f"items{k}"], z[f"positions{k}"], z[f"matrix{k}"])
+                       for k, (label, n) in enumerate(zip(meta["labels"], meta["n_transactions"]))}
+        return cls(classes, feature_utilities, meta)
+
+    def support(self, itemset) -> int:
+        """Transactions of all classes that contain the itemset."""
+        return sum(c.support(itemset) for c in self.classes.values())
+
+    def class_support(self, itemset) -> Dict[str, int]:
+        return {label: c.support(itemset) for label, c in self.classes.items()}
+
+    def utility(self, itemset) -> Dict[str, int]:
+        """Summed utility of the itemset per class."""
+        return {label: c.utility(itemset, self.feature_utilities) for label, c in self.classes.items()}
+
+
+def table_index(name: str, table: dict = None) -> VerticalIndex:
+    """
+    Index of the class files of a utility table (UTILITY_TABLES[name] unless given),
+    loaded from <name>.vindex.npz while they are unchanged.
+    """
+    table = table or UTILITY_TABLES[name]
+    class_files = {label: p for label, p in table["class_files"].items() if Path(p).exists()}
+    if not class_files:
+        raise SystemExit(f"No class file of {name} found: {', '.join(table['class_files'].values())}")
+    path = Path(name + INDEX_SUFFIX)
+    if path.exists():
+        index = VerticalIndex.load(path, table["feature_utilities"])
+        if index.meta["class_files"] == class_files and \
+                all(index.meta["sha256"][p] == file_sha256(p) for p in class_files.values()):
+            print(f"✅ {name}: class files unchanged, index loaded from {path}")
+            return index
+    t0 = time.perf_counter()
+    index = VerticalIndex.build(class_files, table["feature_utilities"])
+    index.save(path)
+    sizes = ", ".join(f"{label}: {c.n_transactions}" for label, c in index.classes.items())
+    print(f"✅ {name}: index of {sizes} transactions built in {time.perf_counter() - t0:.2f} s -> {path}")
+    return index
+
+
+def read_patterns(path: Path) -> List[List[str]]:
+    """Items of every pattern line (tags and their values, -1/-2 and non-items dropped)."""
+    with open_text(path, "r", errors="ignore") as f:
+        return [items for items in (clean_line(line) for line in f) if items]
+
+
+def write_support(index: VerticalIndex, patterns: List[List[str]], out_path: Path) -> float:
+    """Write support, utility and lift per class of every pattern; returns the query seconds."""
+    labels = list(index.classes)
+    totals = {label: c.n_transactions for label, c in index.classes.items()}
+    n_all = sum(totals.values())
+    t0 = time.perf_counter()
+    rows = []
+    for items in patterns:
+        support = index.class_support(items)
+        utility = index.utility(items)
+        row = [" ".join(items)] + [support[c] for c in labels] + [utility[c] for c in labels]
+        if len(labels) > 1:
+            p = sum(support.values()) / n_all
+            row += [f"{support[c] / totals[c] / p:.4f}" if p and totals[c] else "" for c in labels]
+        rows.append(row)
+    secs = time.perf_counter() - t0
+    header = ["pattern"] + [f"support_{c}" for c in labels] + [f"utility_{c}" for c in labels]
+    if len(labels) > 1:
+        header += [f"lift_{c}" for c in labels]
+    with open(out_path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f, delimiter="\t", lineterminator="\n")
+        w.writerow(header)
+        w.writerows(rows)
+    return secs
+
+
+def main(argv: List[str]):
+    shap = "--shap" in argv
+    argv = [a for a in argv if a != "--shap"]
+    if len(argv) < 2 or argv[0] not in UTILITY_TABLES:
+        raise SystemExit(f"Usage: python vertical_index.py <{'|'.join(UTILITY_TABLES)}> [--shap] <pattern files or folder>")
+    table = None
+    if shap:
+        from shap_utilities import derive_utilities
+        table = derive_utilities(argv[0])
+    index = table_index(argv[0], table)
+    files: List[Path] = []
+    for arg in argv[1:]:
+        p = Path(arg)
+        files += sorted(glob_text(p, "*.txt")) if p.is_dir() else [p]
+    for file in files:
+        patterns = read_patterns(file)
+        out_file = file.with_name(plain_stem(file) + SUPPORT_SUFFIX)
+        secs = write_support(index, patterns, out_file)
+        print(f"Processed {file.name} -> {out_file.name} ({len(patterns)} patterns, queries in {secs:.2f} s)")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
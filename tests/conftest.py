@@ -0,0 +1,11 @@
+"""
+The scripts import each other by module name from their own folder (they are run
+as `python abstraction/CKD.py`, ...), so the folders go on sys.path here too.
+"""
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for folder in ("abstraction", "Utilityassignment", "mining", "pattern_postprocessing"):
+    sys.path.insert(0, os.path.join(ROOT, folder))
@@ -0,0 +1,78 @@
+import os
+import stat
+import sys
+
+import pytest
+
+import batch
+
+# Stands in for java: `stub -Xmx.. -jar <jar> run <algorithm> <input> <output> <params...>`,
+# the algorithm name picks what the "run" does.
+STUB = f"""#!{sys.executable}
+import sys, time
+algorithm, output = sys.argv[-4], sys.argv[-2]
+if algorithm == "Write":
+    with open(output, "w") as f:
+        f.write("1 2 #UTIL: 30\\n3 #UTIL: 25\\n")
+elif algorithm == "Fail":
+    sys.exit("java.lang.OutOfMemoryError: Java heap space")
+elif algorithm == "Sleep":
+    time.sleep(10)
+"""
+
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(batch, "CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(batch, "OUTPUT_DIR", str(tmp_path / "out"))
+    java = tmp_path / "java_stub"
+    java.write_text(STUB)
+    java.chmod(java.stat().st_mode | stat.S_IXUSR)
+    (tmp_path / "spmf.jar").write_bytes(b"jar")
+    (tmp_path / "in.txt").write_text("1 2 3:60:10 20 30\n")
+    return tmp_path
+
+
+def _job(algorithm):
+    return batch.jobs({"datasets": {"D": {"Yes": {"huim": "in.txt"}}},
+                       "algorithms": {algorithm: {"input": "huim", "params": [["40"]]}}})[0]
+
+
+def _run(env, algorithm, timeout=30):
+    job = _job(algorithm)
+    row = batch.run_job(job, "spmf.jar", batch.file_sha256("spmf.jar"), timeout,
+                        str(env / "java_stub"), None)
+    return job, row
+
+
+def test_ok_then_cached(env):
+    job, row = _run(env, "Write")
+    assert row["status"] == "ok" and row["patterns"] == 2
+    os.remove(job["output"])
+    job, row = _run(env, "Write")
+    assert row["status"] == "cached" and row["patterns"] == 2
+    assert os.path.exists(job["output"])
+
+
+def test_timeout(env):
+    _, row = _run(env, "Sleep", timeout=0.5)
+    assert row["status"] == "timeout"
+    assert not os.path.exists(batch.CACHE_DIR)
+
+
+def test_nonzero_exit(env):
+    _, row = _run(env, "Fail")
+    assert row["status"] == "exit 1: java.lang.OutOfMemoryError: Java heap space"
+    assert not os.path.exists(batch.CACHE_DIR)
+
+
+def test_missing_output_is_not_ok_even_with_a_stale_file(env):
+    job = _job("Silent")
+    os.makedirs(os.path.dirname(job["output"]), exist_ok=True)
+    with open(job["output"], "w") as f:
+        f.write("stale pattern #UTIL: 1\n")
+    _, row = _run(env, "Silent")
+    assert row["status"] == "exit 0: no output file"
+    assert not os.path.exists(job["output"])
+    assert not os.path.exists(batch.CACHE_DIR)
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+import CSD
+
+HEADER = ("case_month,res_state,state_fips_code,res_county,county_fips_code,age_group,sex,race,ethnicity,"
+          "case_positive_specimen_interval,case_onset_interval,process,exposure_yn,current_status,"
+          "symptom_status,hosp_yn,icu_yn,death_yn,underlying_conditions_yn\n")
+ROWS = [
+    "2020-03,CA,37,X,6037,50 to 64 years,Male,Multiple/Other,Missing,,12,Laboratory reported,No,"
+    "Laboratory-confirmed case,Missing,Yes,Missing,Missing,\n",
+    "2020-01,CA,45,X,,50 to 64 years,Female,Unknown,Hispanic/Latino,-2,0,Missing,Yes,"
+    "Laboratory-confirmed case,Missing,No,Missing,Yes,\n",
+    "2021-07,NY,36,X,36061,18 to 49 years,Female,White,Non-Hispanic/Latino,0,,Missing,Missing,"
+    "Probable Case,Symptomatic,No,No,No,Yes\n",
+]
+
+
+@pytest.fixture
+def csd(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(CSD, "INPUT_PATH", "cdc.csv")
+    monkeypatch.setattr(CSD, "OUTPUT_PATH", "cdc.txt")
+    monkeypatch.setattr(CSD, "INCREMENTAL", True)
+    return tmp_path
+
+
+def _run(tmp_path, rows, capsys):
+    (tmp_path / "cdc.csv").write_text(HEADER + "".join(rows), encoding="utf-8")
+    CSD.main()
+    return capsys.readouterr().out
+
+
+def test_append_only_adds_new_rows(csd, capsys):
+    _run(csd, ROWS[:2], capsys)
+    out = _run(csd, ROWS, capsys)
+    assert "Appended 1 rows" in out
+    assert len((csd / "cdc.txt").read_text().split("\n")) == 3
+
+
+@pytest.mark.parametrize("before, after", [
+    ({}, {"CODEBOOK_PATH": "cdc.codebook.tsv"}),
+    ({"CODEBOOK_PATH": "cdc.codebook.tsv"}, {"CODEBOOK_PATH": "cdc.codebook.tsv", "MATRIX_OUTPUT": True}),
+])
+def test_changed_output_settings_rebuild(csd, capsys, monkeypatch, before, after):
+    for name, value in before.items():
+        monkeypatch.setattr(CSD, name, value)
+    _run(csd, ROWS[:2], capsys)
+    for name, value in after.items():
+        monkeypatch.setattr(CSD, name, value)
+    out = _run(csd, ROWS, capsys)
+    assert "full rebuild (output settings changed" in out
+    manifest = json.loads((csd / "cdc.txt.manifest.json").read_text())
+    assert manifest["rows"] == 3 and manifest["settings"] == CSD.output_settings()
+    assert (csd / "cdc.txm").exists() == after.get("MATRIX_OUTPUT", False)
+
+    # the rebuilt output is what a fresh run with the new settings writes
+    rebuilt = (csd / "cdc.txt").read_text()
+    for name in ("cdc.txt.manifest.json", "cdc.codebook.tsv"):
+        (csd / name).unlink()
+    _run(csd, ROWS, capsys)
+    assert (csd / "cdc.txt").read_text() == rebuilt
@@ -0,0 +1,37 @@
+import numpy as np
+
+import FLCD
+from txmatrix import export_text, lines_to_matrix, read_header, save_matrix
+
+
+def test_flcd_matrix_exports_back_to_its_text(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "FLCDYes.csv").write_text("a,b,c\n05,2,3.005\n3,4.025,7\n", encoding="utf-8")
+    monkeypatch.setattr(FLCD, "IN_PATH", "FLCDYes.csv")
+    monkeypatch.setattr(FLCD, "MATRIX_OUTPUT", True)
+    FLCD.main()
+
+    text = (tmp_path / "FLCDYes.txt").read_bytes()
+    assert b"\t" in text and text.endswith(b"\n")
+    export_text("FLCDYes.txm", "exported.txt")
+    assert (tmp_path / "exported.txt").read_bytes() == text
+
+
+def test_export_keeps_separator_and_final_newline(tmp_path):
+    lines = ["11 22 33", "14  36"]
+    for sep, final_newline in ((" ", False), (" ", True), ("\t", True)):
+        encoded = [line.replace(" ", sep) for line in lines]
+        text_path = tmp_path / "out.txt"
+        text_path.write_text("\n".join(encoded) + ("\n" if final_newline else ""), encoding="utf-8")
+        save_matrix(str(text_path), encoded, ["a", "b", "c"], sep=sep, final_newline=final_newline,
+                    print_fn=lambda m: None)
+        header = read_header(str(tmp_path / "out.txm"))
+        assert (header["sep"], header["final_newline"]) == (sep, final_newline)
+        export_text(str(tmp_path / "out.txm"), str(tmp_path / "exported.txt"))
+        assert (tmp_path / "exported.txt").read_bytes() == text_path.read_bytes()
+
+
+def test_lines_to_matrix_reads_missing_cells_as_zero():
+    matrix = lines_to_matrix(["1 2 3", "4  6", " 8 9"], 3)
+    assert matrix.tolist() == [[1, 2, 3], [4, 0, 6], [0, 8, 9]]
+    assert lines_to_matrix(["1\t\t3"], 3, "\t").tolist() == [[1, 0, 3]]
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+import utility_engine as ue
+from item_index import prune_huim_line, unpromising
+from txmatrix import export_text, write_matrix
+
+UTILS = [3, 0, 5, 2]
+
+
+def _outputs(tmp_path, convert, input_file, **kwargs):
+    huim, uspan = tmp_path / "huim.txt", tmp_path / "uspan.txt"
+    result = convert(str(input_file), str(huim), str(uspan), UTILS, sum(UTILS), **kwargs)
+    return result, huim.read_text(), uspan.read_text()
+
+
+@pytest.mark.parametrize("missing", [False, True])
+def test_matrix_input_converts_like_its_text(tmp_path, monkeypatch, missing):
+    monkeypatch.setattr(ue, "MATRIX_BLOCK_ROWS", 7)
+    rng = np.random.default_rng(0)
+    data = rng.integers(1, 4, size=(50, 4)) + np.arange(4) * 10 + 10
+    if missing:
+        data[rng.random(data.shape) < 0.2] = 0
+    write_matrix(str(tmp_path / "in.txm"), data, ["a", "b", "c", "d"])
+    export_text(str(tmp_path / "in.txm"), str(tmp_path / "in.txt"))
+
+    assert _outputs(tmp_path, ue.convert, tmp_path / "in.txm") == _outputs(tmp_path, ue.convert, tmp_path / "in.txt")
+    assert _outputs(tmp_path, ue.convert_dedup, tmp_path / "in.txm") == \
+        _outputs(tmp_path, ue.convert_dedup, tmp_path / "in.txt")
+
+    stats = {p: ue.collect_stats(str(tmp_path / p), UTILS, sum(UTILS)) for p in ("in.txm", "in.txt")}
+    assert stats["in.txm"].items() == stats["in.txt"].items()
+    pruned = unpromising(stats["in.txt"], 400)
+    assert pruned
+    assert _outputs(tmp_path, ue.convert, tmp_path / "in.txm", pruned=pruned) == \
+        _outputs(tmp_path, ue.convert, tmp_path / "in.txt", pruned=pruned)
+
+
+def test_matrix_row_with_too_many_values(tmp_path):
+    write_matrix(str(tmp_path / "in.txm"), np.array([[1, 2, 3, 4, 5]]), list("abcde"))
+    with pytest.raises(ValueError, match="5 values"):
+        _outputs(tmp_path, ue.convert, tmp_path / "in.txm")
+
+
+def test_prune_huim_line_matches_the_unpruned_writer():
+    huim_suffix = ue.build_templates(UTILS, sum(UTILS))[0]
+    for values in (["11", "22", "33", "44"], ["11", "22"], ["11"]):
+        assert prune_huim_line(values, UTILS, sum(UTILS), set()) == " ".join(values) + huim_suffix + "\n"
+
+
+@pytest.mark.parametrize("convert", [ue.convert, ue.convert_dedup])
+def test_pruning_short_and_emptied_lines(tmp_path, convert):
+    (tmp_path / "in.txt").write_text("11 22 33 44\n11 22\n55 22\n55\n")
+    _, huim, uspan = _outputs(tmp_path, convert, tmp_path / "in.txt", pruned={"22", "55"})
+    # short lines keep the trailing utilities; lines without any kept item are dropped
+    assert huim == "11 33 44:10:3 5 2\n11:10:3 5 2\n"
+    assert uspan.count("\n") == 4